@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+
+import argparse
+import atexit
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+import warnings
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+from bioarch.individual import OsteologicalSex, PD_FRAME_CACHE  # noqa: E402
+from bioarch.ingest import ingest  # noqa: E402
+from bioarch.io import read_rows  # noqa: E402
+from bioarch.population import Population  # noqa: E402
+from bioarch.prevalence import PrevalenceCounter  # noqa: E402
+from bioarch.sex import Sex  # noqa: E402
+from bioarch.snapshot import Snapshot, write_snapshot  # noqa: E402
+from bioarch.store import CohortStore  # noqa: E402
+from bioarch.synthetic import CohortGenerator  # noqa: E402
+
+
+# A typical analysis' handful of columns, for the projected export
+PROJECTION = ['ass_osteological_sex_combined_bin_cat', 'ass_age_category_quad_cat', 'mouth_molar_cavities_mean', 'om_mean_avg',
+              'joints_hip_avg', 'trauma_femur_left_cat', 'context_weapons_cat']
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def benchmarks(size: int, seed: int, processes: int) -> Dict[str, Tuple[int, Callable[[], Any]]]:
+    """Name to (individuals handled, callable) for every benchmark"""
+    generator = CohortGenerator(seed)
+    records = generator.records(size)
+    rows = [generator.to_row(record) for record in records]
+    individuals = [generator.build(record) for record in records]
+    # Single individual export is the slow path, keep its run time in line with the others
+    single = individuals[:max(1, size // 20)]
+
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory)
+    snapshot = os.path.join(directory, 'cohort.snapshot')
+    write_snapshot(individuals, snapshot)
+
+    def export_single():
+        PD_FRAME_CACHE.clear()
+        return [individual.to_pd_data_frame() for individual in single]
+
+    # The first of the repeats fills PD_FRAME_CACHE, the others only rebuild the edited or no section
+    def export_single_edited():
+        for individual in single:
+            ass = individual.age_sex_stature
+            sex = ass.osteological_sex
+            ass.osteological_sex = OsteologicalSex(sex.pelvic, sex.cranium, Sex.MALE if sex.combined == Sex.FEMALE else Sex.FEMALE)
+        return [individual.to_pd_data_frame() for individual in single]
+
+    def read_snapshot():
+        with Snapshot(snapshot) as opened:
+            return list(opened)
+
+    # The rows as a handful of per site recording sheets
+    sheets = []
+    for start in range(0, size, max(1, size // 8)):
+        sheet = os.path.join(directory, f'site_{start}.csv')
+        sheet_rows = rows[start:start + max(1, size // 8)]
+        with open(sheet, mode='w', newline='', encoding='utf-8') as sheet_file:
+            writer = csv.DictWriter(sheet_file, fieldnames=list(dict.fromkeys(column for row in sheet_rows for column in row)))
+            writer.writeheader()
+            writer.writerows(sheet_rows)
+        sheets.append(sheet)
+
+    store = os.path.join(directory, 'cohort.sqlite')
+    with CohortStore(store) as opened:
+        opened.add(individuals)
+
+    def write_store():
+        with CohortStore(store) as opened:
+            opened.add(individuals)
+
+    def load_store():
+        with CohortStore(store) as opened:
+            return opened.individuals()
+
+    return {
+        'parse': (size, lambda: list(read_rows(rows))),
+        'ingest': (size, lambda: list(ingest(sheets, processes=processes, chunk_size=max(1, size // (2 * processes))))),
+        'construct': (size, lambda: [generator.build(record) for record in records]),
+        'individual_to_pd_data_frame': (len(single), export_single),
+        'individual_to_pd_data_frame_cached': (len(single), lambda: [individual.to_pd_data_frame() for individual in single]),
+        'individual_to_pd_data_frame_edited': (len(single), export_single_edited),
+        'snapshot_write': (size, lambda: write_snapshot(individuals, snapshot)),
+        'snapshot_read': (size, read_snapshot),
+        'store_write': (size, write_store),
+        'store_load': (size, load_store),
+        'population_to_pd_data_frame': (size, lambda: Population(individuals).to_pd_data_frame()),
+        'population_to_pd_data_frame_projected': (size, lambda: Population(individuals).to_pd_data_frame(columns=PROJECTION)),
+        'prevalence': (size, lambda: PrevalenceCounter.from_individuals(individuals).to_pd_data_frame()),
+        'population_to_pd_data_frame_parallel': (size, lambda: Population(individuals).to_pd_data_frame_parallel(processes=processes, chunk_size=max(1, size // processes))),
+    }
+
+
+def measure(count: int, function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best of repeat timings, then a separate (traced, so slower) run for the peak memory"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'individuals_per_second': count / best,
+        'peak_memory_mb': peak / (1024 * 1024),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Names of the benchmarks with a throughput more than tolerance below the baseline's"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['individuals_per_second']
+        if result['individuals_per_second'] < expected * (1.0 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time parsing, construction and export of a synthetic cohort')
+    parser.add_argument('--size', type=int, default=500, help='individuals in the cohort')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark, the best is kept')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='for the parallel export')
+    parser.add_argument('--only', action='append', help='only run the named benchmark (can be repeated)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed throughput drop before failing')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, mode='r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    results = {}
+    print(f'{"benchmark":<40} {"individuals/s":>14} {"baseline":>14} {"peak MiB":>10}')
+    for name, (count, function) in benchmarks(args.size, args.seed, args.processes).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(count, function, args.repeat)
+        expected = baseline.get(name, {}).get('individuals_per_second')
+        expected_str = f'{expected:14.1f}' if expected else f'{"-":>14}'
+        print(f'{name:<40} {results[name]["individuals_per_second"]:14.1f} {expected_str} {results[name]["peak_memory_mb"]:10.1f}')
+
+    if args.save_baseline:
+        with open(args.baseline, mode='w', encoding='utf-8') as baseline_file:
+            json.dump({'size': args.size, 'seed': args.seed, 'results': results}, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f'Slower than the baseline: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The slow to import dependencies checked. pandas is deferred until something is exported (see bioarch.lazy), numpy
+# is a plain import of the submodules, deferred only by "import bioarch" not importing them.
+HEAVY = ('numpy', 'pandas')
+
+# Name to (statement timed in a fresh interpreter, the HEAVY modules it should need)
+SCENARIOS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'import_bioarch': ('import bioarch', ()),
+    'sex_parse': ('import bioarch; bioarch.Sex.parse("M")', ('numpy',)),
+    'read_rows': ('from bioarch.io import read_rows; from bioarch.synthetic import CohortGenerator; list(read_rows(CohortGenerator().rows(1)))', ('numpy',)),
+    'to_pd_data_frame': ('from bioarch.synthetic import CohortGenerator; CohortGenerator().population(1).to_pd_data_frame()', ('numpy', 'pandas')),
+}
+
+_TIMER = '''
+import sys, time, json
+start = time.perf_counter()
+exec({statement!r})
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": [module for module in {heavy!r} if module in sys.modules]}}))
+'''
+
+
+def measure(statement: str, repeat: int) -> Dict[str, Any]:
+    """Best of repeat fresh interpreter runs of statement"""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _TIMER.format(statement=statement, heavy=HEAVY)], cwd=ROOT, check=True, stdout=subprocess.PIPE).stdout
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time importing bioarch, and what it imports, in fresh interpreters')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per scenario, the best is kept')
+    args = parser.parse_args()
+
+    unexpected = []
+    print(f'{"scenario":<20} {"ms":>10} {"imported":>16}')
+    for name, (statement, needs) in SCENARIOS.items():
+        result = measure(statement, args.repeat)
+        print(f'{name:<20} {result["seconds"] * 1000:10.1f} {" ".join(result["modules"]):>16}')
+        unexpected += [f'{module} by {name}' for module in result['modules'] if module not in needs]
+
+    if unexpected:
+        print(f'unexpectedly imported: {", ".join(unexpected)}')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
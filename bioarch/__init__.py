@@ -1,20 +1,10 @@
 #!/usr/bin/env python
 
 
+import importlib
 import sys
 
 
-from .age import AgeCategory, EstimatedAge
-from .context import BodyPosition, CompassBearing, Context, Present
-from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex
-from .joints import JointCondition, Joints
-from .left_right import LeftRight
-from .mouth import Mouth, Tooth
-from .occupational_markers import EnthesialMarker, OccupationalMarkers
-from .sex import Sex
-from .trauma import Trauma, TraumaCategory
-
-
 if sys.version_info < (3, 7):
     print('ERROR: Only Python 3.7 and above is supported')
     sys.exit(-1)
@@ -24,7 +14,33 @@ __title__ = 'bioarch'
 __version__ = '0.0.35'
 __author__ = 'Guy Taylor'
 
-__all__ = ['AgeCategory', 'EstimatedAge'] + ['BodyPosition', 'CompassBearing', 'Context', 'Present'] + \
-          ['AgeSexStature', 'BurialInfo', 'Individual', 'LongBoneMeasurement', 'OsteologicalSex'] + \
-          ['JointCondition', 'Joints'] + ['EnthesialMarker', 'OccupationalMarkers'] + ['LeftRight'] + \
-          ['Mouth', 'Tooth'] + ['Sex'] + ['Trauma', 'TraumaCategory']
+# Public name to the submodule it is imported from, on first use (see __getattr__)
+_EXPORTS = {
+    'AgeCategory': 'age', 'EstimatedAge': 'age',
+    'BodyPosition': 'context', 'CompassBearing': 'context', 'Context': 'context', 'ContextArray': 'context', 'Present': 'context',
+    'AgeSexStature': 'individual', 'BurialInfo': 'individual', 'Individual': 'individual', 'LongBoneMeasurement': 'individual', 'OsteologicalSex': 'individual',
+    'JointCondition': 'joints', 'Joints': 'joints', 'JointsArray': 'joints',
+    'EnthesialMarker': 'occupational_markers', 'OccupationalMarkers': 'occupational_markers', 'OccupationalMarkersArray': 'occupational_markers',
+    'LeftRight': 'left_right',
+    'Mouth': 'mouth', 'MouthArray': 'mouth', 'Tooth': 'mouth',
+    'Population': 'population',
+    'Sex': 'sex',
+    'CohortStore': 'store',
+    'Trauma': 'trauma', 'TraumaArray': 'trauma', 'TraumaCategory': 'trauma',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Submodules are only imported when one of their names is first used, so "import bioarch" stays cheap"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
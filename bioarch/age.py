@@ -5,11 +5,16 @@ import enum
 from enum import Enum
 import functools
 import logging
-from typing import Any, cast, Optional
+from typing import Any, cast, Iterable, List, Optional
 
 
-import pandas as pd
-from pandas.api.types import CategoricalDtype
+import numpy as np
+
+
+from . import instrumentation
+from .columns import add_prefix, Cell, to_pd_data_frame
+from .lazy import pandas as pd
+from .parsing import parse_array, parse_many
 
 
 logger = logging.getLogger(__name__)
@@ -33,18 +38,21 @@ class AgeCategory(Enum):
         if type(value) == AgeCategory:  # pylint: disable=C0123
             return cast(AgeCategory, value)
         if not isinstance(value, str):
+            instrumentation.parse_failed(AgeCategory.__name__)
             raise ValueError(f'Failed to parse {AgeCategory.__name__}: "{value}"')
-        value = value.upper()
-        for category in AgeCategory:
-            if value == category.name:
-                return category
-        if value == 'OA':
-            return AgeCategory.OLD
-        if value == 'MIDDLE/OLD':
-            return AgeCategory.MIDDLE_OLD
-        if value == 'YOUNG ADULT':
-            return AgeCategory.YOUNG_ADULT
-        raise ValueError(f'Failed to parse {AgeCategory.__name__}: "{value}"')
+        category = _AGE_CATEGORY_ALIASES.get(value.upper())
+        if category is not None:
+            return category
+        instrumentation.parse_failed(AgeCategory.__name__)
+        raise ValueError(f'Failed to parse {AgeCategory.__name__}: "{value.upper()}"')
+
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['AgeCategory']]:
+        return parse_many(AgeCategory.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(AgeCategory.parse, values)
 
     def as_quad(self):
         if self == AgeCategory.UNKNOWN:
@@ -76,18 +84,29 @@ class AgeCategory(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in AgeCategory], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in AgeCategory], ordered=True)
+
+
+_AGE_CATEGORY_ALIASES = {category.name: category for category in AgeCategory}
+_AGE_CATEGORY_ALIASES.update({
+    'OA': AgeCategory.OLD,
+    'MIDDLE/OLD': AgeCategory.MIDDLE_OLD,
+    'YOUNG ADULT': AgeCategory.YOUNG_ADULT,
+})
 
 
 class EstimatedAge(object):
-    """docstring for EstimatedAge"""
+    """An age category and, if known, range, immutable"""
+
+    __slots__ = ['category', 'ranged']
 
     MAX_AGE = 100
 
     def __init__(self, category: str, ranged: Optional[str]):
-        self.category = AgeCategory.parse(category)  # pylint: disable=W0212
-        self.ranged = EstimatedAge._parse_range(ranged)
+        object.__setattr__(self, 'category', AgeCategory.parse(category))  # pylint: disable=W0212
+        object.__setattr__(self, 'ranged', EstimatedAge._parse_range(ranged))
 
     @staticmethod
     def _parse_range(range_input: Any):
@@ -118,18 +137,36 @@ class EstimatedAge(object):
     def empty():
         return EstimatedAge('UNKNOWN', 'UNKNOWN')
 
-    def to_pd_data_frame(self, index):
-        d = {
-            'id': pd.Series([index]),
-            'category_cat': pd.Series([self.category.name], copy=True, dtype=AgeCategory.dtype()),
-            'category_val': pd.Series([self.category.value], copy=True),
-            'category_quad_cat': pd.Series([self.category.as_quad().name], copy=True, dtype=AgeCategory.dtype()),
-            'category_quad_val': pd.Series([self.category.as_quad().value], copy=True),
+    def to_pd_dict(self, prefix=''):
+        category_quad = self.category.as_quad()
+        cells = {
+            'category_cat': Cell(self.category.name, AgeCategory.dtype()),
+            'category_val': Cell(self.category.value),
+            'category_quad_cat': Cell(category_quad.name, AgeCategory.dtype()),
+            'category_quad_val': Cell(category_quad.value),
         }
         if self.ranged:
-            d['ranged'] = pd.Series([pd.RangeIndex.from_range(self.ranged)], copy=True)
+            cells['ranged'] = Cell(pd.RangeIndex.from_range(self.ranged))
+        return add_prefix(cells, prefix)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if type(other) != type(self):  # pylint: disable=C0123
+            raise NotImplementedError
+        return ((self.category, self.ranged) == (other.category, other.ranged))  # pylint: disable=C0325
+
+    def __hash__(self):
+        return hash((self.category, self.ranged))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
 
-        return pd.DataFrame.from_dict(d).set_index('id')
+    def __reduce__(self):
+        return (EstimatedAge, (self.category.name, self.ranged))
+
+    def to_pd_data_frame(self, index):
+        return to_pd_data_frame(index, self.to_pd_dict())
 
 
 if __name__ == "__main__":
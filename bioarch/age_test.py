@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 
+import pickle
 import unittest
 
 
@@ -34,6 +35,16 @@ class AgeCategoryTest(unittest.TestCase):
         self.assertEqual(AgeCategory.parse(None), None)
         self.assertEqual(AgeCategory.parse(AgeCategory.UNKNOWN), AgeCategory.UNKNOWN)
 
+        with self.assertRaises(ValueError):
+            AgeCategory.parse('ANCIENT')
+
+    def test_parse_many(self):
+        self.assertEqual(AgeCategory.parse_many(['oa', 'Middle/Old', None]), [AgeCategory.OLD, AgeCategory.MIDDLE_OLD, None])
+        self.assertEqual(AgeCategory.parse_array(['OLD', 'YOUNG']).tolist(), [AgeCategory.OLD, AgeCategory.YOUNG])
+
+    def test_dtype(self):
+        self.assertIs(AgeCategory.dtype(), AgeCategory.dtype())
+
     def test_to_quad(self):
         self.assertEqual(AgeCategory.UNKNOWN.as_quad(), AgeCategory.UNKNOWN)
         self.assertEqual(AgeCategory.YOUNG.as_quad(), AgeCategory.YOUNG)
@@ -59,6 +70,15 @@ class EstimatedAgeTest(unittest.TestCase):
         self.assertEqual(EstimatedAge('OLD', '?').ranged, None)
         self.assertEqual(EstimatedAge('OLD', None).ranged, None)
 
+    def test_value_semantics(self):
+        age = EstimatedAge('OLD', '10-20')
+        self.assertEqual(age, EstimatedAge('OLD', '10-20'))
+        self.assertNotEqual(age, EstimatedAge('OLD', '20+'))
+        self.assertEqual(hash(age), hash(EstimatedAge('OLD', '10-20')))
+        self.assertEqual(pickle.loads(pickle.dumps(age)), age)
+        with self.assertRaises(AttributeError):
+            age.category = AgeCategory.YOUNG
+
     def test_to_pd_data_frame(self):
         df = EstimatedAge('UNKNOWN', 'UNKNOWN').to_pd_data_frame('id1')
         self.assertEqual(df.to_json(orient='records'), '[{"category_cat":"UNKNOWN","category_val":0,"category_quad_cat":"UNKNOWN","category_quad_val":0}]')
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+
+from .lazy import pandas as pd
+from .population import Population
+
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+    from pyarrow import parquet
+except ImportError:
+    pa = None
+
+
+METADATA_KEY = b'bioarch'
+FORMAT_VERSION = 1
+
+INDEX_COLUMN = 'id'
+
+# The metadata dtype of object columns holding pandas.RangeIndex
+RANGE_DTYPE = 'range'
+_RANGE_FIELDS = ('start', 'stop', 'step')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('pyarrow is needed for Parquet/Feather support, install it with "pip install bioarch[arrow]"')
+
+
+def _to_data_frame(data: Union[Population, 'pd.DataFrame']) -> 'pd.DataFrame':
+    if isinstance(data, Population):
+        return data.to_pd_data_frame()
+    return data
+
+
+def _is_range_column(series: 'pd.Series') -> bool:
+    """An object column of RangeIndex (and None), as EstimatedAge.ranged is exported"""
+    if str(series.dtype) != 'object':
+        return False
+    values = [value for value in series if value is not None]
+    return bool(values) and all(isinstance(value, pd.RangeIndex) for value in values)
+
+
+def _dtype_to_json(series: 'pd.Series') -> Optional[Any]:
+    """Enough to restore the dtypes arrow/parquet do not keep, None for the ones they do"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.types.CategoricalDtype):
+        return {'categories': [str(category) for category in dtype.categories], 'ordered': bool(dtype.ordered)}
+    if _is_range_column(series):
+        return RANGE_DTYPE
+    if str(dtype) in ('Int64', 'object'):
+        return str(dtype)
+    return None
+
+
+def _dtype_from_json(dtype: Any) -> Any:
+    if isinstance(dtype, dict):
+        return pd.api.types.CategoricalDtype(categories=dtype['categories'], ordered=dtype['ordered'])
+    return dtype
+
+
+def _range_to_arrow_array(series: 'pd.Series') -> 'pa.Array':
+    """Struct of the start, stop and step of each range"""
+    mask = [value is None for value in series]
+    fields = [pa.array([0 if value is None else getattr(value, field) for value in series], type=pa.int64()) for field in _RANGE_FIELDS]
+    return pa.StructArray.from_arrays(fields, names=list(_RANGE_FIELDS), mask=pa.array(mask, type=pa.bool_()))
+
+
+def _range_series(column: Any) -> 'pd.Series':
+    """Inverse of _range_to_arrow_array"""
+    values = [None if value is None else pd.RangeIndex(value['start'], value['stop'], value['step']) for value in column.to_pylist()]
+    series = pd.Series([None] * len(values), dtype=object)
+    series[:] = values
+    return series
+
+
+def _to_arrow_array(series: 'pd.Series', dtype_json: Optional[Any]) -> 'pa.Array':
+    if dtype_json == RANGE_DTYPE:
+        return _range_to_arrow_array(series)
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.types.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        indices = pa.array(codes, mask=codes < 0)
+        return pa.DictionaryArray.from_arrays(indices, pa.array([str(category) for category in dtype.categories]), ordered=dtype.ordered)
+    if str(dtype) == 'Int64':
+        mask = series.isna().to_numpy()
+        return pa.array(series.fillna(0).astype('int64').to_numpy(), mask=mask)
+    return pa.Array.from_pandas(series)
+
+
+def to_arrow_table(data: Union[Population, 'pd.DataFrame']) -> 'pa.Table':
+    """Arrow table of an exported data frame (or of a Population's export), keeping categorical and Int64 columns.
+
+    Categoricals are stored dictionary encoded, the full categories and order are kept in the schema metadata. Columns
+    of ranges (the age ranges) are stored as start, stop and step structs."""
+    _require_pyarrow()
+    df = _to_data_frame(data)
+    if INDEX_COLUMN not in df.columns:
+        raise ValueError(f'Data frame has no "{INDEX_COLUMN}" column')
+    dtypes = {column: _dtype_to_json(df[column]) for column in df.columns}
+    arrays = [_to_arrow_array(df[column], dtypes[column]) for column in df.columns]
+    metadata = {
+        'version': FORMAT_VERSION,
+        'dtypes': {column: dtype for column, dtype in dtypes.items() if dtype is not None},
+    }
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in df.columns], metadata={METADATA_KEY: json.dumps(metadata)})
+
+
+def _metadata(schema: 'pa.Schema') -> Dict[str, Any]:
+    if not schema.metadata or METADATA_KEY not in schema.metadata:
+        raise ValueError('Not a bioarch table, no bioarch metadata found')
+    metadata = json.loads(schema.metadata[METADATA_KEY])
+    if metadata['version'] != FORMAT_VERSION:
+        raise ValueError(f'Unsupported bioarch table version: {metadata["version"]}')
+    return metadata
+
+
+def _to_object_series(column: Any) -> 'pd.Series':
+    """Object column with None for nulls, as exported, rather than the floats and NaN arrow would give for ints"""
+    nulls = column.is_null().to_pandas().to_numpy()
+    if pa.types.is_integer(column.type) and nulls.any():
+        column = column.fill_null(0)
+    series = column.to_pandas().astype(object)
+    if nulls.any():
+        series[nulls] = None
+    return series
+
+
+def _from_arrow(table: Any, metadata: Dict[str, Any], columns: Optional[Sequence[str]]) -> 'pd.DataFrame':
+    """table is a Table or RecordBatch, holding at least the id column and the requested columns"""
+    dtypes = metadata['dtypes']
+    data = {}
+    for name, column in zip(table.schema.names, table.columns):
+        dtype = dtypes.get(name)
+        if dtype == 'object':
+            series = _to_object_series(column)
+        elif dtype == RANGE_DTYPE:
+            series = _range_series(column)
+        else:
+            series = column.to_pandas()
+            if dtype is not None:
+                series = series.astype(_dtype_from_json(dtype))
+        data[name] = series
+    index = pd.Index(data[INDEX_COLUMN].tolist())
+    if columns is None:
+        columns = table.schema.names
+    df = pd.DataFrame({name: data[name] for name in columns}, columns=list(columns))
+    df.index = index
+    return df
+
+
+def from_arrow_table(table: 'pa.Table', columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+    """Inverse of to_arrow_table, optionally only keeping the given columns"""
+    _require_pyarrow()
+    metadata = _metadata(table.schema)
+    return _from_arrow(table.select(_read_columns(columns)) if columns is not None else table, metadata, columns)
+
+
+def _read_columns(columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """The columns to read for a projection, the id column is always needed to index the rows"""
+    if columns is None:
+        return None
+    columns = list(columns)
+    return columns if INDEX_COLUMN in columns else [INDEX_COLUMN] + columns
+
+
+def write_parquet(data: Union[Population, 'pd.DataFrame'], path: Any, **kwargs):
+    """Write a Population (or its export) to a Parquet file, extra arguments are passed to pyarrow.parquet.write_table"""
+    parquet.write_table(to_arrow_table(data), path, **kwargs)
+
+
+def read_parquet(path: Any, columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+    """Read a file written by write_parquet, only the given columns are read from disk"""
+    _require_pyarrow()
+    table = parquet.read_table(path, columns=_read_columns(columns))
+    return _from_arrow(table, _metadata(table.schema), columns)
+
+
+def iter_parquet(path: Any, columns: Optional[Sequence[str]] = None, batch_size: int = 65536) -> Iterator['pd.DataFrame']:
+    """Lazily read a file written by write_parquet as data frames of at most batch_size rows"""
+    _require_pyarrow()
+    parquet_file = parquet.ParquetFile(path)
+    metadata = _metadata(parquet_file.schema_arrow)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=_read_columns(columns)):
+        yield _from_arrow(batch, metadata, columns)
+
+
+def write_feather(data: Union[Population, 'pd.DataFrame'], path: Any, **kwargs):
+    """Write a Population (or its export) to a Feather (Arrow IPC) file, extra arguments are passed to
+    pyarrow.feather.write_feather"""
+    feather.write_feather(to_arrow_table(data), path, **kwargs)
+
+
+def read_feather(path: Any, columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+    """Read a file written by write_feather, the file is memory mapped and only the given columns are read"""
+    _require_pyarrow()
+    table = feather.read_table(path, columns=_read_columns(columns))
+    return _from_arrow(table, _metadata(table.schema), columns)
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
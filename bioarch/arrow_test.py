@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+
+import io
+import os
+import tempfile
+import unittest
+
+
+import pandas as pd
+
+
+from .age import EstimatedAge
+from .arrow import from_arrow_table, iter_parquet, pa, read_feather, read_parquet, to_arrow_table, write_feather, write_parquet
+from .population import Population
+from .population_test import individual_for_test
+from .sex import Sex
+from .synthetic import CohortGenerator
+
+
+def population_for_test():
+    return Population([individual_for_test('id_1', Sex.MALE, {'spear': True, 'pot': False}),
+                       individual_for_test('id_2', None, {'comb': True}),
+                       individual_for_test('id_3', Sex.FEMALE_LIKELY, {})])
+
+
+@unittest.skipIf(pa is None, 'pyarrow not installed')
+class ArrowTest(unittest.TestCase):
+    def setUp(self):
+        self.population = population_for_test()
+        self.df = self.population.to_pd_data_frame()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_arrow_table(self):
+        table = to_arrow_table(self.population)
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('ass_osteological_sex_pelvic_cat').type))
+        self.assertTrue(pa.types.is_integer(table.schema.field('context_body_position_val').type))
+        pd.testing.assert_frame_equal(from_arrow_table(table), self.df)
+
+        columns = ['ass_osteological_sex_pelvic_cat', 'context_body_position_val']
+        pd.testing.assert_frame_equal(from_arrow_table(table, columns=columns), self.df[columns])
+
+        with self.assertRaises(ValueError):
+            to_arrow_table(self.df.drop(columns=['id']))
+        with self.assertRaises(ValueError):
+            from_arrow_table(pa.table({'id': ['id_1']}))
+
+    def test_parquet(self):
+        path = os.path.join(self.directory.name, 'population.parquet')
+        write_parquet(self.population, path)
+        df = read_parquet(path)
+        pd.testing.assert_frame_equal(df, self.df)
+        self.assertTrue(df['ass_osteological_sex_pelvic_cat'].cat.ordered)
+        self.assertEqual(list(df['ass_osteological_sex_pelvic_cat'].cat.categories), list(Sex.dtype().categories))
+        self.assertEqual(str(df['context_body_position_val'].dtype), 'Int64')
+
+        columns = ['ass_osteological_sex_pelvic_cat', 'id']
+        pd.testing.assert_frame_equal(read_parquet(path, columns=columns), self.df[columns])
+
+        buffer = io.BytesIO()
+        write_parquet(self.df, buffer)
+        buffer.seek(0)
+        pd.testing.assert_frame_equal(read_parquet(buffer), self.df)
+
+    def test_iter_parquet(self):
+        path = os.path.join(self.directory.name, 'population.parquet')
+        write_parquet(self.population, path)
+        frames = list(iter_parquet(path, columns=['context_body_position_val'], batch_size=2))
+        self.assertEqual([len(frame) for frame in frames], [2, 1])
+        pd.testing.assert_frame_equal(pd.concat(frames), self.df[['context_body_position_val']])
+
+    def test_feather(self):
+        path = os.path.join(self.directory.name, 'population.feather')
+        write_feather(self.population, path)
+        pd.testing.assert_frame_equal(read_feather(path), self.df)
+        columns = ['ass_age_category_cat']
+        pd.testing.assert_frame_equal(read_feather(path, columns=columns), self.df[columns])
+
+    def test_age_ranges(self):
+        individuals = CohortGenerator(seed=3).population(6).individuals
+        individuals[1].age_sex_stature.age = EstimatedAge('ADULT', None)
+        individuals[2].age_sex_stature.age = EstimatedAge('ADULT', '20-35')
+        df = Population(individuals).to_pd_data_frame()
+        self.assertTrue(df['ass_age_ranged'].iloc[2].equals(pd.RangeIndex(20, 35)))
+        self.assertIsNone(df['ass_age_ranged'].iloc[1])
+
+        table = to_arrow_table(df)
+        self.assertTrue(pa.types.is_struct(table.schema.field('ass_age_ranged').type))
+        pd.testing.assert_frame_equal(from_arrow_table(table), df)
+
+        path = os.path.join(self.directory.name, 'ranged.parquet')
+        write_parquet(df, path)
+        pd.testing.assert_frame_equal(read_parquet(path), df)
+        columns = ['ass_age_ranged']
+        pd.testing.assert_frame_equal(read_parquet(path, columns=columns), df[columns])
+        pd.testing.assert_frame_equal(pd.concat(iter_parquet(path, columns=columns, batch_size=4)), df[columns])
+
+        path = os.path.join(self.directory.name, 'ranged.feather')
+        write_feather(df, path)
+        pd.testing.assert_frame_equal(read_feather(path), df)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
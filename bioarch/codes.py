@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+
+from enum import Enum
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar
+
+
+import numpy as np
+
+
+from .left_right import best_effort_avg, LeftRight
+
+
+E = TypeVar('E', bound=Enum)
+
+# Enum values are stored as their member's position in the enum (TraumaCategory values are not all ints), -1 for None.
+# -2 in both sides of a pair is a missing LeftRight.
+NA_CODE = -1
+NO_PAIR_CODE = -2
+
+
+class EnumCodes(Generic[E]):
+    """Two way mapping between an enum's members (or None) and small int codes, see NA_CODE"""
+
+    __slots__ = ['enum', 'members', 'names', 'values', '_codes']
+
+    def __init__(self, enum: Type[E]):
+        self.enum = enum
+        self.members: List[E] = list(enum)
+        # Indexed by code, NA_CODE and NO_PAIR_CODE wrap round to the trailing Nones
+        self.names: List[Optional[str]] = [member.name for member in self.members] + [None, None]
+        self.values: List[Any] = [member.value for member in self.members] + [None, None]
+        self._codes: Dict[E, int] = {member: code for code, member in enumerate(self.members)}
+
+    def __len__(self):
+        return len(self.members)
+
+    def encode(self, value: Optional[E]) -> int:
+        if value is None:
+            return NA_CODE
+        code = self._codes.get(value)
+        if code is None:
+            raise ValueError(f'Not a {self.enum.__name__}: "{value}"')
+        return code
+
+    def decode(self, code: int) -> Optional[E]:
+        if code < 0:
+            return None
+        return self.members[code]
+
+    def encode_pair(self, value: Optional[LeftRight]) -> Tuple[int, int]:
+        if value is None:
+            return NO_PAIR_CODE, NO_PAIR_CODE
+        return self.encode(value.left), self.encode(value.right)
+
+    def decode_pair(self, left: int, right: int) -> Optional[LeftRight]:
+        if left == NO_PAIR_CODE:
+            return None
+        return LeftRight(self.decode(left), self.decode(right))
+
+    def encode_fields(self, pairs: Sequence[Optional[LeftRight]], singles: Sequence[Optional[E]]) -> np.ndarray:
+        """int8 codes array of the pairs then the singles, see code_layout"""
+        codes = [code for pair in pairs for code in self.encode_pair(pair)]
+        codes += [self.encode(value) for value in singles]
+        return np.array(codes, dtype=np.int8)
+
+    def avg_table(self, failed: int) -> np.ndarray:
+        """int8 table of the LeftRight.avg codes, indexed by [left code + 2, right code + 2]. failed where the average
+        raises NotImplementedError, NA_CODE for missing pairs."""
+        codes = [NO_PAIR_CODE, NA_CODE] + list(range(len(self.members)))
+        table = np.full((len(codes), len(codes)), NA_CODE, dtype=np.int8)
+        for left in codes[1:]:
+            for right in codes[1:]:
+                try:
+                    table[left + 2, right + 2] = self.encode(best_effort_avg(self.decode(left), self.decode(right)))
+                except NotImplementedError:
+                    table[left + 2, right + 2] = failed
+        return table
+
+
+class CodedField(object):
+    """An enum attribute stored as one code of its owner's int8 codes array"""
+
+    __slots__ = ['codes', 'index']
+
+    def __init__(self, codes: EnumCodes, index: int):
+        self.codes = codes
+        self.index = index
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        if instance is None:
+            return self
+        return self.codes.decode(instance.codes[self.index])
+
+    def __set__(self, instance: Any, value: Any):
+        instance.codes[self.index] = self.codes.encode(value)
+
+
+class CodedPair(object):
+    """A LeftRight of enum attribute stored as two consecutive codes of its owner's int8 codes array"""
+
+    __slots__ = ['codes', 'index']
+
+    def __init__(self, codes: EnumCodes, index: int):
+        self.codes = codes
+        self.index = index
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        if instance is None:
+            return self
+        codes = instance.codes
+        return self.codes.decode_pair(codes[self.index], codes[self.index + 1])
+
+    def __set__(self, instance: Any, value: Any):
+        instance.codes[self.index:self.index + 2] = self.codes.encode_pair(value)
+
+
+def code_layout(pairs: Sequence[str], singles: Sequence[str]) -> Dict[str, int]:
+    """Index of each field in a codes array, the pairs (two codes each) first"""
+    layout = {name: 2 * i for i, name in enumerate(pairs)}
+    layout.update({name: 2 * len(pairs) + i for i, name in enumerate(singles)})
+    return layout
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+from .codes import code_layout, EnumCodes, NA_CODE, NO_PAIR_CODE
+from .joints import JointCondition
+from .left_right import LeftRight
+from .trauma import TraumaCategory
+
+
+class EnumCodesTest(unittest.TestCase):
+    def test_encode(self):
+        codes = EnumCodes(TraumaCategory)
+        self.assertEqual(codes.encode(None), NA_CODE)
+        self.assertEqual(codes.encode(TraumaCategory.PARTIAL_BONE), 1)
+        self.assertEqual(codes.decode(1), TraumaCategory.PARTIAL_BONE)
+        self.assertIsNone(codes.decode(NA_CODE))
+        self.assertEqual(codes.names[NA_CODE], None)
+        self.assertEqual(codes.values[1], 0.5)
+        with self.assertRaises(ValueError):
+            codes.encode(JointCondition.MILD)
+
+    def test_pairs(self):
+        codes = EnumCodes(JointCondition)
+        self.assertEqual(codes.encode_pair(None), (NO_PAIR_CODE, NO_PAIR_CODE))
+        self.assertEqual(codes.encode_pair(LeftRight(JointCondition.MILD, None)), (1, NA_CODE))
+        self.assertIsNone(codes.decode_pair(NO_PAIR_CODE, NO_PAIR_CODE))
+        self.assertEqual(codes.decode_pair(NA_CODE, 2), LeftRight(None, JointCondition.MEDIUM))
+        self.assertEqual(codes.encode_fields([None, LeftRight(JointCondition.MILD, JointCondition.FUSED)], [JointCondition.NORMAL]).tolist(), [-2, -2, 1, 4, 0])
+
+    def test_avg_table(self):
+        table = EnumCodes(JointCondition).avg_table(-3)
+        self.assertEqual(table[1 + 2, 4 + 2], 2)
+        self.assertEqual(table[NA_CODE + 2, 4 + 2], 4)
+        self.assertEqual(table[NO_PAIR_CODE + 2, NO_PAIR_CODE + 2], NA_CODE)
+
+        table = EnumCodes(TraumaCategory).avg_table(-3)
+        self.assertEqual(table[0 + 2, 3 + 2], 3)
+        self.assertEqual(table[2 + 2, 3 + 2], -3)
+
+    def test_code_layout(self):
+        self.assertEqual(code_layout(('a', 'b'), ('c',)), {'a': 0, 'b': 2, 'c': 4})
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+
+
+from collections import OrderedDict
+from typing import Any, Callable, Collection, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+import weakref
+
+
+from .lazy import pandas as pd
+
+
+class Cell(NamedTuple):
+    """A single exported value and the dtype its pandas column should have (None to let pandas infer)"""
+    value: Any
+    dtype: Optional[Any] = None
+
+
+def add_prefix(cells: Dict[str, Cell], prefix: str) -> Dict[str, Cell]:
+    return {f'{prefix}{key}': cell for key, cell in cells.items()}
+
+
+def select_cells(cells: Dict[str, Any], columns: Optional[Collection[str]]) -> Dict[str, Any]:
+    """Only the cells (or column values) of the given columns, all of them for None"""
+    if columns is None:
+        return cells
+    return {key: cell for key, cell in cells.items() if key in columns}
+
+
+def to_pd_data_frame(index: Hashable, cells: Dict[str, Cell]) -> 'pd.DataFrame':
+    """Build the single row, "id" indexed, data frame used by the per section exporters"""
+    data = {
+        'id': pd.Series([index]),
+    }
+    for key, cell in cells.items():
+        data[key] = pd.Series([cell.value], copy=True, dtype=cell.dtype)
+    return pd.DataFrame.from_dict(data).set_index('id')
+
+
+class ColumnBuilder(object):
+    """Collects rows of cells into plain per column lists so a data frame is only built once.
+
+    Rows do not need to have the same columns (e.g. different grave goods), missing values are filled with None.
+    Columns are ordered by first appearance and take the dtype of the first cell seen for them."""
+
+    __slots__ = ['_index', '_columns', '_dtypes']
+
+    def __init__(self):
+        self._index: List[Hashable] = []
+        self._columns: Dict[str, List[Any]] = {}
+        self._dtypes: Dict[str, Optional[Any]] = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def add_row(self, index: Hashable, cells: Dict[str, Cell]):
+        row = len(self._index)
+        columns = self._columns
+        for key, cell in cells.items():
+            column = columns.get(key)
+            if column is None:
+                column = [None] * row
+                columns[key] = column
+                self._dtypes[key] = cell.dtype
+            column.append(cell.value)
+        self._index.append(index)
+
+        # Only pay for padding when this row did not have every known column
+        if len(cells) != len(columns):
+            for column in columns.values():
+                if len(column) == row:
+                    column.append(None)
+
+    def extend(self, other: 'ColumnBuilder'):
+        """Append all the rows of another builder, keeping this builders column order first"""
+        rows = len(self._index)
+        other_rows = len(other._index)  # pylint: disable=W0212
+        for key, values in other._columns.items():  # pylint: disable=W0212
+            column = self._columns.get(key)
+            if column is None:
+                column = [None] * rows
+                self._columns[key] = column
+                self._dtypes[key] = other._dtypes[key]  # pylint: disable=W0212
+            column.extend(values)
+        for column in self._columns.values():
+            if len(column) == rows:
+                column.extend([None] * other_rows)
+        self._index.extend(other._index)  # pylint: disable=W0212
+
+    def to_pd_data_frame(self) -> 'pd.DataFrame':
+        index = pd.Index(self._index)
+        data = {key: pd.Series(values, index=index, copy=False, dtype=self._dtypes[key]) for key, values in self._columns.items()}
+        return pd.DataFrame(data, index=index, columns=list(self._columns.keys()))
+
+    @staticmethod
+    def from_rows(rows: Iterable[Any]) -> 'ColumnBuilder':
+        """Build from (index, cells) pairs"""
+        builder = ColumnBuilder()
+        for index, cells in rows:
+            builder.add_row(index, cells)
+        return builder
+
+
+# A part's cells and the state key they were built for (see FrameCache.to_pd_data_frame)
+FramePart = Tuple[Hashable, Callable[[], Dict[str, Cell]]]
+
+# Never equal to a part's state key, so the part is rebuilt
+_INVALID = object()
+
+
+class _FrameEntry(object):
+    __slots__ = ['owner_ref', 'index', 'keys', 'spans', 'frame']
+
+    def __init__(self, owner_ref: Any, index: Hashable, keys: Dict[str, Any], spans: Dict[str, Tuple[int, int]], frame: 'pd.DataFrame'):
+        self.owner_ref = owner_ref
+        self.index = index
+        self.keys = keys
+        self.spans = spans
+        self.frame = frame
+
+
+class FrameCache(object):
+    """Bounded LRU cache of one single row data frame per owner (held weakly, the cache never keeps one alive), built
+    from named parts (e.g. an Individual's sections).
+
+    Each part comes with a state key, cheap to compute and only equal while the part's cells are, so nothing is done
+    for an unchanged part: with none changed the cached frame is copied, otherwise only the changed parts are built
+    and joined to the cached columns of the others. maxsize bounds the owners."""
+
+    __slots__ = ['maxsize', '_entries', '__weakref__']
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[int, _FrameEntry]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, owner: Any) -> bool:
+        return self._entry(owner) is not None
+
+    def _entry(self, owner: Any) -> Optional[_FrameEntry]:
+        entry = self._entries.get(id(owner))
+        # id()s are reused once an owner is gone, hence the weak reference check
+        if entry is None or entry.owner_ref() is not owner:
+            return None
+        return entry
+
+    def to_pd_data_frame(self, owner: Any, index: Hashable, parts: Dict[str, FramePart]) -> 'pd.DataFrame':
+        """The frame of the parts' cells in order, a copy the caller is free to change"""
+        if self.maxsize <= 0:
+            cells: Dict[str, Cell] = {}
+            for _, cells_of in parts.values():
+                cells.update(cells_of())
+            return ColumnBuilder.from_rows([(index, cells)]).to_pd_data_frame()
+
+        keys = {name: key for name, (key, _) in parts.items()}
+        entry = self._entry(owner)
+        if entry is not None and entry.index == index and list(entry.keys) == list(keys):
+            changed = [name for name, key in keys.items() if entry.keys[name] != key]
+            if not changed:
+                self._entries.move_to_end(id(owner))
+                return entry.frame.copy()
+            frame, spans = self._rebuild(entry, index, parts, changed)
+        else:
+            frame, spans = self._build(index, parts)
+        self._put(owner, _FrameEntry(None, index, keys, spans, frame))
+        return frame.copy()
+
+    @staticmethod
+    def _build(index: Hashable, parts: Dict[str, FramePart]) -> Tuple['pd.DataFrame', Dict[str, Tuple[int, int]]]:
+        cells: Dict[str, Cell] = {}
+        spans = {}
+        for name, (_, cells_of) in parts.items():
+            start = len(cells)
+            cells.update(cells_of())
+            spans[name] = (start, len(cells))
+        return ColumnBuilder.from_rows([(index, cells)]).to_pd_data_frame(), spans
+
+    @staticmethod
+    def _rebuild(entry: _FrameEntry, index: Hashable, parts: Dict[str, FramePart], changed: List[str]) -> Tuple['pd.DataFrame', Dict[str, Tuple[int, int]]]:
+        frames = []
+        spans = {}
+        position = 0
+        for name, (_, cells_of) in parts.items():
+            if name in changed:
+                frame = ColumnBuilder.from_rows([(index, cells_of())]).to_pd_data_frame()
+            else:
+                start, stop = entry.spans[name]
+                frame = entry.frame.iloc[:, start:stop]
+            spans[name] = (position, position + frame.shape[1])
+            position += frame.shape[1]
+            frames.append(frame)
+        return pd.concat(frames, axis=1, sort=False), spans
+
+    def _put(self, owner: Any, entry: _FrameEntry):
+        key = id(owner)
+        cache_ref = weakref.ref(self)
+
+        # Drops the entry once the owner is gone, without referencing it (or the cache) so it is freed on eviction
+        def forget(owner_ref):
+            cache = cache_ref()
+            if cache is not None:
+                current = cache._entries.get(key)  # pylint: disable=W0212
+                if current is not None and current.owner_ref is owner_ref:
+                    del cache._entries[key]  # pylint: disable=W0212
+
+        entry.owner_ref = weakref.ref(owner, forget)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, owner: Any, name: Optional[str] = None):
+        """Have the owner's part called name, or all of its parts, rebuilt next time"""
+        entry = self._entry(owner)
+        if entry is None:
+            return
+        if name is None:
+            del self._entries[id(owner)]
+        elif name in entry.keys:
+            entry.keys[name] = _INVALID
+
+    def clear(self):
+        self._entries.clear()
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+
+import functools
+import gc
+import unittest
+
+
+from pandas.api.types import CategoricalDtype
+
+
+from .columns import add_prefix, Cell, ColumnBuilder, FrameCache, to_pd_data_frame
+from .sex import Sex
+
+
+class ColumnsTest(unittest.TestCase):
+    def test_add_prefix(self):
+        self.assertEqual(add_prefix({'a': Cell(1)}, 'b_'), {'b_a': Cell(1)})
+
+    def test_to_pd_data_frame(self):
+        df = to_pd_data_frame('id1', {'sex': Cell('MALE', Sex.dtype()), 'val': Cell(None, 'Int64')})
+        self.assertIsInstance(df['sex'].dtype, CategoricalDtype)
+        self.assertEqual(str(df['val'].dtype), 'Int64')
+        self.assertEqual(df.to_json(orient='records'), '[{"sex":"MALE","val":null}]')
+
+
+class ColumnBuilderTest(unittest.TestCase):
+    def test_add_row(self):
+        builder = ColumnBuilder()
+        builder.add_row('id1', {'a': Cell(1, 'Int64'), 'b': Cell('MALE', Sex.dtype())})
+        builder.add_row('id2', {'b': Cell('FEMALE', Sex.dtype()), 'c': Cell(2.5)})
+        builder.add_row('id3', {'a': Cell(3, 'Int64')})
+        self.assertEqual(len(builder), 3)
+
+        df = builder.to_pd_data_frame()
+
+        self.assertEqual(list(df.index), ['id1', 'id2', 'id3'])
+        self.assertEqual(list(df.columns), ['a', 'b', 'c'])
+        self.assertEqual(str(df['a'].dtype), 'Int64')
+        self.assertIsInstance(df['b'].dtype, CategoricalDtype)
+        self.assertEqual(df.to_json(orient='records'), '[{"a":1,"b":"MALE","c":null},{"a":null,"b":"FEMALE","c":2.5},{"a":3,"b":null,"c":null}]')
+
+    def test_extend(self):
+        builder = ColumnBuilder.from_rows([('id1', {'a': Cell(1)})])
+        builder.extend(ColumnBuilder.from_rows([('id2', {'b': Cell(2)}), ('id3', {'a': Cell(3)})]))
+
+        df = builder.to_pd_data_frame()
+
+        self.assertEqual(list(df.index), ['id1', 'id2', 'id3'])
+        self.assertEqual(df.to_json(orient='records'), '[{"a":1.0,"b":null},{"a":null,"b":2.0},{"a":3.0,"b":null}]')
+
+
+class OwnerForTest(object):
+    pass
+
+
+def parts_for_test(built, **values):
+    """Parts keyed on their value, recording the names built"""
+    def cells_of(name, value):
+        built.append(name)
+        return {name: Cell(value)}
+    return {name: (value, functools.partial(cells_of, name, value)) for name, value in values.items()}
+
+
+class FrameCacheTest(unittest.TestCase):
+    def test_cache(self):
+        cache = FrameCache(maxsize=2)
+        owner = OwnerForTest()
+        built = []
+        frame = cache.to_pd_data_frame(owner, 'id1', parts_for_test(built, a=1, b='x'))
+        self.assertEqual(frame.to_json(orient='records'), '[{"a":1,"b":"x"}]')
+        self.assertEqual(built, ['a', 'b'])
+        self.assertIn(owner, cache)
+
+        # Unchanged parts are not built, and the frames are copies
+        frame['a'] = 5
+        built.clear()
+        self.assertEqual(cache.to_pd_data_frame(owner, 'id1', parts_for_test(built, a=1, b='x')).to_json(orient='records'), '[{"a":1,"b":"x"}]')
+        self.assertEqual(built, [])
+
+        # Only changed parts are, keeping the column order and dtypes
+        frame = cache.to_pd_data_frame(owner, 'id1', parts_for_test(built, a=1.5, b='x'))
+        self.assertEqual(built, ['a'])
+        self.assertEqual(list(frame.columns), ['a', 'b'])
+        self.assertEqual(str(frame['a'].dtype), 'float64')
+        self.assertEqual(frame.to_json(orient='records'), '[{"a":1.5,"b":"x"}]')
+
+        # A changed index or parts rebuild everything
+        built.clear()
+        self.assertEqual(cache.to_pd_data_frame(owner, 'id2', parts_for_test(built, a=1.5, b='x')).index[0], 'id2')
+        self.assertEqual(built, ['a', 'b'])
+        built.clear()
+        self.assertEqual(list(cache.to_pd_data_frame(owner, 'id2', parts_for_test(built, b='x', a=1.5)).columns), ['b', 'a'])
+        self.assertEqual(built, ['b', 'a'])
+        self.assertNotIn(OwnerForTest(), cache)
+
+    def test_bounded(self):
+        cache = FrameCache(maxsize=2)
+        owners = [OwnerForTest() for _ in range(3)]
+        for i in range(3):
+            cache.to_pd_data_frame(owners[i], 'id1', parts_for_test([], a=1))
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(owners[0], cache)
+        self.assertIn(owners[2], cache)
+
+        # Entries go with their owner
+        del owners[2]
+        gc.collect()
+        self.assertEqual(len(cache), 1)
+
+        cache = FrameCache(maxsize=0)
+        built = []
+        cache.to_pd_data_frame(owners[0], 'id1', parts_for_test(built, a=1))
+        cache.to_pd_data_frame(owners[0], 'id1', parts_for_test(built, a=1))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(built, ['a', 'a'])
+
+    def test_invalidate(self):
+        cache = FrameCache()
+        owner = OwnerForTest()
+        other = OwnerForTest()
+        built = []
+        for each in (owner, other):
+            cache.to_pd_data_frame(each, 'id1', parts_for_test(built, a=1, b=2))
+        built.clear()
+        cache.invalidate(owner, 'a')
+        cache.to_pd_data_frame(owner, 'id1', parts_for_test(built, a=1, b=2))
+        self.assertEqual(built, ['a'])
+        cache.invalidate(owner)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
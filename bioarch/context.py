@@ -5,11 +5,16 @@ import enum
 from enum import Enum
 import functools
 import logging
-from typing import Any, cast, Dict, Optional
+from typing import Any, cast, Collection, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
 
 
-import pandas as pd
-from pandas.api.types import CategoricalDtype
+import numpy as np
+
+
+from . import instrumentation
+from .columns import add_prefix, Cell, ColumnBuilder, select_cells, to_pd_data_frame
+from .lazy import pandas as pd
+from .parsing import parse_array, parse_many
 
 
 logger = logging.getLogger(__name__)
@@ -34,14 +39,21 @@ class CompassBearing(Enum):
         if type(value) == CompassBearing:  # pylint: disable=C0123
             return cast(CompassBearing, value)
         if not isinstance(value, str):
+            instrumentation.parse_failed(CompassBearing.__name__)
             raise ValueError(f'Failed to parse {CompassBearing.__name__}: "{value}"')
-        value = value.upper()
-        for bearing in CompassBearing:
-            if value == bearing.name:
-                return bearing
-            if value == bearing.to_short_code():
-                return bearing
-        raise ValueError(f'Failed to parse {CompassBearing.__name__}: "{value}"')
+        bearing = _COMPASS_BEARING_ALIASES.get(value.upper())
+        if bearing is not None:
+            return bearing
+        instrumentation.parse_failed(CompassBearing.__name__)
+        raise ValueError(f'Failed to parse {CompassBearing.__name__}: "{value.upper()}"')
+
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['CompassBearing']]:
+        return parse_many(CompassBearing.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(CompassBearing.parse, values)
 
     def to_short_code(self):
         return ''.join([p[0] for p in str(self.name).split('_')])
@@ -63,8 +75,13 @@ class CompassBearing(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in CompassBearing], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in CompassBearing], ordered=True)
+
+
+_COMPASS_BEARING_ALIASES = {bearing.name: bearing for bearing in CompassBearing}
+_COMPASS_BEARING_ALIASES.update({bearing.to_short_code(): bearing for bearing in CompassBearing})
 
 
 @functools.total_ordering
@@ -77,19 +94,34 @@ class Present(Enum):
     def parse(value: Any) -> Optional['Present']:
         if value is None:
             return None
-        if isinstance(value, str) and value.upper() == 'NA':
-            return None
+        if isinstance(value, str):
+            upper = value.upper()
+            if upper in _PRESENT_ALIASES:
+                return _PRESENT_ALIASES[upper]
         if type(value) == Present:  # pylint: disable=C0123
             return cast(Present, value)
         if isinstance(value, bool):
             return Present.PRESENT if value else Present.NOT_PRESENT
-        value = float(value)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            instrumentation.parse_failed(Present.__name__)
+            raise
         if value == 0.0:
             return Present.NOT_PRESENT
         if value > 0.0:
             return Present.PRESENT
+        instrumentation.parse_failed(Present.__name__)
         raise ValueError(f'Failed to parse {Present.__name__}: "{value}"')
 
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['Present']]:
+        return parse_many(Present.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(Present.parse, values)
+
     def __lt__(self, other):
         if other is None:
             return False
@@ -107,8 +139,29 @@ class Present(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in Present], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in Present], ordered=True)
+
+
+_PRESENT_ALIASES = {present.name: present for present in Present}
+_PRESENT_ALIASES.update({
+    'NA': None,
+    '0': Present.NOT_PRESENT,
+    '0.0': Present.NOT_PRESENT,
+    '1': Present.PRESENT,
+    '1.0': Present.PRESENT,
+})
+
+
+def _grave_good_count(value: Any, present: Present) -> float:
+    """How many of a grave good a value records: numbers are counts, aliases (e.g. "PRESENT") and Present are 0 or 1"""
+    if isinstance(value, str) and value.upper() in _PRESENT_ALIASES:
+        return float(present.value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float(present.value)
 
 
 @functools.total_ordering
@@ -125,19 +178,29 @@ class BodyPosition(Enum):
     def parse(value: Any) -> Optional['BodyPosition']:
         if value is None:
             return None
-        if isinstance(value, str) and value.upper() == 'NA':
-            return None
         if type(value) == BodyPosition:  # pylint: disable=C0123
             return cast(BodyPosition, value)
         if isinstance(value, str):
             value = value.upper()
-        for position in BodyPosition:
-            if value == position.name:
-                return position
-            if value == position.value:
-                return position
+            if value == 'NA':
+                return None
+        try:
+            position = _BODY_POSITION_ALIASES.get(value)
+        except TypeError:  # unhashable
+            position = None
+        if position is not None:
+            return position
+        instrumentation.parse_failed(BodyPosition.__name__)
         raise ValueError(f'Failed to parse {BodyPosition.__name__}: "{value}"')
 
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['BodyPosition']]:
+        return parse_many(BodyPosition.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(BodyPosition.parse, values)
+
     def __lt__(self, other):
         if other is None:
             return False
@@ -155,8 +218,15 @@ class BodyPosition(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in BodyPosition], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in BodyPosition], ordered=True)
+
+
+# Both str and int keys, numbers have always been accepted as the enum value
+_BODY_POSITION_ALIASES: Dict[Any, BodyPosition] = {position.name: position for position in BodyPosition}
+_BODY_POSITION_ALIASES.update({position.value: position for position in BodyPosition})
+_BODY_POSITION_ALIASES.update({str(position.value): position for position in BodyPosition})
 
 
 KNOWN_GROUPS = {
@@ -172,10 +242,34 @@ KNOWN_GROUPS = {
     'miscellaneous': set(['lock', 'keys', 'thors_hammer', 'bronze_item', 'bronze_disk', 'quartz', 'unidentified_bronze', 'iron_pole']),
 }
 
+# Grave good to the KNOWN_GROUPS groups it is in
+GRAVE_GOOD_GROUPS: Dict[str, FrozenSet[str]] = {}
+for _group_name, _goods in KNOWN_GROUPS.items():
+    for _good in _goods:
+        GRAVE_GOOD_GROUPS[_good] = GRAVE_GOOD_GROUPS.get(_good, frozenset()) | {_group_name}
+
+# Bit i of a group mask is the i-th KNOWN_GROUPS group
+GROUP_BITS = {group_name: 1 << i for i, group_name in enumerate(KNOWN_GROUPS)}
+_GRAVE_GOOD_MASKS = {good: sum(GROUP_BITS[group_name] for group_name in groups) for good, groups in GRAVE_GOOD_GROUPS.items()}
+
+
+def grave_goods_group_masks(grave_goods: Dict[str, Optional[Present]]) -> Tuple[int, int]:
+    """Masks (see GROUP_BITS) of the groups with a PRESENT good, and of those with a NOT_PRESENT good"""
+    present = 0
+    not_present = 0
+    for good, value in grave_goods.items():
+        if value is Present.PRESENT:
+            present |= _GRAVE_GOOD_MASKS.get(good, 0)
+        elif value is Present.NOT_PRESENT:
+            not_present |= _GRAVE_GOOD_MASKS.get(good, 0)
+    return present, not_present
+
 
 class Context(object):
     """docstring for Context"""
 
+    __slots__ = ['body_position', 'body_orientation', 'disturbed', 'decapitation', 'double_grave', 'stone_layer', 'grave_goods', 'grave_goods_total']
+
     def __init__(self, body_position: Optional[BodyPosition], body_orientation: Optional[CompassBearing], disturbed: Optional[Present], decapitation: Optional[Present], double_grave: Optional[Present], stone_layer: Optional[Present], grave_goods: Dict[str, Optional[Any]]):
         if body_position is not None and not isinstance(body_position, BodyPosition):
             raise ValueError(f'Invalid body_position: "{body_position}"')
@@ -190,62 +284,159 @@ class Context(object):
         self.double_grave = double_grave
         self.stone_layer = stone_layer
 
-        self.grave_goods = {k.lower(): Present.parse(v) for k, v in grave_goods.items()}
-
-        countable_goods = [float(v) for v in grave_goods.values() if Present.parse(v) is not None]  # type: ignore
+        self.grave_goods: Dict[str, Optional[Present]] = {}
+        countable_goods = []
+        for key, value in grave_goods.items():
+            present = Present.parse(value)
+            self.grave_goods[key.lower()] = present
+            if present is not None:
+                countable_goods.append(_grave_good_count(value, present))
         self.grave_goods_total = sum(countable_goods) if len(countable_goods) > 0 else None
 
     @staticmethod
     def empty():
         return Context(None, None, None, None, None, None, {})
 
+    def state_key(self):
+        """All that to_pd_dict reads, the grave goods included"""
+        return (self.body_position, self.body_orientation, self.disturbed, self.decapitation, self.double_grave, self.stone_layer,
+                tuple(self.grave_goods.items()), self.grave_goods_total)
+
     @staticmethod
     def group(value):
-        value = value.lower()
-        groups = set()
-        for group_name, group in KNOWN_GROUPS.items():
-            if value in group:
-                groups.add(group_name)
-        return groups
+        return set(GRAVE_GOOD_GROUPS.get(value.lower(), ()))
 
-    def to_pd_data_frame(self, index):
-        data = {
-            'id': pd.Series([index]),
-        }
+    def group_masks(self) -> Tuple[int, int]:
+        """See grave_goods_group_masks"""
+        return grave_goods_group_masks(self.grave_goods)
+
+    def _item_cells(self) -> Dict[str, Cell]:
+        """The (unprefixed) columns before the group roll-ups"""
+        cells = {}
 
-        data['body_position_cat'] = pd.Series([self.body_position.name if self.body_position else None], copy=True, dtype=BodyPosition.dtype())
-        data['body_position_val'] = pd.Series([self.body_position.value if self.body_position else None], copy=True, dtype='Int64')
+        cells['body_position_cat'] = Cell(self.body_position.name if self.body_position else None, BodyPosition.dtype())
+        cells['body_position_val'] = Cell(self.body_position.value if self.body_position else None, 'Int64')
 
-        data['body_orientation_cat'] = pd.Series([self.body_orientation.name if self.body_orientation else None], copy=True, dtype=CompassBearing.dtype())
-        data['body_orientation_val'] = pd.Series([self.body_orientation.value if self.body_orientation else None], copy=True, dtype='Int64')
+        cells['body_orientation_cat'] = Cell(self.body_orientation.name if self.body_orientation else None, CompassBearing.dtype())
+        cells['body_orientation_val'] = Cell(self.body_orientation.value if self.body_orientation else None, 'Int64')
 
-        data['disturbed_cat'] = pd.Series([self.disturbed.name if self.disturbed else None], copy=True, dtype=Present.dtype())
-        data['decapitation_cat'] = pd.Series([self.decapitation.name if self.decapitation else None], copy=True, dtype=Present.dtype())
-        data['double_grave_cat'] = pd.Series([self.double_grave.name if self.double_grave else None], copy=True, dtype=Present.dtype())
-        data['stone_layer_cat'] = pd.Series([self.stone_layer.name if self.stone_layer else None], copy=True, dtype=Present.dtype())
+        cells['disturbed_cat'] = Cell(self.disturbed.name if self.disturbed else None, Present.dtype())
+        cells['decapitation_cat'] = Cell(self.decapitation.name if self.decapitation else None, Present.dtype())
+        cells['double_grave_cat'] = Cell(self.double_grave.name if self.double_grave else None, Present.dtype())
+        cells['stone_layer_cat'] = Cell(self.stone_layer.name if self.stone_layer else None, Present.dtype())
 
         for key, value in self.grave_goods.items():
-            data[f'all_{key}_cat'] = pd.Series([value.name if value else None], copy=True, dtype=Present.dtype())
-            data[f'all_{key}_val'] = pd.Series([value.value if value else None], copy=True, dtype='Int64')
-
-        per_group_count = None
-        for group_name, group in KNOWN_GROUPS.items():
-            status_set = {v for k, v in self.grave_goods.items() if k in group and v}
-            if Present.PRESENT in status_set:
-                present = Present.PRESENT
-                per_group_count = per_group_count + 1 if per_group_count else 1
-            elif Present.NOT_PRESENT in status_set:
-                present = Present.NOT_PRESENT
-                per_group_count = per_group_count + 0 if per_group_count else 0
-            else:
-                present = None
-            data[f'{group_name}_cat'] = pd.Series([present.name if present else None], copy=True, dtype=Present.dtype())
-            data[f'{group_name}_val'] = pd.Series([present.value if present else None], copy=True, dtype='Int64')
-
-        data['total_grave_goods'] = pd.Series([self.grave_goods_total], copy=True, dtype='Int64')
-        data['total_grave_goods_indicator'] = pd.Series([per_group_count], copy=True, dtype='Int64')
-
-        return pd.DataFrame.from_dict(data).set_index('id')
+            cells[f'all_{key}_cat'] = Cell(value.name if value else None, Present.dtype())
+            cells[f'all_{key}_val'] = Cell(value.value if value else None, 'Int64')
+        return cells
+
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None):
+        """All the columns, or only the given ones, the group roll-ups are skipped when none of them are wanted"""
+        cells = self._item_cells()
+
+        with_rollups = columns is None or any(column in columns for column in _rollup_columns(prefix))
+        if with_rollups:
+            present_mask, not_present_mask = self.group_masks()
+            for group_name, bit in GROUP_BITS.items():
+                if present_mask & bit:
+                    present = Present.PRESENT
+                elif not_present_mask & bit:
+                    present = Present.NOT_PRESENT
+                else:
+                    present = None
+                cells[f'{group_name}_cat'] = Cell(present.name if present else None, Present.dtype())
+                cells[f'{group_name}_val'] = Cell(present.value if present else None, 'Int64')
+
+        cells['total_grave_goods'] = Cell(self.grave_goods_total, 'Int64')
+        if with_rollups:
+            # The number of groups with a PRESENT good, NA when no group has a good with a known status
+            indicator = bin(present_mask).count('1') if present_mask | not_present_mask else None
+            cells['total_grave_goods_indicator'] = Cell(indicator, 'Int64')
+
+        return select_cells(add_prefix(cells, prefix), columns)
+
+    def to_pd_data_frame(self, index):
+        return to_pd_data_frame(index, self.to_pd_dict())
+
+
+def _rollup_columns(prefix: str) -> List[str]:
+    columns = [f'{prefix}{group_name}_{suffix}' for group_name in KNOWN_GROUPS for suffix in ('cat', 'val')]
+    return columns + [f'{prefix}total_grave_goods_indicator']
+
+
+def _int64_series(values: np.ndarray, na: np.ndarray) -> 'pd.Series':
+    series = pd.Series(values, dtype='Int64')
+    if na.any():
+        series[na] = None
+    return series
+
+
+class ContextArray(object):
+    """The Contexts of many individuals with their grave goods as group masks (see grave_goods_group_masks) in two
+    uint16 arrays, so the group roll-ups of a whole batch are computed with array operations."""
+
+    __slots__ = ['contexts', 'present', 'not_present']
+
+    def __init__(self, contexts: Sequence[Context]):
+        self.contexts = list(contexts)
+        masks = np.array([context.group_masks() for context in self.contexts], dtype=np.uint16).reshape(-1, 2)
+        self.present = masks[:, 0]
+        self.not_present = masks[:, 1]
+
+    @staticmethod
+    def from_contexts(contexts: Iterable[Context]) -> 'ContextArray':
+        return ContextArray(list(contexts))
+
+    def __len__(self):
+        return len(self.contexts)
+
+    def __getitem__(self, i: int) -> Context:
+        return self.contexts[i]
+
+    def group_codes(self, group_name: str) -> np.ndarray:
+        """int8 Present value of a group for every context, -1 for NA"""
+        bit = GROUP_BITS[group_name]
+        return np.where(self.present & bit, 1, np.where(self.not_present & bit, 0, -1)).astype(np.int8)
+
+    def total_grave_goods_indicator(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Number of groups with a PRESENT good for every context, and the mask of those where it is NA"""
+        count = np.zeros(len(self.contexts), dtype=np.int64)
+        for bit in GROUP_BITS.values():
+            count += (self.present & bit) != 0
+        return count, (self.present | self.not_present) == 0
+
+    def to_pd_data_frame(self, index=None, prefix='', columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """Same columns as Context.to_pd_dict, or only the given ones, one row per context.
+
+        Columns are ordered as Population.to_pd_data_frame orders rows of differing grave goods."""
+        if not self.contexts:
+            return pd.DataFrame(index=index)
+
+        rows = [(row, select_cells(add_prefix(context._item_cells(), prefix), columns)) for row, context in enumerate(self.contexts)]  # pylint: disable=W0212
+        items = ColumnBuilder.from_rows(rows).to_pd_data_frame()
+        data = {name: items[name].reset_index(drop=True) for name in items.columns}
+
+        rollups = {}
+        with_rollups = columns is None or any(column in columns for column in _rollup_columns(prefix))
+        if with_rollups:
+            for group_name in KNOWN_GROUPS:
+                codes = self.group_codes(group_name)
+                rollups[f'{prefix}{group_name}_cat'] = pd.Series(pd.Categorical.from_codes(codes, dtype=Present.dtype()))
+                rollups[f'{prefix}{group_name}_val'] = _int64_series(codes, codes < 0)
+        rollups[f'{prefix}total_grave_goods'] = pd.Series([context.grave_goods_total for context in self.contexts], dtype='Int64')
+        if with_rollups:
+            rollups[f'{prefix}total_grave_goods_indicator'] = _int64_series(*self.total_grave_goods_indicator())
+        rollups = select_cells(rollups, columns)
+        data.update(rollups)
+
+        # As the rows are built one after the other, the roll-ups follow the first row's grave goods
+        split = len(rows[0][1])
+        names = list(items.columns)
+        order = names[:split] + list(rollups) + names[split:]
+        df = pd.DataFrame({name: data[name] for name in order}, columns=order)
+        if index is not None:
+            df.index = index
+        return df
 
 
 if __name__ == "__main__":
@@ -4,10 +4,12 @@
 import unittest
 
 
+import pandas as pd
 from pandas.api.types import CategoricalDtype
 
 
-from .context import BodyPosition, CompassBearing, Context, Present
+from .columns import ColumnBuilder
+from .context import BodyPosition, CompassBearing, Context, ContextArray, GROUP_BITS, Present
 
 
 class BodyPositionTest(unittest.TestCase):
@@ -22,9 +24,19 @@ class BodyPositionTest(unittest.TestCase):
         self.assertEqual(BodyPosition.parse(4), BodyPosition.CROUCHED_RIGHT_SIDE)
         self.assertEqual(BodyPosition.parse(5), BodyPosition.STOMACH)
 
+        self.assertEqual(BodyPosition.parse('1'), BodyPosition.SUPINE_FLEXED_LEGS)
+
         self.assertEqual(BodyPosition.parse('NA'), None)
         self.assertEqual(BodyPosition.parse(None), None)
 
+        with self.assertRaises(ValueError):
+            BodyPosition.parse(6)
+        with self.assertRaises(ValueError):
+            BodyPosition.parse([])
+
+    def test_parse_many(self):
+        self.assertEqual(BodyPosition.parse_many(['supine', 2, 'NA']), [BodyPosition.SUPINE, BodyPosition.CROUCHED, None])
+
 
 class CompassBearingTest(unittest.TestCase):
     def test_order(self):
@@ -45,8 +57,38 @@ class CompassBearingTest(unittest.TestCase):
     def test_parse(self):
         self.assertEqual(CompassBearing.parse('NORTH'), CompassBearing.NORTH)
         self.assertEqual(CompassBearing.parse('N'), CompassBearing.NORTH)
+        self.assertEqual(CompassBearing.parse('nw'), CompassBearing.NORTH_WEST)
         self.assertEqual(CompassBearing.parse(None), None)
 
+        with self.assertRaises(ValueError):
+            CompassBearing.parse('NNW')
+
+    def test_parse_many(self):
+        self.assertEqual(CompassBearing.parse_array(['N', 'SOUTH']).tolist(), [CompassBearing.NORTH, CompassBearing.SOUTH])
+
+
+class PresentTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(Present.parse(None), None)
+        self.assertEqual(Present.parse('na'), None)
+        self.assertEqual(Present.parse('0'), Present.NOT_PRESENT)
+        self.assertEqual(Present.parse('1'), Present.PRESENT)
+        self.assertEqual(Present.parse('2.5'), Present.PRESENT)
+        self.assertEqual(Present.parse('present'), Present.PRESENT)
+        self.assertEqual(Present.parse(False), Present.NOT_PRESENT)
+        self.assertEqual(Present.parse(3), Present.PRESENT)
+
+        with self.assertRaises(ValueError):
+            Present.parse('-1')
+
+    def test_dtype(self):
+        self.assertIs(Present.dtype(), Present.dtype())
+        self.assertIs(BodyPosition.dtype(), BodyPosition.dtype())
+        self.assertIs(CompassBearing.dtype(), CompassBearing.dtype())
+
+    def test_parse_many(self):
+        self.assertEqual(Present.parse_many([1, 0, 'NA', True]), [Present.PRESENT, Present.NOT_PRESENT, None, Present.PRESENT])
+
 
 class ContextTest(unittest.TestCase):
     def test_constructor_position(self):
@@ -74,6 +116,10 @@ class ContextTest(unittest.TestCase):
         self.assertEqual(Context(None, None, None, None, None, None, {'thing': 'NA'}).grave_goods['thing'], None)
         self.assertEqual(Context(None, None, None, None, None, None, {'thing': 'na'}).grave_goods['thing'], None)
 
+        context = Context(None, None, None, None, None, None, {'knife': 'PRESENT', 'comb': 'not_present', 'spear': '2', 'pot': Present.PRESENT})
+        self.assertEqual(context.grave_goods, {'knife': Present.PRESENT, 'comb': Present.NOT_PRESENT, 'spear': Present.PRESENT, 'pot': Present.PRESENT})
+        self.assertEqual(context.grave_goods_total, 4)
+
         with self.assertRaises(ValueError):
             Context(None, None, None, None, None, None, {'spear': 'foo'})
 
@@ -119,6 +165,16 @@ class ContextTest(unittest.TestCase):
         print(df.to_json(orient='records'))
         self.assertEqual(df.to_json(orient='records'), '[{"body_position_cat":null,"body_position_val":null,"body_orientation_cat":null,"body_orientation_val":null,"disturbed_cat":null,"decapitation_cat":null,"double_grave_cat":null,"stone_layer_cat":null,"all_spear_cat":"PRESENT","all_spear_val":1,"all_comb_cat":null,"all_comb_val":null,"all_knife_cat":null,"all_knife_val":null,"utilitarian_cat":null,"utilitarian_val":null,"textile_cat":null,"textile_val":null,"equestrian_cat":null,"equestrian_val":null,"economic_cat":null,"economic_val":null,"organic_material_cat":null,"organic_material_val":null,"appearance_cat":null,"appearance_val":null,"burial_container_cat":null,"burial_container_val":null,"weapons_cat":"PRESENT","weapons_val":1,"iron_fragment_cat":null,"iron_fragment_val":null,"miscellaneous_cat":null,"miscellaneous_val":null,"total_grave_goods":3,"total_grave_goods_indicator":1}]')
 
+    def test_to_pd_dict_columns(self):
+        context = Context(BodyPosition.SUPINE, None, None, None, None, None, {'spear': True, 'comb': False})
+        full = context.to_pd_dict(prefix='context_')
+
+        cells = context.to_pd_dict(prefix='context_', columns={'context_all_comb_cat', 'context_total_grave_goods'})
+        self.assertEqual(cells, {key: full[key] for key in ('context_all_comb_cat', 'context_total_grave_goods')})
+        cells = context.to_pd_dict(prefix='context_', columns={'context_total_grave_goods_indicator', 'context_weapons_val'})
+        self.assertEqual(cells, {key: full[key] for key in ('context_weapons_val', 'context_total_grave_goods_indicator')})
+        self.assertEqual(context.to_pd_dict(columns=()), {})
+
     def test_known_context_to_group(self):
         known_context_keys = {'knife': set(['utilitarian']),  # Should not be a weapons
                               'Whetstone': set(['utilitarian']),
@@ -172,6 +228,45 @@ class ContextTest(unittest.TestCase):
             actual_groups = Context.group(known_key)
             self.assertEqual(actual_groups, known_groups, msg=f'{known_key} -> {actual_groups} != {known_groups}')
 
+    def test_group_masks(self):
+        context = Context(None, None, None, None, None, None, {'Spear': True, 'sword': False, 'comb': 'NA', 'coins': 0, 'unknown_good': 1})
+        present, not_present = context.group_masks()
+        self.assertEqual(present, GROUP_BITS['weapons'])
+        self.assertEqual(not_present, GROUP_BITS['weapons'] | GROUP_BITS['economic'])
+        self.assertEqual(Context.empty().group_masks(), (0, 0))
+
+
+class ContextArrayTest(unittest.TestCase):
+    contexts = [
+        Context(BodyPosition.SUPINE, None, Present.PRESENT, None, None, None, {'spear': True, 'pot': False}),
+        Context(None, CompassBearing.WEST, None, None, None, None, {}),
+        Context(None, None, None, None, None, None, {'comb': 'NA', 'coins': 0}),
+        Context(None, None, None, None, None, None, {'sword': 2, 'shield_boss': 0, 'beads': 1, 'flower': 1}),
+    ]
+
+    def expected(self, columns=None):
+        rows = [(row, context.to_pd_dict(prefix='context_', columns=columns)) for row, context in enumerate(self.contexts)]
+        return ColumnBuilder.from_rows(rows).to_pd_data_frame()
+
+    def test_to_pd_data_frame(self):
+        array = ContextArray.from_contexts(self.contexts)
+        self.assertEqual(len(array), 4)
+        self.assertIs(array[1], self.contexts[1])
+        pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='context_'), self.expected(), check_index_type=False)
+
+        for columns in ({'context_weapons_cat', 'context_all_sword_val'}, {'context_total_grave_goods', 'context_all_pot_cat'}, {'context_total_grave_goods_indicator'}):
+            pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='context_', columns=columns), self.expected(columns), check_index_type=False)
+
+        self.assertEqual(len(ContextArray([]).to_pd_data_frame().columns), 0)
+
+    def test_group_codes(self):
+        array = ContextArray(self.contexts)
+        self.assertEqual(array.group_codes('weapons').tolist(), [1, -1, -1, 1])
+        self.assertEqual(array.group_codes('economic').tolist(), [-1, -1, 0, -1])
+        count, na = array.total_grave_goods_indicator()
+        self.assertEqual(count.tolist(), [1, 0, 0, 3])
+        self.assertEqual(na.tolist(), [False, True, False, False])
+
 
 def main():
     unittest.main()
@@ -2,15 +2,16 @@
 
 
 import functools
-from typing import Optional
-
-
-import pandas as pd
+import time
+from typing import Any, Collection, Dict, Iterable, Optional, Set
 
 
+from . import instrumentation
 from .age import EstimatedAge
+from .columns import add_prefix, Cell, ColumnBuilder, FrameCache, select_cells, to_pd_data_frame
 from .context import Context
 from .joints import Joints
+from .lazy import pandas as pd
 from .left_right import LeftRight
 from .mouth import Mouth
 from .occupational_markers import OccupationalMarkers
@@ -23,14 +24,40 @@ from .trauma import Trauma
 
 
 class BurialInfo(object):
-    """docstring for BurialInfo"""
+    """The site an individual was found at, immutable"""
+
+    __slots__ = ['name', 'id']
+
     def __init__(self, site_name: str, site_id: str):
         if site_name is None or site_id is None:
             raise ValueError('site_name and site_id required')
         if site_name == '' or site_id == '':
             raise ValueError('site_name and site_id required')
-        self.name = site_name
-        self.id = site_id
+        object.__setattr__(self, 'name', site_name)
+        object.__setattr__(self, 'id', site_id)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if type(other) != type(self):  # pylint: disable=C0123
+            raise NotImplementedError
+        return ((self.name, self.id) == (other.name, other.id))  # pylint: disable=C0325
+
+    def __hash__(self):
+        return hash((self.name, self.id))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (BurialInfo, (self.name, self.id))
+
+    def state_key(self):
+        """Only differs when the exported name and id do (see Individual.to_pd_data_frame)"""
+        return (self.name, self.id)
+
+    def to_pd_dict(self, prefix=''):
+        return {f'{prefix}name': Cell(self.name), f'{prefix}id': Cell(self.id)}
 
     def to_pd_series(self, prefix=''):
         labels = [f'{prefix}{label}' for label in ['name', 'id']]
@@ -39,21 +66,27 @@ class BurialInfo(object):
 
 @functools.total_ordering
 class LongBoneMeasurement(object):
-    """docstring for LongBoneMeasurement"""
+    """A long bone's measurements, immutable"""
+
+    __slots__ = ['max', 'bi', 'head', 'distal']
 
     def __init__(self, _max: Optional[float], bi: Optional[float], head: Optional[float], distal: Optional[float]):
-        self.max = _max
-        self.bi = bi
-        self.head = head
-        self.distal = distal
+        object.__setattr__(self, 'max', _max)
+        object.__setattr__(self, 'bi', bi)
+        object.__setattr__(self, 'head', head)
+        object.__setattr__(self, 'distal', distal)
 
     @staticmethod
     def empty():
-        return LongBoneMeasurement(None, None, None, None)
+        return _EMPTY_LONG_BONE
 
     @staticmethod
     def empty_lr():
-        return LeftRight(LongBoneMeasurement.empty(), LongBoneMeasurement.empty())
+        return _EMPTY_LONG_BONE_LR
+
+    def to_pd_dict(self, prefix=''):
+        labels = ['max', 'bi', 'head', 'distal']
+        return {f'{prefix}{label}': Cell(getattr(self, label), 'float64') for label in labels}
 
     def to_pd_series(self, prefix=''):
         labels = [f'{prefix}{label}' for label in ['max', 'bi', 'head', 'distal']]
@@ -69,31 +102,69 @@ class LongBoneMeasurement(object):
             raise NotImplementedError
         return ((self.max, self.bi, self.head, self.distal) < (other.max, other.bi, other.head, other.distal))  # pylint: disable=C0325
 
+    def __hash__(self):
+        return hash((self.max, self.bi, self.head, self.distal))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (LongBoneMeasurement, (self.max, self.bi, self.head, self.distal))
+
+
+_EMPTY_LONG_BONE = LongBoneMeasurement(None, None, None, None)
+_EMPTY_LONG_BONE_LR = LeftRight(_EMPTY_LONG_BONE, _EMPTY_LONG_BONE)
+
 
 class OsteologicalSex(object):
-    """docstring for OsteologicalSex"""
+    """The sex estimates of an individual, immutable"""
+
+    __slots__ = ['pelvic', 'cranium', 'combined']
+
     def __init__(self, pelvic: Optional[Sex], cranium: Optional[Sex], combined: Optional[Sex]):
-        self.pelvic = pelvic
-        self.cranium = cranium
-        self.combined = combined
+        object.__setattr__(self, 'pelvic', pelvic)
+        object.__setattr__(self, 'cranium', cranium)
+        object.__setattr__(self, 'combined', combined)
 
     @staticmethod
     def empty():
         return OsteologicalSex(None, None, None)
 
+    def to_pd_dict(self, prefix=''):
+        return add_prefix(_osteological_sex_cells(self), prefix)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if type(other) != type(self):  # pylint: disable=C0123
+            raise NotImplementedError
+        return ((self.pelvic, self.cranium, self.combined) == (other.pelvic, other.cranium, other.combined))  # pylint: disable=C0325
+
+    def __hash__(self):
+        return hash((self.pelvic, self.cranium, self.combined))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (OsteologicalSex, (self.pelvic, self.cranium, self.combined))
+
     def to_pd_data_frame(self, index):
-        d = {
-            'id': pd.Series([index]),
-        }
-        for l in ('pelvic', 'cranium', 'combined'):
-            val = getattr(self, l)
-            d[f'{l}_cat'] = pd.Series([val.name if val else None],  copy=True, dtype=Sex.dtype())  # noqa: E241
-            d[f'{l}_val'] = pd.Series([val.value if val else None], copy=True, dtype='Int64')
-            val_bin = val.as_bin() if val else None
-            d[f'{l}_bin_cat'] = pd.Series([val_bin.name if val_bin else None],  copy=True, dtype=Sex.dtype())  # noqa: E241
-            d[f'{l}_bin_val'] = pd.Series([val_bin.value if val_bin else None], copy=True, dtype='Int64')
+        return to_pd_data_frame(index, self.to_pd_dict())
 
-        return pd.DataFrame.from_dict(d).set_index('id')
+
+@functools.lru_cache(maxsize=None)
+def _osteological_sex_cells(sex: OsteologicalSex) -> Dict[str, Cell]:
+    """The (unprefixed, shared so not to be changed) cells of each of the few distinct OsteologicalSex values"""
+    cells = {}
+    for l in ('pelvic', 'cranium', 'combined'):
+        val = getattr(sex, l)
+        cells[f'{l}_cat'] = Cell(val.name if val else None, Sex.dtype())
+        cells[f'{l}_val'] = Cell(val.value if val else None, 'Int64')
+        val_bin = val.as_bin() if val else None
+        cells[f'{l}_bin_cat'] = Cell(val_bin.name if val_bin else None, Sex.dtype())
+        cells[f'{l}_bin_val'] = Cell(val_bin.value if val_bin else None, 'Int64')
+    return cells
 
 
 class AgeSexStature(object):
@@ -118,32 +189,96 @@ class AgeSexStature(object):
     def empty():
         return AgeSexStature(OsteologicalSex.empty(), EstimatedAge.empty(), LongBoneMeasurement.empty_lr(), LongBoneMeasurement.empty_lr(), LongBoneMeasurement.empty_lr(), None, None)
 
-    def to_pd_data_frame(self, index):
-        data = {
-            'id': pd.Series([index]),
-            'stature': pd.Series([self.stature]),
-            'body_mass': pd.Series([self.body_mass]),
-        }
-        df = pd.DataFrame.from_dict(data).set_index('id')
+    def state_key(self):
+        """The (immutable) values, so setting any of them changes it"""
+        return (self.osteological_sex, self.age, self.femur, self.humerus, self.tibia, self.stature, self.body_mass)
 
-        s = pd.Series([])
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None):
+        """All the columns, or only the given ones, skipping the long bones none are wanted from"""
+        cells = {
+            'stature': Cell(self.stature),
+            'body_mass': Cell(self.body_mass),
+        }
         for bone in ('femur', 'humerus', 'tibia'):
+            if columns is not None and not any(column.startswith(f'{prefix}{bone}_') for column in columns):
+                continue
             lr_val = getattr(self, bone)
-            s = s.append(lr_val.left.to_pd_series(prefix=f'{bone}_left_'))
-            s = s.append(lr_val.right.to_pd_series(prefix=f'{bone}_right_'))
-            s = s.append(lr_val.avg().to_pd_series(prefix=f'{bone}_avg_'))
-        long_bones = pd.DataFrame.from_dict({index: s}, orient='index')
-
-        age = self.age.to_pd_data_frame(index).add_prefix(f'age_').rename(columns={f'age_id': 'id'})
-        oss = self.osteological_sex.to_pd_data_frame(index).add_prefix(f'osteological_sex_').rename(columns={f'osteological_sex_id': 'id'})
+            cells.update(lr_val.left.to_pd_dict(prefix=f'{bone}_left_'))
+            cells.update(lr_val.right.to_pd_dict(prefix=f'{bone}_right_'))
+            cells.update(lr_val.avg().to_pd_dict(prefix=f'{bone}_avg_'))
+        cells.update(self.age.to_pd_dict(prefix='age_'))
+        cells.update(self.osteological_sex.to_pd_dict(prefix='osteological_sex_'))
+        return select_cells(add_prefix(cells, prefix), columns)
 
-        return df.join(long_bones, on='id', how='outer') \
-                 .join(age, on='id', how='outer') \
-                 .join(oss, on='id', how='outer')
+    def to_pd_data_frame(self, index):
+        return to_pd_data_frame(index, self.to_pd_dict())
+
+
+# Exported sections of an Individual, in column order, with the prefix given to their columns
+SECTION_PREFIXES = {
+    'site': 'site_',
+    'mouth': 'mouth_',
+    'joints': 'joints_',
+    'age_sex_stature': 'ass_',
+    'occupational_markers': 'om_',
+    'trauma': 'trauma_',
+    'context': 'context_',
+}
+
+# Sections whose to_pd_dict takes a columns argument, to skip the work for columns that are not wanted
+PROJECTED_SECTIONS = frozenset(('mouth', 'joints', 'age_sex_stature', 'occupational_markers', 'trauma', 'context'))
+
+
+def column_section(column: str) -> Optional[str]:
+    """The section an exported column belongs to, None for "id" or an unknown column"""
+    for section, prefix in SECTION_PREFIXES.items():
+        if column.startswith(prefix):
+            return section
+    return None
+
+
+def projected_sections(columns: Optional[Iterable[str]] = None, sections: Optional[Iterable[str]] = None) -> Dict[str, Optional[Set[str]]]:
+    """The sections, in export order, needed for the given whole sections plus the given columns, each with the set
+    of columns wanted from it (None for all of them). Neither given means every section."""
+    if columns is None and sections is None:
+        return {section: None for section in SECTION_PREFIXES}
+    wanted: Dict[str, Optional[Set[str]]] = {}
+    for section in sections or ():
+        if section not in SECTION_PREFIXES:
+            raise ValueError(f'Unknown section: "{section}"')
+        wanted[section] = None
+    for column in columns or ():
+        if column == 'id':
+            continue
+        section = column_section(column)
+        if section is None:
+            raise KeyError(f'Unknown column: "{column}"')
+        if section in wanted and wanted[section] is None:
+            continue
+        wanted.setdefault(section, set()).add(column)  # type: ignore
+    return {section: wanted[section] for section in SECTION_PREFIXES if section in wanted}
+
+
+def section_to_pd_dict(value, section: str, columns: Optional[Collection[str]] = None, prefix: Optional[str] = None) -> Dict[str, Cell]:
+    """The exported cells of one section's value, all or only the given columns"""
+    if prefix is None:
+        prefix = SECTION_PREFIXES[section]
+    if columns is not None and section in PROJECTED_SECTIONS:
+        return value.to_pd_dict(prefix=prefix, columns=columns)
+    return select_cells(value.to_pd_dict(prefix=prefix), columns)
+
+
+# The last Individual.to_pd_data_frame of up to maxsize individuals (about 220KiB each), to only rebuild the sections
+# changed since
+PD_FRAME_CACHE = FrameCache(maxsize=256)
 
 
 class Individual(object):
     """docstring for Individual"""
+
+    # __weakref__ for PD_FRAME_CACHE
+    __slots__ = ['id', 'site', 'age_sex_stature', 'mouth', 'occupational_markers', 'joints', 'trauma', 'context', '__weakref__']
+
     def __init__(self, _id: str, site: BurialInfo, age_sex_stature: AgeSexStature, mouth: Mouth, occupational_markers: OccupationalMarkers, joints: Joints, trauma: Trauma, context: Context):
         self.id = _id
         self.site = site
@@ -154,23 +289,51 @@ class Individual(object):
         self.trauma = trauma
         self.context = context
 
-    def to_pd_data_frame(self):
-        s = pd.Series([self.id], index=['id'], copy=True)
-        s = s.append(self.site.to_pd_series(prefix='site_'))
-        s = s.append(self.mouth.to_pd_series(prefix='mouth_'))
-
-        joints_df = self.joints.to_pd_data_frame(self.id).add_prefix('joints_').rename(columns={f'joints_id': 'id'})
-        ass_df = self.age_sex_stature.to_pd_data_frame(self.id).add_prefix('ass_').rename(columns={f'ass_id': 'id'})
-        om_df = self.occupational_markers.to_pd_data_frame(self.id).add_prefix('om_').rename(columns={f'om_id': 'id'})
-        trauma_df = self.trauma.to_pd_data_frame(self.id).add_prefix('trauma_').rename(columns={f'trauma_id': 'id'})
-        context_df = self.context.to_pd_data_frame(self.id).add_prefix('context_').rename(columns={f'context_id': 'id'})
-
-        df = pd.DataFrame.from_dict({self.id: s}, orient='index')
-        return df.join(joints_df, on='id', how='outer') \
-                 .join(ass_df, on='id', how='outer') \
-                 .join(om_df, on='id', how='outer') \
-                 .join(trauma_df, on='id', how='outer') \
-                 .join(context_df, on='id', how='outer')
+    def to_pd_dict(self):
+        cells = {'id': Cell(self.id)}
+        for section, prefix in SECTION_PREFIXES.items():
+            cells.update(getattr(self, section).to_pd_dict(prefix=prefix))
+        return cells
+
+    def to_pd_data_frame(self, columns: Optional[Iterable[str]] = None, sections: Optional[Iterable[str]] = None):
+        """Only the sections changed (see the sections' state_key) since the last call are built, the others' columns
+        come from PD_FRAME_CACHE.
+
+        With columns and/or sections (see projected_sections) only the "id" column and those are exported, in the
+        full export's order, and no work is done for the others.
+
+        Instrumented (see instrumentation) as "individual.<section>", for each section built, and "individual.join"."""
+        started = time.perf_counter() if instrumentation.ENABLED else None
+        if columns is not None or sections is not None:
+            cells = {'id': Cell(self.id)}
+            for section, section_columns in projected_sections(columns, sections).items():
+                cells.update(section_to_pd_dict(getattr(self, section), section, section_columns))
+                if started is not None:
+                    started = instrumentation.lap(f'individual.{section}', started)
+            df = ColumnBuilder.from_rows([(self.id, cells)]).to_pd_data_frame()
+        else:
+            parts = {'id': (self.id, lambda: {'id': Cell(self.id)})}
+            for section in SECTION_PREFIXES:
+                value = getattr(self, section)
+                parts[section] = (value.state_key(), functools.partial(self._section_cells, section, value))
+            df = PD_FRAME_CACHE.to_pd_data_frame(self, self.id, parts)
+        if started is not None:
+            instrumentation.record('individual.join', started)
+        return df
+
+    @staticmethod
+    def _section_cells(section: str, value: Any) -> Dict[str, Cell]:
+        started = time.perf_counter() if instrumentation.ENABLED else None
+        cells = value.to_pd_dict(prefix=SECTION_PREFIXES[section])
+        if started is not None:
+            instrumentation.record(f'individual.{section}', started)
+        return cells
+
+    def invalidate_pd_cache(self, section: Optional[str] = None):
+        """Have one section (see SECTION_PREFIXES), or all of them, rebuilt by the next to_pd_data_frame"""
+        if section is not None and section not in SECTION_PREFIXES:
+            raise ValueError(f'Unknown section: "{section}"')
+        PD_FRAME_CACHE.invalidate(self, section)
 
 
 if __name__ == "__main__":
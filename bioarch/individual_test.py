@@ -3,21 +3,25 @@
 
 from importlib.resources import open_binary
 import json
+import pickle
 import unittest
 
 
+import pandas as pd
 from pandas.api.types import CategoricalDtype
 
 
 from . import test as bioarch_test
 from .age import EstimatedAge
 from .context import BodyPosition, CompassBearing, Context, Present
-from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex
+from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex, PD_FRAME_CACHE
+from .instrumentation import instrumented
 from .joints import Joints
 from .left_right import LeftRight
-from .mouth import Mouth
+from .mouth import Mouth, Tooth
 from .occupational_markers import OccupationalMarkers
 from .sex import Sex
+from .synthetic import CohortGenerator
 from .trauma import Trauma
 
 
@@ -34,6 +38,16 @@ class OsteologicalSexTest(unittest.TestCase):
         self.assertIsInstance(df['pelvic_bin_cat'].dtypes, CategoricalDtype)
         self.assertEqual(df.to_json(orient='records'), '[{"pelvic_cat":"MALE","pelvic_val":100,"pelvic_bin_cat":"MALE","pelvic_bin_val":100,"cranium_cat":null,"cranium_val":null,"cranium_bin_cat":null,"cranium_bin_val":null,"combined_cat":"MALE_ASSUMED","combined_val":80,"combined_bin_cat":"MALE","combined_bin_val":100}]')
 
+    def test_value_semantics(self):
+        os = OsteologicalSex(Sex.MALE, None, Sex.MALE_ASSUMED)
+        self.assertEqual(os, OsteologicalSex(Sex.MALE, None, Sex.MALE_ASSUMED))
+        self.assertNotEqual(os, OsteologicalSex.empty())
+        self.assertEqual(len({os, OsteologicalSex(Sex.MALE, None, Sex.MALE_ASSUMED)}), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(os)), os)
+        with self.assertRaises(AttributeError):
+            os.combined = Sex.FEMALE
+        self.assertEqual(os.to_pd_dict(prefix='a_')['a_combined_cat'].value, 'MALE_ASSUMED')
+
 
 class AgeSexStatureTest(unittest.TestCase):
     def test_to_pd_series(self):
@@ -82,6 +96,16 @@ class LongBoneMeasurementTest(unittest.TestCase):
         avg_femur = femur.avg()
         self.assertEqual(avg_femur, LongBoneMeasurement.empty())
 
+    def test_value_semantics(self):
+        femur = LongBoneMeasurement(1.0, None, 1.0, None)
+        self.assertEqual(hash(femur), hash(LongBoneMeasurement(1.0, None, 1.0, None)))
+        self.assertEqual(pickle.loads(pickle.dumps(femur)), femur)
+        self.assertIs(LongBoneMeasurement.empty(), LongBoneMeasurement.empty())
+        with self.assertRaises(AttributeError):
+            femur.max = 2.0
+        with self.assertRaises(AttributeError):
+            femur.other = 2.0
+
 
 class IndividualTest(unittest.TestCase):
     def test_basic(self):
@@ -96,6 +120,19 @@ class IndividualTest(unittest.TestCase):
         individual = Individual('id_1', burial_info, age_sex_sature, mouth, occupational_markers, joints, trauma, context)
 
         self.assertEqual(individual.id, 'id_1')
+        for value in (individual, burial_info, occupational_markers, context):
+            self.assertFalse(hasattr(value, '__dict__'))
+
+    def test_burial_info(self):
+        burial_info = BurialInfo('site_name', 'site_id')
+        self.assertEqual(burial_info, BurialInfo('site_name', 'site_id'))
+        self.assertNotEqual(burial_info, BurialInfo('site_name', 'other_id'))
+        self.assertEqual(len({burial_info, BurialInfo('site_name', 'site_id')}), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(burial_info)), burial_info)
+        with self.assertRaises(AttributeError):
+            burial_info.name = 'other'
+        with self.assertRaises(ValueError):
+            BurialInfo('', 'site_id')
 
     def test_to_pd_data_frame(self):
         burial_info = BurialInfo('site_name', 'site_id')
@@ -117,6 +154,86 @@ class IndividualTest(unittest.TestCase):
 
         self.assertEqual(actual_json, expected_json)
 
+    def test_to_pd_data_frame_cached(self):
+        context = Context(BodyPosition.SUPINE, CompassBearing.WEST, Present.PRESENT, Present.NOT_PRESENT, None, None, {'spear': True})
+        individual = Individual('id_1', BurialInfo('site_name', 'site_id'), AgeSexStature.empty(), Mouth.empty(), OccupationalMarkers.empty(), Joints.empty(), Trauma.empty(), context)
+        first = individual.to_pd_data_frame()
+        self.assertEqual(individual.to_pd_data_frame().to_json(orient='records'), first.to_json(orient='records'))
+
+        # In place edits of a section are picked up
+        individual.age_sex_stature.osteological_sex = OsteologicalSex(None, None, Sex.FEMALE)
+        df = individual.to_pd_data_frame()
+        self.assertEqual(df['ass_osteological_sex_combined_cat'][0], 'FEMALE')
+        self.assertEqual(df['context_all_spear_cat'][0], 'PRESENT')
+        individual.id = 'id_2'
+        df = individual.to_pd_data_frame()
+        self.assertEqual(list(df.index), ['id_2'])
+        expected_json = df.to_json(orient='records')
+
+        # Returned frames are copies
+        df['context_all_spear_val'] = 0
+        self.assertEqual(individual.to_pd_data_frame().to_json(orient='records'), expected_json)
+
+        individual.invalidate_pd_cache('mouth')
+        self.assertEqual(individual.to_pd_data_frame().to_json(orient='records'), expected_json)
+        individual.invalidate_pd_cache()
+        self.assertEqual(individual.to_pd_data_frame().to_json(orient='records'), expected_json)
+        with self.assertRaises(ValueError):
+            individual.invalidate_pd_cache('teeth')
+
+        maxsize = PD_FRAME_CACHE.maxsize
+        try:
+            PD_FRAME_CACHE.maxsize = 0
+            self.assertEqual(individual.to_pd_data_frame().to_json(orient='records'), expected_json)
+        finally:
+            PD_FRAME_CACHE.maxsize = maxsize
+
+    def test_to_pd_data_frame_cached_sections(self):
+        individual = CohortGenerator(seed=5).population(1).individuals[0]
+        individual.to_pd_data_frame()
+
+        def uncached():
+            maxsize = PD_FRAME_CACHE.maxsize
+            try:
+                PD_FRAME_CACHE.maxsize = 0
+                return individual.to_pd_data_frame()
+            finally:
+                PD_FRAME_CACHE.maxsize = maxsize
+
+        # Only the edited section is built, in place edits of the codes and grave goods included
+        edits = [
+            ('age_sex_stature', lambda: setattr(individual.age_sex_stature, 'stature', '170')),
+            ('joints', lambda: individual.joints.codes.__setitem__(0, 3)),
+            ('context', lambda: individual.context.grave_goods.__setitem__('knife', Present.NOT_PRESENT)),
+            ('mouth', lambda: individual.mouth.teeth.__setitem__(0, Tooth.empty())),
+        ]
+        for section, edit in edits:
+            edit()
+            with instrumented() as stats:
+                df = individual.to_pd_data_frame()
+            self.assertEqual([name for name in stats.sections if name != 'individual.join'], [f'individual.{section}'])
+            pd.testing.assert_frame_equal(df, uncached())
+
+        with instrumented() as stats:
+            df = individual.to_pd_data_frame()
+        self.assertEqual(list(stats.sections), ['individual.join'])
+        pd.testing.assert_frame_equal(df, uncached())
+
+    def test_to_pd_data_frame_projection(self):
+        context = Context(BodyPosition.SUPINE, None, Present.PRESENT, None, None, None, {'spear': True, 'comb': False})
+        individual = Individual('id_1', BurialInfo('site_name', 'site_id'), AgeSexStature.empty(), Mouth.empty(), OccupationalMarkers.empty(), Joints.empty(), Trauma.empty(), context)
+        full = individual.to_pd_data_frame()
+
+        columns = ['context_all_comb_val', 'context_weapons_cat', 'site_name', 'mouth_all_number_of_teeth', 'om_max_right']
+        df = individual.to_pd_data_frame(columns=columns)
+        self.assertEqual(list(df.columns), ['id', 'site_name', 'mouth_all_number_of_teeth', 'om_max_right', 'context_all_comb_val', 'context_weapons_cat'])
+        self.assertEqual(df.to_json(orient='records'), full[df.columns].to_json(orient='records'))
+        self.assertEqual(dict(df.dtypes), dict(full[df.columns].dtypes))
+
+        df = individual.to_pd_data_frame(sections=['joints'])
+        self.assertEqual(list(df.columns), ['id'] + [column for column in full.columns if column.startswith('joints_')])
+        self.assertEqual(df.to_json(orient='records'), full[df.columns].to_json(orient='records'))
+
 
 def main():
     unittest.main()
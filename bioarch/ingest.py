@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import csv
+from itertools import islice
+import os
+import queue
+import threading
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+
+from .individual import BurialInfo, Individual
+from .io import parse_row, Schema
+from .population import DEFAULT_CHUNK_SIZE
+
+
+DEFAULT_IO_THREADS = 4
+
+# How long a blocked reader waits before checking whether ingestion was stopped
+_POLL_SECONDS = 0.1
+
+# The (source index, first row number, rows) chunks readers queue, rows is None once the source is read or the
+# exception reading it raised
+Chunk = Tuple[int, int, Any]
+
+
+class Source(object):
+    """A recording sheet (CSV file) to ingest.
+
+    When site is given every row is from that site: rows without a site get it, rows with another site fail. schema
+    overrides the one given to ingest."""
+
+    __slots__ = ['path', 'site', 'schema']
+
+    def __init__(self, path: Any, site: Optional[BurialInfo] = None, schema: Optional[Schema] = None):
+        self.path = path
+        self.site = site
+        self.schema = schema
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path!r}, {self.site!r})'
+
+    def __str__(self):
+        return os.fspath(self.path)
+
+
+class _Stopped(Exception):
+    """Ingestion was stopped while a reader was blocked"""
+
+
+def _with_site(row: Mapping[str, Any], schema: Schema, site: BurialInfo) -> Mapping[str, Any]:
+    row = dict(row)
+    for field, value in (('site_name', site.name), ('site_id', site.id)):
+        column = schema.columns[field]
+        recorded = schema.normalise(row.get(column))
+        if recorded is not None and str(recorded) != value:
+            raise ValueError(f'{field} "{recorded}" is not the source\'s "{value}"')
+        row[column] = value
+    return row
+
+
+def _parse_chunk(name: str, first_row: int, rows: List[Mapping[str, Any]], schema: Schema, site: Optional[BurialInfo]) -> List[Individual]:
+    individuals = []
+    for row_number, row in enumerate(rows, first_row):
+        try:
+            individuals.append(parse_row(row if site is None else _with_site(row, schema, site), schema))
+        except ValueError as e:
+            raise ValueError(f'Failed to parse {name} row {row_number}: {e}') from e
+    return individuals
+
+
+def _read_source(index: int, source: Source, chunk_size: int, put: Callable[[Chunk], None]):
+    try:
+        with open(source.path, mode='r', newline='', encoding='utf-8') as csv_file:
+            rows = csv.DictReader(csv_file)
+            first_row = 0
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                put((index, first_row, chunk))
+                first_row += len(chunk)
+    except _Stopped:
+        return
+    except Exception as e:  # pylint: disable=W0703
+        put((index, 0, e))
+        return
+    put((index, 0, None))
+
+
+def _drain(chunks: 'queue.Queue', sources: int) -> Iterator[Chunk]:
+    """The queued chunks until the given number of sources are read"""
+    while sources > 0:
+        chunk = chunks.get()
+        rows = chunk[2]
+        if rows is None:
+            sources -= 1
+        elif isinstance(rows, Exception):
+            raise rows
+        else:
+            yield chunk
+
+
+def ingest(sources: Iterable[Union[Source, Any]], schema: Optional[Schema] = None, ordered: bool = True, processes: Optional[int] = None,
+           io_threads: int = DEFAULT_IO_THREADS, chunk_size: int = DEFAULT_CHUNK_SIZE, max_pending: Optional[int] = None) -> Iterator[Individual]:
+    """Stream the Individuals of many recording sheets (Sources or CSV file paths).
+
+    io_threads threads read the files, chunk_size rows at a time, while a pool of processes (default one per CPU, or
+    this thread when processes is 1) parses the chunks. The queues between them are bounded: a reader waits once
+    max_pending (default two per process) of its chunks are queued, and no more than max_pending chunks are being
+    parsed or waiting to be consumed. Individuals are in the sources' and rows' order when ordered, otherwise each
+    chunk's are yielded as soon as it is parsed."""
+    if chunk_size < 1:
+        raise ValueError(f'Invalid chunk_size: {chunk_size}')
+    if processes is not None and processes < 1:
+        raise ValueError(f'Invalid processes: {processes}')
+    if io_threads < 1:
+        raise ValueError(f'Invalid io_threads: {io_threads}')
+    if max_pending is None:
+        max_pending = 2 * (processes or os.cpu_count() or 1)
+    if max_pending < 1:
+        raise ValueError(f'Invalid max_pending: {max_pending}')
+    sources = [source if isinstance(source, Source) else Source(source) for source in sources]
+    return _ingest(sources, schema or Schema(), ordered, processes, io_threads, chunk_size, max_pending)
+
+
+def _ingest(sources: List[Source], schema: Schema, ordered: bool, processes: Optional[int], io_threads: int, chunk_size: int,
+            max_pending: int) -> Iterator[Individual]:
+    stop = threading.Event()
+
+    def putter(chunks: 'queue.Queue') -> Callable[[Chunk], None]:
+        def put(chunk: Chunk):
+            while True:
+                if stop.is_set():
+                    raise _Stopped
+                try:
+                    chunks.put(chunk, timeout=_POLL_SECONDS)
+                    return
+                except queue.Full:
+                    pass
+        return put
+
+    # Ordered, each source has its own queue, drained in the sources' order. Readers are started in the same order, so
+    # the source being drained is always being read.
+    queues = [queue.Queue(maxsize=max_pending) for _ in (sources if ordered else [None])]
+    readers = ThreadPoolExecutor(max_workers=io_threads)
+    parsers = ProcessPoolExecutor(max_workers=processes) if processes != 1 else None
+    pending: Deque[Future] = deque()
+
+    def submit(chunk: Chunk) -> Future:
+        index, first_row, rows = chunk
+        source = sources[index]
+        args = (str(source), first_row, rows, source.schema or schema, source.site)
+        if parsers is not None:
+            return parsers.submit(_parse_chunk, *args)
+        future: Future = Future()
+        try:
+            future.set_result(_parse_chunk(*args))
+        except ValueError as e:
+            future.set_exception(e)
+        return future
+
+    try:
+        for index, source in enumerate(sources):
+            readers.submit(_read_source, index, source, chunk_size, putter(queues[index if ordered else 0]))
+
+        if ordered:
+            for chunks in queues:
+                for chunk in _drain(chunks, 1):
+                    pending.append(submit(chunk))
+                    while len(pending) >= max_pending or (pending and pending[0].done()):
+                        yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            def completed(block: bool) -> List[Future]:
+                done = [future for future in pending if future.done()]
+                if block and not done:
+                    done = list(wait(pending, return_when=FIRST_COMPLETED).done)
+                for future in done:
+                    pending.remove(future)
+                return done
+
+            for chunk in _drain(queues[0], len(sources)):
+                pending.append(submit(chunk))
+                for future in completed(len(pending) >= max_pending):
+                    yield from future.result()
+            while pending:
+                for future in completed(True):
+                    yield from future.result()
+    finally:
+        stop.set()
+        for future in pending:
+            future.cancel()
+        readers.shutdown(wait=True)
+        if parsers is not None:
+            parsers.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
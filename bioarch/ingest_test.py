@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+
+import pandas as pd
+
+
+from .individual import BurialInfo
+from .ingest import ingest, Source
+from .io import read_csv
+from .population import Population
+from .synthetic import CohortGenerator
+
+
+def write_csv(path, rows):
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with open(path, mode='w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class IngestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        generator = CohortGenerator(seed=11)
+        self.paths = []
+        for site in range(4):
+            path = os.path.join(self.directory, f'site_{site}.csv')
+            write_csv(path, generator.rows(15 + site))
+            self.paths.append(path)
+        self.expected = Population([individual for path in self.paths for individual in read_csv(path)]).to_pd_data_frame()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ordered(self):
+        individuals = list(ingest(self.paths, processes=1, chunk_size=4, max_pending=2))
+        pd.testing.assert_frame_equal(Population(individuals).to_pd_data_frame(), self.expected)
+
+    def test_processes(self):
+        individuals = list(ingest(self.paths, processes=2, io_threads=2, chunk_size=4))
+        pd.testing.assert_frame_equal(Population(individuals).to_pd_data_frame(), self.expected)
+
+        individuals = list(ingest(self.paths, ordered=False, processes=2, chunk_size=4))
+        self.assertCountEqual([individual.id for individual in individuals], list(self.expected['id']))
+
+    def test_unordered(self):
+        individuals = list(ingest(self.paths, ordered=False, processes=1, io_threads=3, chunk_size=5, max_pending=1))
+        self.assertCountEqual([individual.id for individual in individuals], list(self.expected['id']))
+
+    def test_site(self):
+        rows = CohortGenerator(seed=12).rows(3)
+        for row in rows:
+            del row['site_name']
+            del row['site_id']
+        path = os.path.join(self.directory, 'no_site.csv')
+        write_csv(path, rows)
+        site = BurialInfo('Site B', 'B1')
+        individuals = list(ingest([Source(path, site=site)], processes=1))
+        self.assertEqual([individual.site for individual in individuals], [site] * 3)
+
+        with self.assertRaises(ValueError):
+            list(ingest([path], processes=1))
+        with self.assertRaisesRegex(ValueError, 'site_0.csv row 0'):
+            list(ingest([Source(self.paths[0], site=site)], processes=1))
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            list(ingest(self.paths + [os.path.join(self.directory, 'missing.csv')], processes=1))
+        with self.assertRaises(ValueError):
+            ingest(self.paths, chunk_size=0)
+        with self.assertRaises(ValueError):
+            ingest(self.paths, processes=0)
+        with self.assertRaises(ValueError):
+            ingest(self.paths, io_threads=0)
+
+    def test_stop_early(self):
+        individuals = ingest(self.paths, processes=1, chunk_size=2, max_pending=1)
+        first = next(individuals)
+        individuals.close()
+        self.assertEqual(first.id, self.expected['id'].iloc[0])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
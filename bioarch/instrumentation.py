@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+
+from collections import Counter
+from contextlib import contextmanager
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+
+from .lazy import pandas as pd
+
+
+# Checked inline on the hot paths (so disabled costs one attribute lookup), only set by enable and disable:
+#
+#     started = time.perf_counter() if instrumentation.ENABLED else None
+#     ...
+#     if started is not None:
+#         instrumentation.record('section', started, rows)
+ENABLED = False
+
+
+class Event(NamedTuple):
+    """What hooks are called with: a timed section (kind "section") or an enum's failed parse (kind "parse_failure")"""
+    kind: str
+    name: str
+    seconds: float = 0.0
+    rows: int = 0
+
+
+Hook = Callable[[Event], None]
+
+
+class SectionStats(object):
+    __slots__ = ['calls', 'seconds', 'rows']
+
+    def __init__(self, calls: int = 0, seconds: float = 0.0, rows: int = 0):
+        self.calls = calls
+        self.seconds = seconds
+        self.rows = rows
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.calls}, {self.seconds}, {self.rows})'
+
+
+class Stats(object):
+    """What was recorded while instrumentation was enabled: per section (e.g. "population.mouth" or "parse.joints")
+    wall time, calls and rows produced, and per enum the number of values that failed to parse.
+
+    Only counts this process, not the workers of the parallel exports or ingestion."""
+
+    __slots__ = ['sections', 'parse_failures']
+
+    def __init__(self):
+        self.sections: Dict[str, SectionStats] = {}
+        self.parse_failures: Counter = Counter()
+
+    def add(self, section: str, seconds: float, rows: int = 1):
+        stats = self.sections.get(section)
+        if stats is None:
+            stats = self.sections[section] = SectionStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.rows += rows
+
+    def merge(self, other: 'Stats') -> 'Stats':
+        """Add the counts of other to these"""
+        for section, stats in other.sections.items():
+            mine = self.sections.setdefault(section, SectionStats())
+            mine.calls += stats.calls
+            mine.seconds += stats.seconds
+            mine.rows += stats.rows
+        self.parse_failures.update(other.parse_failures)
+        return self
+
+    def reset(self):
+        self.sections.clear()
+        self.parse_failures.clear()
+
+    def to_pd_data_frame(self) -> 'pd.DataFrame':
+        """One row per section, slowest first"""
+        sections = sorted(self.sections, key=lambda section: -self.sections[section].seconds)
+        df = pd.DataFrame({
+            'calls': pd.Series([self.sections[section].calls for section in sections], dtype='int64'),
+            'seconds': pd.Series([self.sections[section].seconds for section in sections], dtype='float64'),
+            'rows': pd.Series([self.sections[section].rows for section in sections], dtype='int64'),
+        }, columns=['calls', 'seconds', 'rows'])
+        df.index = pd.Index(sections, name='section')
+        return df
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self}'
+
+    def __str__(self):
+        return f'{len(self.sections)} sections, {sum(self.parse_failures.values())} parse failures'
+
+
+STATS = Stats()
+
+_HOOKS: List[Hook] = []
+
+# Per thread depth of uncounted blocks
+_UNCOUNTED = threading.local()
+
+
+def enable(hook: Optional[Hook] = None):
+    """Start recording into STATS, also calling hook (if given) with every Event"""
+    global ENABLED  # pylint: disable=W0603
+    if hook is not None:
+        _HOOKS.append(hook)
+    ENABLED = True
+
+
+def disable():
+    """Stop recording and drop the hooks, STATS is kept"""
+    global ENABLED  # pylint: disable=W0603
+    ENABLED = False
+    _HOOKS.clear()
+
+
+@contextmanager
+def instrumented(hook: Optional[Hook] = None) -> Iterator[Stats]:
+    """Enabled, with STATS reset, for the duration of the block, which gets STATS"""
+    was_enabled = ENABLED
+    hooks = list(_HOOKS)
+    STATS.reset()
+    enable(hook)
+    try:
+        yield STATS
+    finally:
+        disable()
+        _HOOKS.extend(hooks)
+        if was_enabled:
+            enable()
+
+
+def record(section: str, started: float, rows: int = 1):
+    """Add one call of section, started at the given time.perf_counter(), to STATS"""
+    seconds = time.perf_counter() - started
+    STATS.add(section, seconds, rows)
+    for hook in _HOOKS:
+        hook(Event('section', section, seconds, rows))
+
+
+def lap(section: str, started: float, rows: int = 1) -> float:
+    """record then return the time the next section starts at"""
+    record(section, started, rows)
+    return time.perf_counter()
+
+
+@contextmanager
+def uncounted() -> Iterator[None]:
+    """parse_failed is a no-op, in this thread, for the duration of the block (e.g. while re-checking rejected values)"""
+    _UNCOUNTED.depth = getattr(_UNCOUNTED, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _UNCOUNTED.depth -= 1
+
+
+def parse_failed(enum_name: str):
+    """Count a value that enum_name's parse rejected, a no-op when disabled"""
+    if not ENABLED or getattr(_UNCOUNTED, 'depth', 0):
+        return
+    STATS.parse_failures[enum_name] += 1
+    for hook in _HOOKS:
+        hook(Event('parse_failure', enum_name))
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+from . import instrumentation
+from .instrumentation import Event, instrumented, Stats
+from .io import read_rows
+from .joints import JointCondition
+from .population import Population
+from .sex import Sex
+from .synthetic import CohortGenerator
+from .trauma import TraumaCategory
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.generator = CohortGenerator(seed=13)
+        self.rows = self.generator.rows(6)
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.STATS.reset()
+
+    def test_disabled(self):
+        instrumentation.STATS.reset()
+        individuals = list(read_rows(self.rows))
+        Population(individuals).to_pd_data_frame()
+        individuals[0].to_pd_data_frame()
+        with self.assertRaises(ValueError):
+            TraumaCategory.parse('not a category')
+        self.assertEqual(instrumentation.STATS.sections, {})
+        self.assertEqual(sum(instrumentation.STATS.parse_failures.values()), 0)
+
+    def test_sections(self):
+        events = []
+        with instrumented(events.append) as stats:
+            individuals = list(read_rows(self.rows))
+            Population(individuals).to_pd_data_frame()
+            individuals[0].to_pd_data_frame(sections=['mouth'])
+        self.assertFalse(instrumentation.ENABLED)
+
+        self.assertEqual(stats.sections['parse.mouth'].calls, 6)
+        self.assertEqual(stats.sections['population.mouth'].calls, 1)
+        self.assertEqual(stats.sections['population.mouth'].rows, 6)
+        self.assertEqual(stats.sections['population.join'].rows, 6)
+        self.assertEqual(stats.sections['individual.mouth'].calls, 1)
+        self.assertEqual(stats.sections['individual.join'].calls, 1)
+        self.assertNotIn('individual.trauma', stats.sections)
+        self.assertTrue(all(section.seconds >= 0 for section in stats.sections.values()))
+
+        self.assertEqual(len(events), sum(section.calls for section in stats.sections.values()))
+        self.assertEqual(events[0].kind, 'section')
+
+        df = stats.to_pd_data_frame()
+        self.assertEqual(list(df.columns), ['calls', 'seconds', 'rows'])
+        self.assertEqual(set(df.index), set(stats.sections))
+        self.assertEqual(df.loc['parse.joints', 'calls'], 6)
+
+    def test_parse_failures(self):
+        events = []
+        with instrumented(events.append) as stats:
+            self.assertEqual(Sex.parse('not a sex'), Sex.UNKNOWN)
+            for parse, value in ((JointCondition.parse, 'bad'), (TraumaCategory.parse, []), (TraumaCategory.parse, 'bad')):
+                with self.assertRaises(ValueError):
+                    parse(value)
+            self.assertEqual(TraumaCategory.parse('1'), TraumaCategory.NORMAL)
+        self.assertEqual(dict(stats.parse_failures), {'Sex': 1, 'JointCondition': 1, 'TraumaCategory': 2})
+        self.assertEqual(events[0], Event('parse_failure', 'Sex'))
+
+    def test_enable(self):
+        events = []
+        instrumentation.enable(events.append)
+        read_rows(self.rows).__next__()
+        instrumentation.disable()
+        read_rows(self.rows).__next__()
+        self.assertEqual(instrumentation.STATS.sections['parse.site'].calls, 1)
+        self.assertEqual(len(events), 7)
+
+        with instrumented():
+            with instrumented() as stats:
+                read_rows(self.rows).__next__()
+            self.assertTrue(instrumentation.ENABLED)
+        self.assertEqual(stats.sections['parse.site'].calls, 1)
+
+    def test_merge(self):
+        first = Stats()
+        first.add('parse.mouth', 1.0, 2)
+        second = Stats()
+        second.add('parse.mouth', 0.5)
+        second.add('parse.site', 0.25)
+        second.parse_failures['Sex'] += 2
+        first.merge(second)
+        self.assertEqual((first.sections['parse.mouth'].calls, first.sections['parse.mouth'].seconds, first.sections['parse.mouth'].rows), (2, 1.5, 3))
+        self.assertEqual(first.sections['parse.site'].calls, 1)
+        self.assertEqual(first.parse_failures['Sex'], 2)
+        self.assertEqual(list(first.to_pd_data_frame().index), ['parse.mouth', 'parse.site'])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
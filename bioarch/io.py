@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+
+import csv
+from itertools import islice
+import logging
+import math
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+
+from . import instrumentation
+from .age import EstimatedAge
+from .context import BodyPosition, CompassBearing, Context, Present
+from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex
+from .joints import JointCondition, Joints, JOINTS_LEFT_RIGHT, JOINTS_SINGLE
+from .lazy import pandas as pd
+from .left_right import LeftRight
+from .mouth import Mouth, TOOTH_LABELS
+from .occupational_markers import EnthesialMarker, MUSCLES, OccupationalMarkers
+from .population import Population
+from .sex import Sex
+from .trauma import Trauma, TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE, TraumaCategory
+
+
+logger = logging.getLogger(__name__)
+
+
+LONG_BONES = ('femur', 'humerus', 'tibia')
+LONG_BONE_MEASUREMENTS = ('max', 'bi', 'head', 'distal')
+CONTEXT_PRESENT = ('disturbed', 'decapitation', 'double_grave', 'stone_layer')
+
+
+def _fields() -> List[str]:
+    fields = ['id', 'site_name', 'site_id']
+    fields += ['sex_pelvic', 'sex_cranium', 'sex_combined', 'age_category', 'age_range', 'stature', 'body_mass']
+    fields += [f'{bone}_{side}_{measurement}' for bone in LONG_BONES for side in ('left', 'right') for measurement in LONG_BONE_MEASUREMENTS]
+    # Teeth use the 1 to 32 "universal" numbering of recording sheets
+    fields += [f'tooth_{number}_{label}' for number in range(1, 33) for label in TOOTH_LABELS]
+    fields += [f'{muscle}_{side}' for muscle in MUSCLES for side in ('left', 'right')]
+    fields += [f'joints_{joint}_{side}' for joint in JOINTS_LEFT_RIGHT for side in ('left', 'right')]
+    fields += [f'joints_{joint}' for joint in JOINTS_SINGLE]
+    fields += [f'trauma_{bone}_{side}' for bone in TRAUMA_LEFT_RIGHT for side in ('left', 'right')]
+    fields += [f'trauma_{bone}' for bone in TRAUMA_SINGLE]
+    fields += ['body_position', 'body_orientation'] + list(CONTEXT_PRESENT)
+    return fields
+
+
+# Every field read to build an Individual, by default each is read from a column of the same name
+FIELDS = tuple(_fields())
+
+
+class Schema(object):
+    """Maps the fields needed to build an Individual (see FIELDS) to the columns of a recording sheet.
+
+    Fields without a column are read as NA. Grave goods are taken from the columns listed in grave_goods or, when
+    that is not given, every column starting with grave_goods_prefix (which is removed to give the good's name)."""
+
+    def __init__(self, columns: Optional[Mapping[str, str]] = None, grave_goods: Optional[Iterable[str]] = None, grave_goods_prefix: str = 'grave_goods_', na_values: Iterable[str] = ('', 'NA', 'N/A')):
+        columns = dict(columns) if columns else {}
+        unknown = set(columns.keys()) - set(FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown fields: {sorted(unknown)}')
+        self.columns: Dict[str, str] = {field: columns.get(field, field) for field in FIELDS}
+        self.grave_goods = list(grave_goods) if grave_goods is not None else None
+        self.grave_goods_prefix = grave_goods_prefix
+        self.na_values = frozenset(value.upper() for value in na_values)
+
+    def normalise(self, value: Any) -> Any:
+        """None for NA cells, ints for whole floats (as from pandas) and stripped strings"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.strip()
+            return None if value.upper() in self.na_values else value
+        if isinstance(value, float):
+            if math.isnan(value):
+                return None
+            if value.is_integer():
+                return int(value)
+        return value
+
+    def get(self, row: Mapping[str, Any], field: str) -> Any:
+        return self.normalise(row.get(self.columns[field]))
+
+    def grave_goods_columns(self, row: Mapping[str, Any]) -> Dict[str, str]:
+        """Grave good name to column"""
+        if self.grave_goods is not None:
+            return {column: column for column in self.grave_goods}
+        prefix = self.grave_goods_prefix
+        return {column[len(prefix):]: column for column in row.keys() if column.startswith(prefix)}
+
+
+def _float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _tooth_value(value: Any) -> str:
+    return 'NA' if value is None else str(value).upper()
+
+
+def parse_row(row: Mapping[str, Any], schema: Optional[Schema] = None) -> Individual:
+    """Build an Individual from one row (column name to cell value) of a recording sheet.
+
+    Instrumented (see instrumentation) as "parse.<section>"."""
+    started = time.perf_counter() if instrumentation.ENABLED else None
+    schema = schema or Schema()
+
+    def get(field):
+        return schema.get(row, field)
+
+    site = BurialInfo(_str(get('site_name')), _str(get('site_id')))
+    if started is not None:
+        started = instrumentation.lap('parse.site', started)
+
+    osteological_sex = OsteologicalSex(Sex.parse(get('sex_pelvic')), Sex.parse(get('sex_cranium')), Sex.parse(get('sex_combined')))
+    age = EstimatedAge(get('age_category') or 'UNKNOWN', _str(get('age_range')))
+    long_bones = {}
+    for bone in LONG_BONES:
+        sides = [LongBoneMeasurement(*[_float(get(f'{bone}_{side}_{measurement}')) for measurement in LONG_BONE_MEASUREMENTS]) for side in ('left', 'right')]
+        long_bones[bone] = LeftRight(*sides)
+    age_sex_stature = AgeSexStature(osteological_sex, age, long_bones['femur'], long_bones['humerus'], long_bones['tibia'], _str(get('stature')), _str(get('body_mass')))
+    if started is not None:
+        started = instrumentation.lap('parse.age_sex_stature', started)
+
+    mouth = Mouth.from_rows([[_tooth_value(get(f'tooth_{number}_{label}')) for label in TOOTH_LABELS] for number in range(1, 33)])
+    if started is not None:
+        started = instrumentation.lap('parse.mouth', started)
+
+    occupational_markers = OccupationalMarkers(*[LeftRight(EnthesialMarker.parse(get(f'{muscle}_left')), EnthesialMarker.parse(get(f'{muscle}_right'))) for muscle in MUSCLES])
+    if started is not None:
+        started = instrumentation.lap('parse.occupational_markers', started)
+
+    conditions = {joint: LeftRight(JointCondition.parse(get(f'joints_{joint}_left')), JointCondition.parse(get(f'joints_{joint}_right'))) for joint in JOINTS_LEFT_RIGHT}
+    conditions.update({joint: JointCondition.parse(get(f'joints_{joint}')) for joint in JOINTS_SINGLE})
+    joints = Joints(**conditions)
+    if started is not None:
+        started = instrumentation.lap('parse.joints', started)
+
+    categories = {bone: LeftRight(TraumaCategory.parse(get(f'trauma_{bone}_left')), TraumaCategory.parse(get(f'trauma_{bone}_right'))) for bone in TRAUMA_LEFT_RIGHT}
+    categories.update({bone: TraumaCategory.parse(get(f'trauma_{bone}')) for bone in TRAUMA_SINGLE})
+    trauma = Trauma(**categories)
+    if started is not None:
+        started = instrumentation.lap('parse.trauma', started)
+
+    grave_goods = {good: schema.normalise(row.get(column)) for good, column in schema.grave_goods_columns(row).items()}
+    present = [Present.parse(get(field)) for field in CONTEXT_PRESENT]
+    context = Context(BodyPosition.parse(get('body_position')), CompassBearing.parse(get('body_orientation')), *present, grave_goods)
+    if started is not None:
+        instrumentation.record('parse.context', started)
+
+    return Individual(_str(get('id')), site, age_sex_stature, mouth, occupational_markers, joints, trauma, context)
+
+
+def read_rows(rows: Iterable[Mapping[str, Any]], schema: Optional[Schema] = None, first_row: int = 0) -> Iterator[Individual]:
+    """Lazily build an Individual per row, only one row is held in memory at a time. Errors give the row's number,
+    counted from first_row."""
+    schema = schema or Schema()
+    for row_number, row in enumerate(rows, first_row):
+        try:
+            yield parse_row(row, schema)
+        except ValueError as e:
+            raise ValueError(f'Failed to parse row {row_number}: {e}') from e
+
+
+def read_csv(path_or_buffer: Any, schema: Optional[Schema] = None, **kwargs) -> Iterator[Individual]:
+    """Stream Individuals from a CSV file (path or open text file), extra arguments are passed to csv.DictReader"""
+    if isinstance(path_or_buffer, str):
+        with open(path_or_buffer, mode='r', newline='', encoding='utf-8') as csv_file:
+            yield from read_rows(csv.DictReader(csv_file, **kwargs), schema)
+    else:
+        yield from read_rows(csv.DictReader(path_or_buffer, **kwargs), schema)
+
+
+def read_pd_data_frames(frames: Union['pd.DataFrame', Iterable['pd.DataFrame']], schema: Optional[Schema] = None) -> Iterator[Individual]:
+    """Stream Individuals from a data frame or an iterator of data frames, for example from pd.read_csv or
+    pd.read_table with chunksize set, or from pd.read_excel. Rows are numbered over all the frames."""
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    schema = schema or Schema()
+    first_row = 0
+    for frame in frames:
+        yield from read_rows(frame.to_dict(orient='records'), schema, first_row)
+        first_row += len(frame)
+
+
+def chunked(individuals: Iterable[Individual], chunk_size: int) -> Iterator[Population]:
+    """Group a stream of Individuals into Populations of at most chunk_size"""
+    if chunk_size < 1:
+        raise ValueError(f'Invalid chunk_size: {chunk_size}')
+    individuals = iter(individuals)
+    while True:
+        chunk = list(islice(individuals, chunk_size))
+        if not chunk:
+            return
+        yield Population(chunk)
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
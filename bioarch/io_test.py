@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+
+from io import StringIO
+import unittest
+
+
+import pandas as pd
+
+
+from .age import AgeCategory
+from .context import CompassBearing, Present
+from .io import chunked, FIELDS, read_csv, read_pd_data_frames, read_rows, Schema
+from .joints import JointCondition
+from .mouth import Tooth
+from .occupational_markers import EnthesialMarker
+from .sex import Sex
+from .trauma import TraumaCategory
+
+
+CSV = '''Skeleton,site_name,site_id,sex_combined,age_category,age_range,femur_left_max,tooth_1_tooth,tooth_1_calculus,c_trapezius_left,joints_hip_right,joints_c1_3,trauma_ulna_left,body_orientation,disturbed,grave_goods_spear,grave_goods_comb
+sk1,Site A,A1,M?,OA,45-60,43.5,A,2,s1,2,FRACTURE,3,NE,1,1,NA
+sk2,Site A,A1,F,,,,,,,,,,,,0,
+'''
+
+
+class SchemaTest(unittest.TestCase):
+    def test_columns(self):
+        schema = Schema(columns={'id': 'Skeleton'})
+        self.assertEqual(schema.columns['id'], 'Skeleton')
+        self.assertEqual(schema.columns['site_name'], 'site_name')
+        self.assertEqual(set(schema.columns.keys()), set(FIELDS))
+
+        with self.assertRaises(ValueError):
+            Schema(columns={'not_a_field': 'a'})
+
+    def test_normalise(self):
+        schema = Schema()
+        self.assertEqual(schema.normalise(None), None)
+        self.assertEqual(schema.normalise(''), None)
+        self.assertEqual(schema.normalise(' na '), None)
+        self.assertEqual(schema.normalise(float('nan')), None)
+        self.assertEqual(schema.normalise(3.0), 3)
+        self.assertEqual(schema.normalise(0.5), 0.5)
+        self.assertEqual(schema.normalise(' M '), 'M')
+
+    def test_grave_goods_columns(self):
+        row = {'grave_goods_spear': '1', 'spear': '1', 'comb': '0'}
+        self.assertEqual(Schema().grave_goods_columns(row), {'spear': 'grave_goods_spear'})
+        self.assertEqual(Schema(grave_goods=['comb']).grave_goods_columns(row), {'comb': 'comb'})
+
+
+class ReadTest(unittest.TestCase):
+    def check_individuals(self, individuals):
+        self.assertEqual([i.id for i in individuals], ['sk1', 'sk2'])
+        sk1, sk2 = individuals
+
+        self.assertEqual(sk1.site.name, 'Site A')
+        self.assertEqual(sk1.age_sex_stature.osteological_sex.combined, Sex.MALE_LIKELY)
+        self.assertEqual(sk1.age_sex_stature.age.category, AgeCategory.OLD)
+        self.assertEqual(sk1.age_sex_stature.age.ranged, range(45, 60))
+        self.assertEqual(sk1.age_sex_stature.femur.left.max, 43.5)
+        self.assertEqual(sk1.mouth.teeth[0], Tooth('A', '2', 'NA', 'NA', 'NA'))
+        self.assertEqual(sk1.mouth.teeth[1], Tooth.empty())
+        self.assertEqual(sk1.occupational_markers.c_trapezius.left, EnthesialMarker(1, is_s=True))
+        self.assertEqual(sk1.occupational_markers.c_trapezius.right, None)
+        self.assertEqual(sk1.joints.hip.right, JointCondition.MEDIUM)
+        self.assertEqual(sk1.joints.c1_3, JointCondition.FRACTURE)
+        self.assertEqual(sk1.trauma.ulna.left, TraumaCategory.FRACTURE)
+        self.assertEqual(sk1.context.body_orientation, CompassBearing.NORTH_EAST)
+        self.assertEqual(sk1.context.disturbed, Present.PRESENT)
+        self.assertEqual(sk1.context.grave_goods, {'spear': Present.PRESENT, 'comb': None})
+
+        self.assertEqual(sk2.age_sex_stature.osteological_sex.combined, Sex.FEMALE)
+        self.assertEqual(sk2.age_sex_stature.age.category, AgeCategory.UNKNOWN)
+        self.assertEqual(sk2.age_sex_stature.femur.left.max, None)
+        self.assertEqual(sk2.joints.c1_3, None)
+        self.assertEqual(sk2.context.grave_goods, {'spear': Present.NOT_PRESENT, 'comb': None})
+
+        # Must be exportable
+        self.assertEqual(len(individuals[0].to_pd_data_frame()), 1)
+
+    def test_read_csv(self):
+        individuals = read_csv(StringIO(CSV), Schema(columns={'id': 'Skeleton'}))
+        self.assertEqual(next(individuals).id, 'sk1')
+
+        self.check_individuals(list(read_csv(StringIO(CSV), Schema(columns={'id': 'Skeleton'}))))
+
+    def test_read_pd_data_frames(self):
+        schema = Schema(columns={'id': 'Skeleton'})
+        self.check_individuals(list(read_pd_data_frames(pd.read_csv(StringIO(CSV)), schema)))
+        self.check_individuals(list(read_pd_data_frames(pd.read_csv(StringIO(CSV), chunksize=1), schema)))
+
+    def test_read_pd_data_frames_error(self):
+        df = pd.DataFrame([{'id': f'sk{i}', 'site_name': 'a', 'site_id': 'b', 'joints_c1_3': None} for i in range(5)])
+        df.loc[3, 'joints_c1_3'] = 'BAD'
+        with self.assertRaisesRegex(ValueError, 'row 3:'):
+            list(read_pd_data_frames([df.iloc[:2], df.iloc[2:]]))
+
+    def test_read_rows_error(self):
+        with self.assertRaisesRegex(ValueError, 'row 1'):
+            list(read_rows([{'id': 'sk1', 'site_name': 'a', 'site_id': 'b'}, {'id': 'sk2', 'site_name': 'a', 'site_id': 'b', 'joints_c1_3': 'BAD'}]))
+
+    def test_chunked(self):
+        individuals = read_csv(StringIO(CSV + CSV.split('\n', 1)[1]), Schema(columns={'id': 'Skeleton'}))
+        populations = list(chunked(individuals, 3))
+        self.assertEqual([len(p) for p in populations], [3, 1])
+
+        with self.assertRaises(ValueError):
+            list(chunked([], 0))
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
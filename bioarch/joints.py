@@ -6,13 +6,18 @@ from enum import Enum
 import functools
 import logging
 from statistics import mean
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional
 
 
-import pandas as pd
-from pandas.api.types import CategoricalDtype
+import numpy as np
 
 
+from . import instrumentation
+from .codes import code_layout, CodedField, CodedPair, EnumCodes, NA_CODE, NO_PAIR_CODE
+from .columns import add_prefix, Cell, select_cells, to_pd_data_frame
+from .lazy import pandas as pd
 from .left_right import LeftRight
+from .parsing import parse_array, parse_many
 
 
 logger = logging.getLogger(__name__)
@@ -46,17 +51,22 @@ class JointCondition(Enum):
         if isinstance(value, int):
             value = str(value)
         if not isinstance(value, str):
+            instrumentation.parse_failed(JointCondition.__name__)
             raise ValueError(f'Failed to parse JointCondition: "{value}"')
         value = value.upper()
-        for condition in JointCondition:
-            if value == condition.name:
-                return condition
-            if value == str(condition.value):
-                return condition
-        if value in ('NA', 'N'):
-            return None
+        if value in _JOINT_CONDITION_ALIASES:
+            return _JOINT_CONDITION_ALIASES[value]
+        instrumentation.parse_failed(JointCondition.__name__)
         logger.error('Failed to parse JointCondition: "%s"', value)
-        raise ValueError
+        raise ValueError(f'Failed to parse JointCondition: "{value}"')
+
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['JointCondition']]:
+        return parse_many(JointCondition.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(JointCondition.parse, values)
 
     @staticmethod
     def avg(left, right):
@@ -83,10 +93,19 @@ class JointCondition(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in JointCondition], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in JointCondition], ordered=True)
 
 
+_JOINT_CONDITION_ALIASES: Dict[str, Optional[JointCondition]] = {condition.name: condition for condition in JointCondition}
+_JOINT_CONDITION_ALIASES.update({str(condition.value): condition for condition in JointCondition})
+_JOINT_CONDITION_ALIASES.update({'NA': None, 'N': None})
+
+
+JOINTS_LEFT_RIGHT = ('shoulder', 'elbow', 'wrist', 'hip', 'knee', 'ankle')
+JOINTS_SINGLE = ('sacro_illiac', 'c1_3', 'c4_7', 't1_4', 't5_8', 't9_12', 'l1_5')
+
 JOINTS_SUMMARY_STATS = {
     'cervical': set(['c1_3', 'c4_7']),
     'thoracic': set(['t1_4', 't5_8', 't9_12']),
@@ -94,52 +113,184 @@ JOINTS_SUMMARY_STATS = {
 }
 
 
+# Joints codes (see EnumCodes) layout, the left and right of each JOINTS_LEFT_RIGHT joint then JOINTS_SINGLE
+JOINTS_LAYOUT = code_layout(JOINTS_LEFT_RIGHT, JOINTS_SINGLE)
+JOINTS_CODES = 2 * len(JOINTS_LEFT_RIGHT) + len(JOINTS_SINGLE)
+
+_CODES = EnumCodes(JointCondition)
+_PAIRS = 2 * len(JOINTS_LEFT_RIGHT)
+_AVG = _CODES.avg_table(NA_CODE)
+_SUMMARY_INDEXES = {group: [JOINTS_LAYOUT[joint] for joint in JOINTS_SINGLE if joint in joints] for group, joints in JOINTS_SUMMARY_STATS.items()}
+
+
+def _column_order(no_pairs: np.ndarray, wanted: Callable[[str], bool]) -> List[str]:
+    """The (unprefixed) columns of Joints.to_pd_dict, in the order ColumnBuilder gives a batch of them: the first
+    row's then the ones each later row adds. no_pairs is an (n x pairs) bool array of the pairs that are None."""
+    shapes = no_pairs.astype(np.int64) @ (1 << np.arange(no_pairs.shape[1], dtype=np.int64))
+    _, first_rows = np.unique(shapes, return_index=True)
+    singles = list(JOINTS_SINGLE)
+    for group in _SUMMARY_INDEXES:
+        if any(wanted(f'{group}_{stat}') for stat in ('min', 'max', 'count')):
+            singles += [f'{group}_min', f'{group}_max', f'{group}_count']
+    order: Dict[str, None] = {}
+    for row in sorted(first_rows):
+        for joint, no_pair in zip(JOINTS_LEFT_RIGHT, no_pairs[row]):
+            if no_pair:
+                order[joint] = None
+                continue
+            order[f'{joint}_left'] = None
+            order[f'{joint}_right'] = None
+            if wanted(f'{joint}_avg'):
+                order[f'{joint}_avg'] = None
+        order.update(dict.fromkeys(singles))
+    return list(order)
+
+
+@functools.lru_cache(maxsize=None)
+def _cells() -> List[Cell]:
+    """The (shared) cell of every code"""
+    return [Cell(name, JointCondition.dtype()) for name in _CODES.names]
+
+
 class Joints(object):  # pylint: disable=R0902
-    """docstring for Joints"""
+    """Joint conditions, stored as an int8 array of JointCondition codes laid out as JOINTS_LAYOUT"""
+
+    __slots__ = ['codes']
+
+    shoulder = CodedPair(_CODES, JOINTS_LAYOUT['shoulder'])
+    elbow = CodedPair(_CODES, JOINTS_LAYOUT['elbow'])
+    wrist = CodedPair(_CODES, JOINTS_LAYOUT['wrist'])
+    hip = CodedPair(_CODES, JOINTS_LAYOUT['hip'])
+    knee = CodedPair(_CODES, JOINTS_LAYOUT['knee'])
+    ankle = CodedPair(_CODES, JOINTS_LAYOUT['ankle'])
+    sacro_illiac = CodedField(_CODES, JOINTS_LAYOUT['sacro_illiac'])
+    c1_3 = CodedField(_CODES, JOINTS_LAYOUT['c1_3'])
+    c4_7 = CodedField(_CODES, JOINTS_LAYOUT['c4_7'])
+    t1_4 = CodedField(_CODES, JOINTS_LAYOUT['t1_4'])
+    t5_8 = CodedField(_CODES, JOINTS_LAYOUT['t5_8'])
+    t9_12 = CodedField(_CODES, JOINTS_LAYOUT['t9_12'])
+    l1_5 = CodedField(_CODES, JOINTS_LAYOUT['l1_5'])
+
     def __init__(self, shoulder: LeftRight[JointCondition], elbow: LeftRight[JointCondition], wrist: LeftRight[JointCondition], hip: LeftRight[JointCondition], knee: LeftRight[JointCondition], ankle: LeftRight[JointCondition], sacro_illiac: JointCondition, c1_3: JointCondition, c4_7: JointCondition, t1_4: JointCondition, t5_8: JointCondition, t9_12: JointCondition, l1_5: JointCondition):
-        self.shoulder = shoulder
-        self.elbow = elbow
-        self.wrist = wrist
-        self.hip = hip
-        self.knee = knee
-        self.ankle = ankle
-        self.sacro_illiac = sacro_illiac
-        self.c1_3 = c1_3
-        self.c4_7 = c4_7
-        self.t1_4 = t1_4
-        self.t5_8 = t5_8
-        self.t9_12 = t9_12
-        self.l1_5 = l1_5
+        self.codes: np.ndarray = _CODES.encode_fields((shoulder, elbow, wrist, hip, knee, ankle), (sacro_illiac, c1_3, c4_7, t1_4, t5_8, t9_12, l1_5))
 
     @staticmethod
     def empty():
-        args = [LeftRight(None, None)] * 6
-        args += [None] * 7
-        return Joints(*args)
+        return Joints.from_codes(np.full(JOINTS_CODES, NA_CODE, dtype=np.int8))
+
+    @staticmethod
+    def from_codes(codes: np.ndarray) -> 'Joints':
+        codes = np.array(codes, dtype=np.int8)
+        if codes.shape != (JOINTS_CODES,):
+            raise ValueError(f'Incorrect joints codes shape: {codes.shape}')
+        joints = object.__new__(Joints)
+        joints.codes = codes
+        return joints
+
+    def state_key(self):
+        """The codes as bytes, in place edits of them included"""
+        return self.codes.tobytes()
+
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None):
+        """All the columns, or only the given ones, skipping the averages and summaries that are not wanted"""
+        def wanted(key):
+            return columns is None or f'{prefix}{key}' in columns
+
+        cells_of = _cells()
+        codes = self.codes.tolist()
+        avg = _AVG[self.codes[0:_PAIRS:2] + 2, self.codes[1:_PAIRS:2] + 2].tolist()
+        cells = {}
+        for i, joint in enumerate(JOINTS_LEFT_RIGHT):
+            if codes[2 * i] == NO_PAIR_CODE:
+                # A missing pair is a single NA column
+                cells[joint] = cells_of[NA_CODE]
+                continue
+            cells[f'{joint}_left'] = cells_of[codes[2 * i]]
+            cells[f'{joint}_right'] = cells_of[codes[2 * i + 1]]
+            if wanted(f'{joint}_avg'):
+                cells[f'{joint}_avg'] = cells_of[avg[i]]
+        for joint, code in zip(JOINTS_SINGLE, codes[_PAIRS:]):
+            cells[joint] = cells_of[code]
+
+        for group, indexes in _SUMMARY_INDEXES.items():
+            if not any(wanted(f'{group}_{stat}') for stat in ('min', 'max', 'count')):
+                continue
+            subset = [codes[i] for i in indexes if codes[i] >= 0]
+            cells[f'{group}_min'] = cells_of[min(subset) if subset else NA_CODE]
+            cells[f'{group}_max'] = cells_of[max(subset) if subset else NA_CODE]
+            cells[f'{group}_count'] = Cell(len(subset))
+
+        return select_cells(add_prefix(cells, prefix), columns)
 
     def to_pd_data_frame(self, index):
-        data = {
-            'id': pd.Series([index]),
-        }
-        for key, value in self.__dict__.items():
-            if isinstance(value, LeftRight):
-                data[f'{key}_left'] = pd.Series([value.left.name if value.left else None], copy=True, dtype=JointCondition.dtype())
-                data[f'{key}_right'] = pd.Series([value.right.name if value.right else None], copy=True, dtype=JointCondition.dtype())
-                avg = value.avg()
-                data[f'{key}_avg'] = pd.Series([avg.name if avg else None], copy=True, dtype=JointCondition.dtype())
-            else:
-                data[f'{key}'] = pd.Series([value.name if value else None], copy=True, dtype=JointCondition.dtype())
-
-        for prefix, cols in JOINTS_SUMMARY_STATS.items():
-            subset = [value for key, value in self.__dict__.items() if key in cols and value is not None]
-            min_val = min(subset) if subset else None
-            max_val = max(subset) if subset else None
-            count = len(subset)
-            data[f'{prefix}_min'] = pd.Series([min_val.name if min_val else None], copy=True, dtype=JointCondition.dtype())
-            data[f'{prefix}_max'] = pd.Series([max_val.name if max_val else None], copy=True, dtype=JointCondition.dtype())
-            data[f'{prefix}_count'] = pd.Series([count], copy=True)
-
-        return pd.DataFrame.from_dict(data).set_index('id')
+        return to_pd_data_frame(index, self.to_pd_dict())
+
+
+class JointsArray(object):
+    """The Joints of many individuals as one (n x JOINTS_CODES) int8 array of their codes, so the averages and
+    summaries of a whole batch are computed with array operations."""
+
+    __slots__ = ['codes']
+
+    def __init__(self, codes: np.ndarray):
+        codes = np.asarray(codes, dtype=np.int8)
+        if codes.ndim != 2 or codes.shape[1] != JOINTS_CODES:
+            raise ValueError(f'Incorrect joints array shape: {codes.shape}')
+        self.codes = codes
+
+    @staticmethod
+    def from_joints(joints: Iterable[Joints]) -> 'JointsArray':
+        codes = [j.codes for j in joints]
+        if not codes:
+            return JointsArray(np.empty((0, JOINTS_CODES), dtype=np.int8))
+        return JointsArray(np.stack(codes))
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def __getitem__(self, i: int) -> Joints:
+        return Joints.from_codes(self.codes[i])
+
+    def to_pd_data_frame(self, index=None, prefix='', columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """Same columns as Joints.to_pd_dict, or only the given ones, one row per individual"""
+        if not len(self):
+            return pd.DataFrame(index=index)
+
+        def wanted(key):
+            return columns is None or f'{prefix}{key}' in columns
+
+        dtype = JointCondition.dtype()
+        codes = self.codes
+        # A missing pair is a single NA column, and NA in the other rows' left, right and average columns
+        conditions = np.where(codes == NO_PAIR_CODE, NA_CODE, codes)
+        avg = _AVG[codes[:, 0:_PAIRS:2] + 2, codes[:, 1:_PAIRS:2] + 2]
+        missing = np.full(len(self), NA_CODE, dtype=np.int8)
+
+        series = {}
+        for i, joint in enumerate(JOINTS_LEFT_RIGHT):
+            series[joint] = missing
+            series[f'{joint}_left'] = conditions[:, 2 * i]
+            series[f'{joint}_right'] = conditions[:, 2 * i + 1]
+            series[f'{joint}_avg'] = avg[:, i]
+        for joint in JOINTS_SINGLE:
+            series[joint] = conditions[:, JOINTS_LAYOUT[joint]]
+
+        for group, indexes in _SUMMARY_INDEXES.items():
+            if not any(wanted(f'{group}_{stat}') for stat in ('min', 'max', 'count')):
+                continue
+            subset = conditions[:, indexes]
+            present = subset >= 0
+            lowest = np.where(present, subset, len(_CODES)).min(axis=1)
+            series[f'{group}_min'] = np.where(lowest == len(_CODES), NA_CODE, lowest)
+            series[f'{group}_max'] = subset.max(axis=1)
+            series[f'{group}_count'] = present.sum(axis=1).astype(np.int64)
+
+        data = {}
+        for key in _column_order(codes[:, 0:_PAIRS:2] == NO_PAIR_CODE, wanted):
+            values = series[key]
+            data[f'{prefix}{key}'] = values if key.endswith('_count') else pd.Categorical.from_codes(values, dtype=dtype)
+        data = select_cells(data, columns)
+        return pd.DataFrame(data, index=index, columns=list(data.keys()))
 
 
 if __name__ == "__main__":
@@ -6,9 +6,15 @@ import json
 import unittest
 
 
+import numpy as np
+import pandas as pd
+
+
 from . import test as bioarch_test
-from .joints import JointCondition, Joints
+from .columns import ColumnBuilder
+from .joints import JointCondition, Joints, JointsArray
 from .left_right import LeftRight
+from .synthetic import CohortGenerator
 
 
 class JointConditionTest(unittest.TestCase):
@@ -31,6 +37,15 @@ class JointConditionTest(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             JointCondition.parse('')
+        with self.assertRaises(ValueError):
+            JointCondition.parse(1.0)
+
+    def test_parse_many(self):
+        self.assertEqual(JointCondition.parse_many(['1', 'n', 6, 'mild']), [JointCondition.MILD, None, JointCondition.FRACTURE, JointCondition.MILD])
+        self.assertEqual(JointCondition.parse_array(np.array([[0, 2]])).tolist(), [[JointCondition.NORMAL, JointCondition.MEDIUM]])
+
+    def test_dtype(self):
+        self.assertIs(JointCondition.dtype(), JointCondition.dtype())
 
     def test_avg(self):
         va1 = None
@@ -113,6 +128,71 @@ class JointsTest(unittest.TestCase):
         self.assertEqual(thoracic_min.to_json(orient='records'), '["NORMAL"]')
         self.assertEqual(thoracic_max.to_json(orient='records'), '["FRACTURE"]')
 
+    def test_to_pd_data_frame_none_pair(self):
+        # A pair that is None as a whole is a single NA column, e.g. "elbow" rather than "elbow_left", "elbow_right" and
+        # "elbow_avg"
+        joints = Joints(LeftRight(JointCondition.NORMAL, JointCondition.MILD), None, LeftRight(None, None), None, LeftRight(JointCondition.NORMAL, None), None,
+                        JointCondition.NORMAL, None, JointCondition.EXTREME, None, None, None, JointCondition.MILD)
+        self.assertIsNone(joints.elbow)
+        self.assertEqual(joints.wrist, LeftRight(None, None))
+        df = joints.to_pd_data_frame('id1')
+
+        with open_binary(bioarch_test, 'JointsTest.test_to_pd_data_frame_none_pair.json') as json_stream:
+            expected_json = json.load(json_stream)
+        self.assertEqual(json.loads(df.to_json(orient='records')), expected_json)
+        self.assertEqual(list(df.columns)[:8], ['shoulder_left', 'shoulder_right', 'shoulder_avg', 'elbow', 'wrist_left', 'wrist_right', 'wrist_avg', 'hip'])
+
+        # Batches have every row's columns, in first appearance order
+        batch = [Joints.empty(), joints, Joints.empty(), joints]
+        expected = ColumnBuilder.from_rows([(row, j.to_pd_dict(prefix='joints_')) for row, j in enumerate(batch)]).to_pd_data_frame()
+        self.assertIn('joints_elbow', expected.columns)
+        pd.testing.assert_frame_equal(JointsArray.from_joints(batch).to_pd_data_frame(prefix='joints_'), expected, check_index_type=False)
+        batch.reverse()
+        expected = ColumnBuilder.from_rows([(row, j.to_pd_dict(prefix='joints_')) for row, j in enumerate(batch)]).to_pd_data_frame()
+        pd.testing.assert_frame_equal(JointsArray.from_joints(batch).to_pd_data_frame(prefix='joints_'), expected, check_index_type=False)
+        columns = {'joints_elbow', 'joints_elbow_avg', 'joints_knee_left', 'joints_lumbar_max'}
+        expected = ColumnBuilder.from_rows([(row, j.to_pd_dict(prefix='joints_', columns=columns)) for row, j in enumerate(batch)]).to_pd_data_frame()
+        pd.testing.assert_frame_equal(JointsArray.from_joints(batch).to_pd_data_frame(prefix='joints_', columns=columns), expected, check_index_type=False)
+
+    def test_fields(self):
+        joints = Joints.empty()
+        self.assertEqual(joints.hip, LeftRight(None, None))
+        self.assertIsNone(joints.c1_3)
+
+        joints.hip = LeftRight(JointCondition.MILD, None)
+        joints.c1_3 = JointCondition.FUSED
+        self.assertEqual(joints.hip, LeftRight(JointCondition.MILD, None))
+        self.assertEqual(joints.knee, LeftRight(None, None))
+        self.assertEqual(joints.c1_3, JointCondition.FUSED)
+        self.assertEqual(joints.codes.dtype, np.int8)
+        self.assertFalse(hasattr(joints, '__dict__'))
+
+        copy = Joints.from_codes(joints.codes)
+        self.assertEqual(copy.hip, joints.hip)
+        with self.assertRaises(ValueError):
+            joints.c4_7 = 'MILD'
+        with self.assertRaises(ValueError):
+            Joints.from_codes(np.zeros(3))
+
+
+class JointsArrayTest(unittest.TestCase):
+    joints = [individual.joints for individual in CohortGenerator(seed=4, missing=0.4).individuals(30)]
+
+    def expected(self, columns=None):
+        rows = [(row, joints.to_pd_dict(prefix='joints_', columns=columns)) for row, joints in enumerate(self.joints)]
+        return ColumnBuilder.from_rows(rows).to_pd_data_frame()
+
+    def test_to_pd_data_frame(self):
+        array = JointsArray.from_joints(self.joints)
+        self.assertEqual(len(array), 30)
+        self.assertEqual(array[3].hip, self.joints[3].hip)
+        pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='joints_'), self.expected(), check_index_type=False)
+
+        for columns in ({'joints_hip_avg', 'joints_cervical_max'}, {'joints_thoracic_count', 'joints_knee_left'}):
+            pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='joints_', columns=columns), self.expected(columns), check_index_type=False)
+
+        self.assertEqual(len(JointsArray.from_joints([]).to_pd_data_frame().columns), 0)
+
 
 def main():
     unittest.main()
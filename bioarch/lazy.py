@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+
+import importlib
+import sys
+from typing import Any, List
+
+
+class LazyModule(object):
+    """Stands in for a module that is only imported when one of its attributes is first used.
+
+    Keeps "import bioarch" (and the data model and parsers) from paying for pandas until something is exported. numpy
+    is imported as usual: the data model keeps its values as numpy codes, built at import."""
+
+    __slots__ = ['_name', '_module']
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self) -> Any:
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)
+            self._module = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the module has been imported, by this or anything else"""
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self._name}'
+
+
+ensure = LazyModule('ensure')
+pandas = LazyModule('pandas')
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
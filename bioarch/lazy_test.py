@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+
+import subprocess
+import sys
+import unittest
+
+
+from .lazy import LazyModule
+
+
+class LazyModuleTest(unittest.TestCase):
+    def test_attribute(self):
+        module = LazyModule('json')
+        self.assertEqual(module.dumps([1]), '[1]')
+        self.assertTrue(module.is_loaded)
+        self.assertIn('dumps', dir(module))
+        with self.assertRaises(AttributeError):
+            module.not_in_json  # pylint: disable=W0104
+
+    def test_missing_module(self):
+        module = LazyModule('bioarch_no_such_module')
+        self.assertFalse(module.is_loaded)
+        with self.assertRaises(ImportError):
+            module.anything  # pylint: disable=W0104
+
+    def test_no_pandas_on_import(self):
+        # A fresh interpreter, this one already has pandas imported
+        code = 'import sys, bioarch; bioarch.Sex.parse("M"); bioarch.Context.empty(); bioarch.Mouth.empty(); print("pandas" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False')
+
+    def test_numpy_on_import(self):
+        # numpy is a plain import of the submodules, not a LazyModule
+        code = 'import sys, bioarch; before = "numpy" in sys.modules; import bioarch.query; print(before, "numpy" in sys.modules, "pandas" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False True False')
+
+    def test_no_pandas_on_submodule_import(self):
+        code = 'import sys, bioarch.arrow, bioarch.query; print("pandas" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False')
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
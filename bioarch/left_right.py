@@ -2,32 +2,37 @@
 
 
 import inspect
-from statistics import mean
-from typing import Any, cast, Generic, List, Optional, TypeVar
+from typing import Any, Callable, cast, Dict, Generic, Optional, TypeVar
+
+
+import numpy as np
 
 
 T = TypeVar('T')
 
+Averager = Callable[[Any, Any], Any]
 
-def best_effort_avg(left: Optional[T], right: Optional[T]) -> Optional[T]:
-    if left is None:
-        return right
-    if right is None:
-        return left
 
-    if isinstance(left, int):
-        if not isinstance(right, int):
-            raise TypeError
-        return cast(T, int(mean((left, right))))
+def _avg_int(left: int, right: Any) -> int:
+    if not isinstance(right, int):
+        raise TypeError
+    total = left + right
+    # int(mean(...)), i.e. truncated towards zero
+    return total // 2 if total >= 0 else -(-total // 2)
 
-    if isinstance(left, float):
-        if not isinstance(right, float):
-            raise TypeError
-        return cast(T, mean((left, right)))
 
-    if right.__class__ != left.__class__:
+def _avg_float(left: float, right: Any) -> float:
+    if not isinstance(right, float):
         raise TypeError
-    type_class = left.__class__
+    return (left + right) / 2
+
+
+def _resolve_averager(type_class: type) -> Averager:
+    """Work out, once, how to average two instances of type_class"""
+    if issubclass(type_class, int):
+        return _avg_int
+    if issubclass(type_class, float):
+        return _avg_float
 
     if hasattr(type_class, 'avg') and inspect.isfunction(getattr(type_class, 'avg')):
         avg_func = getattr(type_class, 'avg')
@@ -40,36 +45,86 @@ def best_effort_avg(left: Optional[T], right: Optional[T]) -> Optional[T]:
             raise ValueError
         if arg_spec.varkw is not None:
             raise ValueError
-        return cast(T, avg_func(left, right))
+
+        def avg_with_func(left, right):
+            if right.__class__ != type_class:
+                raise TypeError
+            return avg_func(left, right)
+        return avg_with_func
 
     arg_spec = inspect.getfullargspec(type_class)
     if arg_spec.varargs is not None:
         raise ValueError
     if arg_spec.varkw is not None:
         raise ValueError
+    keys = [key[1:] if key.startswith('_') else key for key in arg_spec.args[1:]]
+
+    def avg_by_attribute(left, right):
+        if right.__class__ != type_class:
+            raise TypeError
+        return type_class(*[best_effort_avg(getattr(left, key), getattr(right, key)) for key in keys])  # type: ignore
+    return avg_by_attribute
+
+
+_AVERAGERS: Dict[type, Averager] = {}
+
 
-    avg_args: List[Any] = []
-    for key in arg_spec.args[1:]:
-        if key.startswith('_'):
-            key = key[1:]
-        left_val = getattr(left, key)
-        right_val = getattr(right, key)
-        avg = best_effort_avg(left_val, right_val)
-        avg_args.append(avg)
-    return type_class(*avg_args)  # type: ignore
+def register_averager(type_class: type, averager: Averager):
+    """Use averager for (non None) values of type_class instead of the avg method/constructor based default"""
+    _AVERAGERS[type_class] = averager
+
+
+def averager_for(type_class: type) -> Averager:
+    averager = _AVERAGERS.get(type_class)
+    if averager is None:
+        averager = _resolve_averager(type_class)
+        _AVERAGERS[type_class] = averager
+    return averager
+
+
+def best_effort_avg(left: Optional[T], right: Optional[T]) -> Optional[T]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return cast(T, averager_for(left.__class__)(left, right))
+
+
+def best_effort_avg_array(left: np.ndarray, right: np.ndarray, na: Optional[int] = None) -> np.ndarray:
+    """best_effort_avg over whole arrays of left and right values.
+
+    Missing values are NaN or, for integer arrays, the na sentinel. Integer averages are truncated like best_effort_avg."""
+    left = np.asarray(left)
+    right = np.asarray(right)
+    if left.shape != right.shape:
+        raise ValueError(f'Left and right shapes not the same: left="{left.shape}", right="{right.shape}"')
+    if np.issubdtype(left.dtype, np.integer):
+        left_missing = left == na
+        right_missing = right == na
+        both = np.trunc((left.astype(np.int64) + right.astype(np.int64)) / 2).astype(left.dtype)
+    else:
+        left_missing = np.isnan(left)
+        right_missing = np.isnan(right)
+        both = (left + right) / 2
+    return np.where(left_missing, right, np.where(right_missing, left, both))
 
 
 class LeftRight(Generic[T]):
     """Wrapper around measurements taken on both the left and right sides.
-    This augments the two measurements by adding a meta-measurement with the "avg"/"best" combination of both."""
+    This augments the two measurements by adding a meta-measurement with the "avg"/"best" combination of both.
+
+    Immutable (and hashable when both sides are), so one instance can be shared, e.g. by many missing pairs."""
 
     __slots__ = ['left', 'right']
 
+    left: Optional[T]
+    right: Optional[T]
+
     def __init__(self, left: Optional[T], right: Optional[T]):
         if type(left) != type(right) and left is not None and right is not None:  # pylint: disable=C0123
             raise ValueError(f'Left and right types not the same: left="{type(left)}", left="{type(right)}"')
-        self.left: Optional[T] = left
-        self.right: Optional[T] = right
+        object.__setattr__(self, 'left', left)
+        object.__setattr__(self, 'right', right)
 
     def avg(self) -> Optional[T]:
         """meta-measurement with the "avg"/"best" combination of both."""
@@ -82,6 +137,15 @@ class LeftRight(Generic[T]):
             raise NotImplementedError
         return ((self.left, self.right) == (other.left, other.right))  # pylint: disable=C0325
 
+    def __hash__(self):
+        return hash((self.left, self.right))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (LeftRight, (self.left, self.right))
+
     def __repr__(self):
         return f'{self.__class__.__name__}({self.left}, {self.right})'
 
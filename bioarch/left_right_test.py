@@ -1,10 +1,14 @@
 #!/usr/bin/env python
 
 
+import pickle
 import unittest
 
 
-from .left_right import LeftRight
+import numpy as np
+
+
+from .left_right import averager_for, best_effort_avg, best_effort_avg_array, LeftRight, register_averager
 
 
 class BasicObjectForTest(object):
@@ -66,6 +70,40 @@ class LeftRightTest(unittest.TestCase):
         right = ObjectWithAvgForTest(2)
         self.assertEqual(LeftRight(left, right).avg(), ObjectWithAvgForTest(3))
 
+    def test_avg_type_mismatch(self):
+        with self.assertRaises(TypeError):
+            best_effort_avg(1, 1.0)
+        with self.assertRaises(TypeError):
+            best_effort_avg(ObjectWithAvgForTest(1), BasicObjectForTest(1, 2, 3))
+
+    def test_averager_for(self):
+        self.assertIs(averager_for(BasicObjectForTest), averager_for(BasicObjectForTest))
+
+        class ObjectWithRegisteredAveragerForTest(ObjectWithAvgForTest):
+            pass
+
+        register_averager(ObjectWithRegisteredAveragerForTest, lambda left, right: ObjectWithAvgForTest(max(left.val, right.val)))
+        left = ObjectWithRegisteredAveragerForTest(1)
+        right = ObjectWithRegisteredAveragerForTest(5)
+        self.assertEqual(LeftRight(left, right).avg(), ObjectWithAvgForTest(5))
+
+    def test_avg_array(self):
+        left = np.array([1.0, np.nan, 1.0, np.nan])
+        right = np.array([2.0, 2.0, np.nan, np.nan])
+        np.testing.assert_array_equal(best_effort_avg_array(left, right), [1.5, 2.0, 1.0, np.nan])
+
+        left = np.array([1, -1, 1, 2, -1], dtype=np.int8)
+        right = np.array([3, 2, -1, 3, -1], dtype=np.int8)
+        avg = best_effort_avg_array(left, right, na=-1)
+        self.assertEqual(avg.dtype, np.int8)
+        np.testing.assert_array_equal(avg, [2, 2, 1, 2, -1])
+        for left_value, right_value, avg_value in zip(left, right, avg):
+            if left_value != -1 and right_value != -1:
+                self.assertEqual(avg_value, LeftRight(int(left_value), int(right_value)).avg())
+
+        with self.assertRaises(ValueError):
+            best_effort_avg_array(np.zeros(2), np.zeros(3))
+
     def test_equality(self):
         lr = LeftRight(1, 1)
         self.assertEqual(lr, lr)
@@ -79,6 +117,14 @@ class LeftRightTest(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             LeftRight(1, 1).__eq__('test')
 
+    def test_immutable(self):
+        lr = LeftRight(1, 2)
+        with self.assertRaises(AttributeError):
+            lr.left = 3
+        self.assertEqual(lr.left, 1)
+        self.assertEqual(len({lr, LeftRight(1, 2), LeftRight(2, 1)}), 2)
+        self.assertEqual(pickle.loads(pickle.dumps(lr)), lr)
+
 
 def main():
     unittest.main()
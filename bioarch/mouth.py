@@ -2,11 +2,14 @@
 
 
 import logging
-from typing import List, Optional, Union
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 
-from ensure import check, ensure_annotations
-import pandas as pd
+import numpy as np
+
+
+from .columns import Cell, select_cells
+from .lazy import ensure, pandas as pd
 
 
 logger = logging.getLogger(__name__)
@@ -18,31 +21,60 @@ VALID_EH       = ('NA', '0', '1')  # noqa: E221
 VALID_CAVITIES = ('NA', '0', '1')
 VALID_ABCESS   = ('NA', '0', '1')  # noqa: E221
 
+TOOTH_LABELS = ('tooth', 'calculus', 'eh', 'cavities', 'abcess')
+VALID_VALUES = {
+    'tooth': VALID_TEETH,
+    'calculus': VALID_CALCULUS,
+    'eh': VALID_EH,
+    'cavities': VALID_CAVITIES,
+    'abcess': VALID_ABCESS,
+}
+
+# Compact int8 encoding of a tooth value: the index into its VALID_* tuple minus one, so 'NA' is -1
+NA_CODE = -1
+TOOTH_CODES = {label: {value: i - 1 for i, value in enumerate(valid)} for label, valid in VALID_VALUES.items()}
+# Lookups from code + 1 back to the original string and to the pandas value
+_CODE_TO_STR = {label: np.array(valid, dtype=object) for label, valid in VALID_VALUES.items()}
+_CODE_TO_PD_VALUE = {
+    'tooth': np.array([None] + list(range(len(VALID_TEETH) - 1)), dtype=object),
+    'calculus': np.array([None] + list(range(len(VALID_CALCULUS) - 1)), dtype=object),
+    'eh': np.array([None, False, True], dtype=object),
+    'cavities': np.array([None, False, True], dtype=object),
+    'abcess': np.array([None, False, True], dtype=object),
+}
+
+# Every validated Tooth, by its values
+_TEETH: Dict[Tuple[str, ...], 'Tooth'] = {}
+# The same teeth by their codes, see Tooth.to_codes
+_TEETH_BY_CODES: Dict[Tuple[int, ...], 'Tooth'] = {}
+
+_VALID_SETS = tuple(frozenset(VALID_VALUES[label]) for label in TOOTH_LABELS)
+
+
+def _validate_tooth(values: Sequence[str]):
+    """The Tooth.__init__ checks (and error types) using frozenset lookups rather than ensure's checks"""
+    if len(values) != len(TOOTH_LABELS):
+        raise ValueError(f'Incorrect number of tooth values: {len(values)}')
+    for label, valid, value in zip(TOOTH_LABELS, _VALID_SETS, values):
+        if not isinstance(value, str):
+            raise ensure.EnsureError(f'Argument {label} of type {type(value)} to Tooth does not match annotation type {str}')
+        if value not in valid:
+            raise ValueError(f'{value!r} not found in {VALID_VALUES[label]}')
+    if values[0] == 'NA':
+        for label, value in zip(TOOTH_LABELS[1:4], values[1:4]):
+            if value != 'NA':
+                raise ValueError(f'{label} must be NA when the tooth is NA: {value!r}')
+
 
 class Tooth(object):
-    """docstring for Tooth"""
+    """A single tooth's recorded values.
+
+    Teeth are immutable and interned, constructing (or decoding) the same values always gives the same instance."""
 
     __slots__ = ['_tooth', '_calculus', '_eh', '_cavities', '_abcess']
 
-    @ensure_annotations
-    def __init__(self, tooth: str, calculus: str, eh: str, cavities: str, abcess: str):
-        check(tooth).is_in(VALID_TEETH).or_raise(ValueError)
-        check(calculus).is_in(VALID_CALCULUS).or_raise(ValueError)
-        check(eh).is_in(VALID_EH).or_raise(ValueError)
-        check(cavities).is_in(VALID_CAVITIES).or_raise(ValueError)
-        check(abcess).is_in(VALID_ABCESS).or_raise(ValueError)
-        # If there is no tooth then there can be no calculus, eh or cavities.
-        # Note there can be abcess
-        if tooth == 'NA':
-            check(calculus).equals('NA').or_raise(ValueError)
-            check(eh).equals('NA').or_raise(ValueError)
-            check(cavities).equals('NA').or_raise(ValueError)
-
-        self._tooth: str = tooth
-        self._calculus: str = calculus
-        self._eh: str = eh
-        self._cavities: str = cavities
-        self._abcess: str = abcess
+    def __new__(cls, tooth: str, calculus: str, eh: str, cavities: str, abcess: str):
+        return Tooth.from_row((tooth, calculus, eh, cavities, abcess))
 
     @property
     def tooth(self) -> str:
@@ -84,37 +116,90 @@ class Tooth(object):
         return Tooth('NA', 'NA', 'NA', 'NA', 'NA')
 
     def _to_pd_value(self, label: str) -> Optional[Union[int, bool]]:
-        val = getattr(self, label)
-        if val == 'NA':
-            return None
-
-        if label == 'tooth':
-            return VALID_TEETH.index(val) - 1
-        if label == 'calculus':
-            return VALID_CALCULUS.index(val) - 1
-        if label in ('eh', 'cavities', 'abcess'):
-            return bool(int(val))
-        raise RuntimeError
+        return _CODE_TO_PD_VALUE[label][TOOTH_CODES[label][getattr(self, label)] + 1]
 
-    def to_pd_series(self, prefix=''):
-        labels = []
+    def to_codes(self) -> List[int]:
+        """The tooth, calculus, eh, cavities and abcess values as small ints, see TOOTH_CODES"""
+        return [TOOTH_CODES['tooth'][self._tooth], TOOTH_CODES['calculus'][self._calculus], TOOTH_CODES['eh'][self._eh],
+                TOOTH_CODES['cavities'][self._cavities], TOOTH_CODES['abcess'][self._abcess]]
+
+    @staticmethod
+    def _create(values: Sequence[str]) -> 'Tooth':
+        tooth = object.__new__(Tooth)
+        for slot, value in zip(Tooth.__slots__, values):
+            object.__setattr__(tooth, slot, value)
+        return tooth
+
+    @staticmethod
+    def from_row(values: Sequence[str], trusted: bool = False) -> 'Tooth':
+        """Same as Tooth(*values), trusted skips validation (e.g. for already validated data)"""
+        key = tuple(values)
+        try:
+            tooth = _TEETH.get(key)
+        except TypeError:  # unhashable, so not valid either
+            tooth = None
+        if tooth is not None:
+            return tooth
+        if trusted:
+            # Not interned, only validated teeth are shared
+            return Tooth._create(key)
+        _validate_tooth(key)
+        tooth = Tooth._create(key)
+        _TEETH[key] = tooth
+        return tooth
+
+    @staticmethod
+    def from_codes(codes: Sequence[int], trusted: bool = False) -> 'Tooth':
+        key = tuple(codes)
+        tooth = _TEETH_BY_CODES.get(key)
+        if tooth is not None:
+            return tooth
         values = []
+        for label, code in zip(TOOTH_LABELS, codes):
+            valid = VALID_VALUES[label]
+            index = int(code) + 1
+            if not 0 <= index < len(valid):
+                raise ValueError(f'Invalid {label} code: {code}')
+            values.append(valid[index])
+        tooth = Tooth.from_row(values, trusted=trusted)
+        # Only validated teeth are shared
+        if tooth is _TEETH.get(tuple(values)):
+            _TEETH_BY_CODES[key] = tooth
+        return tooth
+
+    def to_pd_dict(self, prefix=''):
+        cells = {}
         for label in self.__slots__:
             label = label[1:]
-            labels.append(f'{prefix}{label}')
-            val = getattr(self, label)
-            values.append(val)
-            labels.append(f'{prefix}{label}_val')
-            values.append(self._to_pd_value(label))
-        return pd.Series(values, index=labels, copy=True)
+            cells[f'{prefix}{label}'] = Cell(getattr(self, label))
+            cells[f'{prefix}{label}_val'] = Cell(self._to_pd_value(label))
+        return cells
+
+    def to_pd_series(self, prefix=''):
+        cells = self.to_pd_dict(prefix=prefix)
+        return pd.Series([cell.value for cell in cells.values()], index=list(cells.keys()), copy=True)
 
     def __eq__(self, other):
+        if other is self:
+            return True
         if other is None:
             return False
         if type(other) != type(self):  # pylint: disable=C0123
             raise NotImplementedError
         return (self.tooth, self.calculus, self.eh, self.cavities, self.abcess) == (other.tooth, other.calculus, other.eh, other.cavities, other.abcess)
 
+    def __hash__(self):
+        return hash((self._tooth, self._calculus, self._eh, self._cavities, self._abcess))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (Tooth, (self._tooth, self._calculus, self._eh, self._cavities, self._abcess))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self._tooth!r}, {self._calculus!r}, {self._eh!r}, {self._cavities!r}, {self._abcess!r})'
+
 
 TOOTH_GROUPS = {
     'all':       [x - 1 for x in list(range(1, 33))],    # noqa: E241
@@ -123,6 +208,62 @@ TOOTH_GROUPS = {
     'canines':   [x - 1 for x in [6, 11, 22, 27]],    # noqa: E241
     'incisors':  [x - 1 for x in [7, 8, 9, 10, 23, 24, 25, 26]],    # noqa: E241
 }
+TOOTH_GROUP_INDEXES = {group: np.array(teeth, dtype=np.intp) for group, teeth in TOOTH_GROUPS.items()}
+
+
+def _group_summary_stats(codes: np.ndarray, group: str, prefix: str) -> Dict[str, np.ndarray]:
+    """Summary columns for one TOOTH_GROUPS group of a (n_mouths x 32 x 5) code array, as float64 arrays (NaN for NA)"""
+    prefix = f'{prefix}{group}_'
+    subset = codes[:, TOOTH_GROUP_INDEXES[group], :]
+    present = subset != NA_CODE
+
+    count = present.sum(axis=1)
+    total = np.where(present, subset, 0).sum(axis=1, dtype=np.int64)
+    maximum = np.where(present, subset, np.iinfo(np.int8).min).max(axis=1)
+    minimum = np.where(present, subset, np.iinfo(np.int8).max).min(axis=1)
+
+    # Every per tooth column has "tooth" in its name, so the "tooth" summary has always covered all the values
+    count[:, 0] = count.sum(axis=1)
+    total[:, 0] = total.sum(axis=1)
+    maximum[:, 0] = maximum.max(axis=1)
+    minimum[:, 0] = minimum.min(axis=1)
+
+    empty = count == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(empty, np.nan, total / count)
+    maximum = np.where(empty, np.nan, maximum)
+    minimum = np.where(empty, np.nan, minimum)
+
+    stats = {f'{prefix}number_of_teeth': present[:, :, 0].sum(axis=1).astype(np.float64)}
+    for i, label in enumerate(TOOTH_LABELS):
+        stats[f'{prefix}{label}_mean'] = mean[:, i]
+        stats[f'{prefix}{label}_max'] = maximum[:, i]
+        stats[f'{prefix}{label}_min'] = minimum[:, i]
+        stats[f'{prefix}{label}_count'] = count[:, i].astype(np.float64)
+    return stats
+
+
+def _group_summary_columns(group: str, prefix: str) -> List[str]:
+    prefix = f'{prefix}{group}_'
+    stats = [f'{prefix}number_of_teeth']
+    for label in TOOTH_LABELS:
+        stats.extend(f'{prefix}{label}_{stat}' for stat in ('mean', 'max', 'min', 'count'))
+    return stats
+
+
+def _summary_stats(codes: np.ndarray, prefix: str, columns: Optional[Collection[str]] = None) -> Dict[str, np.ndarray]:
+    """Every group's summary columns, or only the given ones (skipping the groups none are wanted from)"""
+    stats = {}
+    for group in TOOTH_GROUPS:
+        if columns is None:
+            stats.update(_group_summary_stats(codes, group, prefix))
+        elif any(column in columns for column in _group_summary_columns(group, prefix)):
+            stats.update(select_cells(_group_summary_stats(codes, group, prefix), columns))
+    return stats
+
+
+def _tooth_columns(i: int, prefix: str) -> List[str]:
+    return [f'{prefix}all_tooth_{i}_{label}{suffix}' for label in TOOTH_LABELS for suffix in ('', '_val')]
 
 
 class Mouth(object):
@@ -136,31 +277,85 @@ class Mouth(object):
     def empty():
         return Mouth([Tooth.empty()] * 32)
 
-    def _to_pd_series_group(self, group, prefix, include_all=False):
-        prefix = f'{prefix}{group}_'
-        teeth = [tooth for i, tooth in enumerate(self.teeth) if i in TOOTH_GROUPS[group]]
+    def state_key(self):
+        """The interned teeth, replacing one changes it"""
+        return tuple(self.teeth)
 
-        per_tooth = pd.Series([], index=[])
-        for i, tooth in enumerate(teeth):
-            per_tooth = per_tooth.append(tooth.to_pd_series(prefix=f'{prefix}tooth_{i}_'))
+    def to_codes(self) -> np.ndarray:
+        """(32 x 5) int8 array of Tooth.to_codes"""
+        return np.array([tooth.to_codes() for tooth in self.teeth], dtype=np.int8)
 
-        number_of_teeth = sum([1 for t in teeth if t.tooth != 'NA'])
-        summaray = pd.Series([number_of_teeth], index=[f'{prefix}number_of_teeth'], copy=True)
-        for label in Tooth.__slots__:
-            label = label[1:]
-            subset = pd.Series([v for k, v in per_tooth.items() if label in k and k.endswith('_val')])
-            summaray = summaray.append(pd.Series([subset.mean(skipna=True)], index=[f'{prefix}{label}_mean']))
-            summaray = summaray.append(pd.Series([subset.max(skipna=True)], index=[f'{prefix}{label}_max']))
-            summaray = summaray.append(pd.Series([subset.min(skipna=True)], index=[f'{prefix}{label}_min']))
-            summaray = summaray.append(pd.Series([subset.count()], index=[f'{prefix}{label}_count']))
+    @staticmethod
+    def from_codes(codes: np.ndarray, trusted: bool = False) -> 'Mouth':
+        return Mouth([Tooth.from_codes(tooth_codes, trusted=trusted) for tooth_codes in np.asarray(codes).tolist()])
 
-        result = summaray
-        if include_all:
-            result = per_tooth.append(result)
-        return result
+    @staticmethod
+    def from_rows(rows: Sequence[Sequence[str]], trusted: bool = False) -> 'Mouth':
+        """Build from the 32 teeth's (tooth, calculus, eh, cavities, abcess) values, see Tooth.from_row"""
+        return Mouth([Tooth.from_row(row, trusted=trusted) for row in rows])
+
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None):
+        """All the columns, or only the given ones, skipping the teeth and groups none are wanted from"""
+        cells = {}
+        for i, tooth in enumerate(self.teeth):
+            if columns is None or any(column in columns for column in _tooth_columns(i, prefix)):
+                cells.update(select_cells(tooth.to_pd_dict(prefix=f'{prefix}all_tooth_{i}_'), columns))
+        for key, values in _summary_stats(self.to_codes()[np.newaxis], prefix, columns).items():
+            value = values[0]
+            cells[key] = Cell(None if np.isnan(value) else float(value), 'float64')
+        return cells
 
     def to_pd_series(self, prefix=''):
-        return pd.concat([self._to_pd_series_group(group, prefix, include_all=(group == 'all')) for group in TOOTH_GROUPS])
+        cells = self.to_pd_dict(prefix=prefix)
+        return pd.Series([cell.value for cell in cells.values()], index=list(cells.keys()), copy=True)
+
+
+class MouthArray(object):
+    """Compact store for a batch of mouths as a (n_mouths x 32 x 5) int8 array of Tooth.to_codes.
+
+    The summary statistics for every TOOTH_GROUPS group are computed with array reductions over the whole batch."""
+
+    __slots__ = ['codes']
+
+    def __init__(self, codes: np.ndarray):
+        codes = np.asarray(codes, dtype=np.int8)
+        if codes.ndim != 3 or codes.shape[1:] != (32, len(TOOTH_LABELS)):
+            raise ValueError(f'Incorrect mouth array shape: {codes.shape}')
+        self.codes = codes
+
+    @staticmethod
+    def from_mouths(mouths: Iterable[Mouth]) -> 'MouthArray':
+        codes = [mouth.to_codes() for mouth in mouths]
+        if not codes:
+            return MouthArray(np.empty((0, 32, len(TOOTH_LABELS)), dtype=np.int8))
+        return MouthArray(np.stack(codes))
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def __getitem__(self, i: int) -> Mouth:
+        return Mouth.from_codes(self.codes[i].tolist())
+
+    def summary_stats(self, prefix='', columns: Optional[Collection[str]] = None) -> Dict[str, np.ndarray]:
+        """The Mouth.to_pd_dict summary columns (all or only the given ones) for every mouth, as float64 arrays (NaN
+        for NA)"""
+        return _summary_stats(self.codes, prefix, columns)
+
+    def to_pd_data_frame(self, index=None, prefix='', columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """Same columns as Mouth.to_pd_series, or only the given ones, one row per mouth"""
+        data = {}
+        for i in range(32):
+            for j, label in enumerate(TOOTH_LABELS):
+                name = f'{prefix}all_tooth_{i}_{label}'
+                if columns is not None and name not in columns and f'{name}_val' not in columns:
+                    continue
+                codes = self.codes[:, i, j].astype(np.intp) + 1
+                if columns is None or name in columns:
+                    data[name] = _CODE_TO_STR[label][codes]
+                if columns is None or f'{name}_val' in columns:
+                    data[f'{name}_val'] = _CODE_TO_PD_VALUE[label][codes]
+        data.update(self.summary_stats(prefix, columns))
+        return pd.DataFrame(data, index=index, columns=list(data.keys()))
 
 
 if __name__ == "__main__":
@@ -3,12 +3,16 @@
 
 from importlib.resources import open_binary
 import json
+import pickle
 from random import Random
 import unittest
 
 
+import numpy as np
+
+
 from . import test as bioarch_test
-from .mouth import Mouth, Tooth
+from .mouth import Mouth, MouthArray, Tooth
 
 
 class ToothTest(unittest.TestCase):
@@ -38,6 +42,26 @@ class ToothTest(unittest.TestCase):
             args[i] = '0'
             self.assertNotEqual(Tooth(*args), Tooth('A', '2', 'NA', '1', '1'))
 
+    def test_interned(self):
+        tooth = Tooth('A', '2', 'NA', '0', '1')
+        self.assertIs(Tooth('A', '2', 'NA', '0', '1'), tooth)
+        self.assertIs(Tooth.from_row(['A', '2', 'NA', '0', '1']), tooth)
+        self.assertIs(Tooth.from_codes([2, 2, -1, 0, 1]), tooth)
+        self.assertIs(Tooth.empty(), Tooth.empty())
+        self.assertIs(pickle.loads(pickle.dumps(tooth)), tooth)
+        self.assertEqual(len({tooth, Tooth('A', '2', 'NA', '0', '1'), Tooth.empty()}), 2)
+
+        with self.assertRaises(AttributeError):
+            tooth._tooth = 'B1'  # pylint: disable=W0212
+        with self.assertRaises(AttributeError):
+            tooth.tooth = 'B1'
+        self.assertEqual(tooth.tooth, 'A')
+
+        # Unvalidated teeth are not shared
+        self.assertIsNot(Tooth.from_row(['Z', '2', 'NA', '0', '1'], trusted=True), Tooth.from_row(['Z', '2', 'NA', '0', '1'], trusted=True))
+        with self.assertRaises(ValueError):
+            Tooth('Z', '2', 'NA', '0', '1')
+
     def test_to_pd_series(self):
         series = Tooth('A', '2', 'NA', '0', '1').to_pd_series()
         self.assertEqual(series.to_json(), '{"tooth":"A","tooth_val":2,"calculus":"2","calculus_val":2,"eh":"NA","eh_val":null,"cavities":"0","cavities_val":false,"abcess":"1","abcess_val":true}')
@@ -51,6 +75,37 @@ class ToothTest(unittest.TestCase):
             else:
                 self.assertEqual(series['tooth_val'], i - 1)
 
+    def test_codes(self):
+        self.assertEqual(Tooth('A', '2', 'NA', '0', '1').to_codes(), [2, 2, -1, 0, 1])
+        self.assertEqual(Tooth.empty().to_codes(), [-1, -1, -1, -1, -1])
+        self.assertEqual(Tooth.from_codes([2, 2, -1, 0, 1]), Tooth('A', '2', 'NA', '0', '1'))
+        self.assertEqual(Tooth.from_codes(np.array([11, 3, 1, 1, -1], dtype=np.int8)), Tooth('I', '3', '1', '1', 'NA'))
+        for codes in ([12, 2, -1, 0, 1], [2, 2, -2, 0, 1], [-1, 2, -1, -1, -1]):
+            with self.assertRaises(ValueError):
+                Tooth.from_codes(codes)
+
+    def test_from_row(self):
+        self.assertEqual(Tooth.from_row(['A', '2', 'NA', '0', '1']), Tooth('A', '2', 'NA', '0', '1'))
+        self.assertEqual(Tooth.from_row(('NA', 'NA', 'NA', 'NA', '1')), Tooth('NA', 'NA', 'NA', 'NA', '1'))
+
+        for i in range(0, 5):
+            with self.assertRaises(AssertionError):
+                args = ['A', '2', 'NA', '0', '1']
+                args[i] = None
+                Tooth.from_row(args)
+        with self.assertRaises(ValueError):
+            Tooth.from_row(['Z', '2', 'NA', '0', '1'])
+        with self.assertRaises(ValueError):
+            Tooth.from_row(['A', '2', 'NA', '0'])
+        for i in range(1, 4):
+            with self.assertRaises(ValueError):
+                args = ['NA', 'NA', 'NA', 'NA', '1']
+                args[i] = '1'
+                Tooth.from_row(args)
+
+        # Trusted values are not checked
+        self.assertEqual(Tooth.from_row(['Z', '2', 'NA', '0', '1'], trusted=True).tooth, 'Z')
+
 
 class MouthTest(unittest.TestCase):
     def test_construction(self):
@@ -58,6 +113,16 @@ class MouthTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             Mouth([Tooth.empty()] * 33)
 
+    def test_from_rows(self):
+        rows = [['A', '2', 'NA', '0', '1']] * 16 + [['NA', 'NA', 'NA', 'NA', 'NA']] * 16
+        mouth = Mouth.from_rows(rows)
+        self.assertEqual(mouth.teeth, [Tooth(*row) for row in rows])
+        self.assertEqual(Mouth.from_codes(mouth.to_codes()).teeth, mouth.teeth)
+        with self.assertRaises(ValueError):
+            Mouth.from_rows(rows[:31])
+        with self.assertRaises(ValueError):
+            Mouth.from_rows([['Z', '2', 'NA', '0', '1']] + rows[1:])
+
     def test_to_pd_series_values(self):
         random = Random(666)
         series = Mouth([Tooth('A', '2', 'NA', '0', random.choice(('NA', '0', '1'))) for _ in range(0, 32)]).to_pd_series()
@@ -80,6 +145,33 @@ class MouthTest(unittest.TestCase):
         self.assertEqual(actual_json, expected_json)
 
 
+class MouthArrayTest(unittest.TestCase):
+    def setUp(self):
+        random = Random(666)
+        self.mouths = [Mouth([Tooth(random.choice(('0', '1', 'A', 'I')), *[random.choice(('NA', '0', '1')) for _ in range(0, 4)]) if random.random() > 0.5 else Tooth.empty() for _ in range(0, 32)]) for _ in range(0, 10)]
+        self.mouths.append(Mouth.empty())
+
+    def test_construction(self):
+        array = MouthArray.from_mouths(self.mouths)
+        self.assertEqual(len(array), 11)
+        self.assertEqual(array.codes.shape, (11, 32, 5))
+        self.assertEqual(array.codes.dtype, np.int8)
+        self.assertEqual(array[3].teeth, self.mouths[3].teeth)
+
+        self.assertEqual(len(MouthArray.from_mouths([])), 0)
+        with self.assertRaises(ValueError):
+            MouthArray(np.zeros((2, 31, 5)))
+
+    def test_to_pd_data_frame(self):
+        df = MouthArray.from_mouths(self.mouths).to_pd_data_frame(index=[f'id{i}' for i in range(0, 11)], prefix='mouth_')
+
+        self.assertEqual(list(df.index), [f'id{i}' for i in range(0, 11)])
+        for i, mouth in enumerate(self.mouths):
+            expected = mouth.to_pd_series(prefix='mouth_')
+            self.assertEqual(list(df.columns), list(expected.index))
+            self.assertEqual(json.loads(df.iloc[i].to_json()), json.loads(expected.to_json()))
+
+
 def main():
     unittest.main()
 
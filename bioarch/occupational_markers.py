@@ -1,36 +1,58 @@
 #!/usr/bin/env python
 
 
+import inspect
 import logging
-from typing import Any, List, Union
+from typing import Any, Collection, Dict, Iterable, List, Tuple, Union
 
 
-import pandas as pd
+import numpy as np
 
 
+from . import instrumentation
+from .columns import Cell, select_cells, to_pd_data_frame
+from .lazy import pandas as pd
 from .left_right import LeftRight, Optional
 
 
 logger = logging.getLogger(__name__)
 
 
+# Every EnthesialMarker, by (value, is_s, is_oe)
+_ENTHESIAL_MARKERS: Dict[Tuple[float, bool, bool], 'EnthesialMarker'] = {}
+
+
 class EnthesialMarker(object):
-    """docstring for EnthesialMarker"""
-    def __init__(self, value: Union[int, float], is_s: bool = False, is_oe: bool = False):
-        self.value = float(value)  # 0-3 in 0.5 increments
-        self.is_s = is_s  # 0.5-3 in 0.5 increments ie "s0.5"
-        self.is_oe = is_oe  # 0.5-3 in 0.5 increments ie "oe0.5"
+    """An enthesial marker score.
+
+    Markers are immutable and interned, constructing (or parsing) the same score always gives the same instance."""
+
+    __slots__ = ['value', 'is_s', 'is_oe']
+
+    def __new__(cls, value: Union[int, float], is_s: bool = False, is_oe: bool = False):
+        key = (float(value), bool(is_s), bool(is_oe))
+        marker = _ENTHESIAL_MARKERS.get(key)
+        if marker is not None:
+            return marker
 
-        if self.is_s and self.is_oe:
+        value, is_s, is_oe = key  # value 0-3 in 0.5 increments, s/oe 0.5-3 in 0.5 increments ie "s0.5"/"oe0.5"
+        if is_s and is_oe:
             raise ValueError('Can not be both "s" and "oe" EnthesialMarker')
-        if self.is_s or self.is_oe:
-            if self.value < 0.5 or self.value > 3:
-                raise ValueError(f'Invalid EnthesialMarker value, s/oe should be within 0.5 to 3: {self.value}')
+        if is_s or is_oe:
+            if value < 0.5 or value > 3:
+                raise ValueError(f'Invalid EnthesialMarker value, s/oe should be within 0.5 to 3: {value}')
         else:
-            if self.value < 0 or self.value > 3:
-                raise ValueError(f'Invalid EnthesialMarker value, non s/oe should be within 0 to 3: {self.value}')
-        if self.value % 0.5 != 0.0:
-            raise ValueError(f'Invalid EnthesialMarker value, not a 0.5 increment: {self.value}')
+            if value < 0 or value > 3:
+                raise ValueError(f'Invalid EnthesialMarker value, non s/oe should be within 0 to 3: {value}')
+        if value % 0.5 != 0.0:
+            raise ValueError(f'Invalid EnthesialMarker value, not a 0.5 increment: {value}')
+
+        marker = super().__new__(cls)
+        object.__setattr__(marker, 'value', value)
+        object.__setattr__(marker, 'is_s', is_s)
+        object.__setattr__(marker, 'is_oe', is_oe)
+        _ENTHESIAL_MARKERS[key] = marker
+        return marker
 
     @staticmethod
     def parse(value: Any) -> Optional['EnthesialMarker']:
@@ -69,6 +91,7 @@ class EnthesialMarker(object):
             try:
                 value = float(value)
             except ValueError as e:
+                instrumentation.parse_failed(EnthesialMarker.__name__)
                 raise ValueError(f'Unknown EnthesialMarker: "{original_value}"') from e
 
         if isinstance(value, int):
@@ -83,6 +106,7 @@ class EnthesialMarker(object):
                 is_s = True
 
         if not isinstance(value, float):
+            instrumentation.parse_failed(EnthesialMarker.__name__)
             raise ValueError(f'Unknown EnthesialMarker: "{original_value}"')
 
         return EnthesialMarker(value, is_s=is_s, is_oe=is_oe)
@@ -100,12 +124,23 @@ class EnthesialMarker(object):
         return left if right is None else right
 
     def __eq__(self, other: Any):
+        if other is self:
+            return True
         if other is None:
             return False
         if type(other) != type(self):  # pylint: disable=C0123
             raise NotImplementedError
         return ((self.value, self.is_s, self.is_oe) == (other.value, other.is_s, other.is_oe))  # pylint: disable=C0325
 
+    def __hash__(self):
+        return hash((self.value, self.is_s, self.is_oe))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self):
+        return (EnthesialMarker, (self.value, self.is_s, self.is_oe))
+
     def __repr__(self):
         return f'{self.__class__.__name__}: {self}'
 
@@ -115,101 +150,139 @@ class EnthesialMarker(object):
         return f'{s}{oe}{self.value}'
 
 
+# Every distinct LeftRight of markers seen, see OccupationalMarkers.__init__
+_MARKER_PAIRS: Dict[LeftRight, LeftRight] = {}
+
+# Every EnthesialMarker parsed from its as_num, see OccupationalMarkers.from_array
+_MARKERS_BY_NUM: Dict[float, EnthesialMarker] = {}
+
+
+def _from_num(num: float) -> Optional[EnthesialMarker]:
+    if num != num:  # NaN
+        return None
+    marker = _MARKERS_BY_NUM.get(num)
+    if marker is None:
+        marker = EnthesialMarker.parse(num)
+        _MARKERS_BY_NUM[num] = marker
+    return marker
+
+
 class OccupationalMarkers(object):  # pylint: disable=R0902
     """docstring for OccupationalMarkers"""
     def __init__(self, c_trapezius: LeftRight[EnthesialMarker], c_o_deltiod: LeftRight[EnthesialMarker], c_o_pectoralis_major: LeftRight[EnthesialMarker], c_costoclaviclar_lig: LeftRight[EnthesialMarker], c_subcalvius: LeftRight[EnthesialMarker], c_conoid_lig: LeftRight[EnthesialMarker], c_trapezoid_lig: LeftRight[EnthesialMarker], s_pectoralis_minor: LeftRight[EnthesialMarker], s_levator_scapulae: LeftRight[EnthesialMarker], s_triceps_long_head: LeftRight[EnthesialMarker], s_trapezius: LeftRight[EnthesialMarker], h_subscapularis: LeftRight[EnthesialMarker], h_teres_major: LeftRight[EnthesialMarker], h_latissimus_dorsi: LeftRight[EnthesialMarker], h_pectoralis_major: LeftRight[EnthesialMarker], h_deltoid: LeftRight[EnthesialMarker], h_coracobrachialis: LeftRight[EnthesialMarker], h_supraspinatus: LeftRight[EnthesialMarker], h_infraspinatus: LeftRight[EnthesialMarker], h_teres_minor: LeftRight[EnthesialMarker], h_o_extensor: LeftRight[EnthesialMarker], h_o_flexor: LeftRight[EnthesialMarker], u_brachialis: LeftRight[EnthesialMarker], u_o_pronator_quadrataus: LeftRight[EnthesialMarker], u_triceps_brachii: LeftRight[EnthesialMarker], u_anconeus: LeftRight[EnthesialMarker], u_o_supinator: LeftRight[EnthesialMarker], r_biceps_brachii: LeftRight[EnthesialMarker], r_supinator: LeftRight[EnthesialMarker], r_pronator_teres: LeftRight[EnthesialMarker], r_pronator_quadratus: LeftRight[EnthesialMarker], r_brachoradialis: LeftRight[EnthesialMarker], f_gluteus_minimus: LeftRight[EnthesialMarker], f_gluteus_medius: LeftRight[EnthesialMarker], f_piriformus: LeftRight[EnthesialMarker], f_obturator_internus: LeftRight[EnthesialMarker], f_obturator_externus: LeftRight[EnthesialMarker], f_quadratis_femoris: LeftRight[EnthesialMarker], f_ilioposas: LeftRight[EnthesialMarker], f_gluteus_maximus: LeftRight[EnthesialMarker], f_pectineus: LeftRight[EnthesialMarker], f_o_vastus_medialis: LeftRight[EnthesialMarker], f_o_vastus_lateralis: LeftRight[EnthesialMarker], f_adductor_magnus: LeftRight[EnthesialMarker], f_o_gastrocnemius: LeftRight[EnthesialMarker], f_o_plantaris: LeftRight[EnthesialMarker], f_o_popliteus: LeftRight[EnthesialMarker], t_tensor_fascia_latae: LeftRight[EnthesialMarker], t_quadriceps: LeftRight[EnthesialMarker], t_sartorius: LeftRight[EnthesialMarker], t_gracilis: LeftRight[EnthesialMarker], t_semitendinosus: LeftRight[EnthesialMarker], t_o_tibialus_anterior: LeftRight[EnthesialMarker], t_biceps_femoris: LeftRight[EnthesialMarker], t_semimembranosus: LeftRight[EnthesialMarker], t_popliteus: LeftRight[EnthesialMarker], t_o_soleus: LeftRight[EnthesialMarker], t_o_tibialis_posterior: LeftRight[EnthesialMarker], t_o_flexor_digitorium: LeftRight[EnthesialMarker], f_biceps_femoris: LeftRight[EnthesialMarker], f_o_extensor_muscles: LeftRight[EnthesialMarker], f_o_flexor_muscles: LeftRight[EnthesialMarker], f_o_peroneus_longus: LeftRight[EnthesialMarker], f_o_peronus_brevis: LeftRight[EnthesialMarker], f_o_soleus: LeftRight[EnthesialMarker], p_quadriceps: LeftRight[EnthesialMarker], c_achilles: LeftRight[EnthesialMarker]):
-        self.c_trapezius = c_trapezius
-        self.c_o_deltiod = c_o_deltiod
-        self.c_o_pectoralis_major = c_o_pectoralis_major
-        self.c_costoclaviclar_lig = c_costoclaviclar_lig
-        self.c_subcalvius = c_subcalvius
-        self.c_conoid_lig = c_conoid_lig
-        self.c_trapezoid_lig = c_trapezoid_lig
-        self.s_pectoralis_minor = s_pectoralis_minor
-        self.s_levator_scapulae = s_levator_scapulae
-        self.s_triceps_long_head = s_triceps_long_head
-        self.s_trapezius = s_trapezius
-        self.h_subscapularis = h_subscapularis
-        self.h_teres_major = h_teres_major
-        self.h_latissimus_dorsi = h_latissimus_dorsi
-        self.h_pectoralis_major = h_pectoralis_major
-        self.h_deltoid = h_deltoid
-        self.h_coracobrachialis = h_coracobrachialis
-        self.h_supraspinatus = h_supraspinatus
-        self.h_infraspinatus = h_infraspinatus
-        self.h_teres_minor = h_teres_minor
-        self.h_o_extensor = h_o_extensor
-        self.h_o_flexor = h_o_flexor
-        self.u_brachialis = u_brachialis
-        self.u_o_pronator_quadrataus = u_o_pronator_quadrataus
-        self.u_triceps_brachii = u_triceps_brachii
-        self.u_anconeus = u_anconeus
-        self.u_o_supinator = u_o_supinator
-        self.r_biceps_brachii = r_biceps_brachii
-        self.r_supinator = r_supinator
-        self.r_pronator_teres = r_pronator_teres
-        self.r_pronator_quadratus = r_pronator_quadratus
-        self.r_brachoradialis = r_brachoradialis
-        self.f_gluteus_minimus = f_gluteus_minimus
-        self.f_gluteus_medius = f_gluteus_medius
-        self.f_piriformus = f_piriformus
-        self.f_obturator_internus = f_obturator_internus
-        self.f_obturator_externus = f_obturator_externus
-        self.f_quadratis_femoris = f_quadratis_femoris
-        self.f_ilioposas = f_ilioposas
-        self.f_gluteus_maximus = f_gluteus_maximus
-        self.f_pectineus = f_pectineus
-        self.f_o_vastus_medialis = f_o_vastus_medialis
-        self.f_o_vastus_lateralis = f_o_vastus_lateralis
-        self.f_adductor_magnus = f_adductor_magnus
-        self.f_o_gastrocnemius = f_o_gastrocnemius
-        self.f_o_plantaris = f_o_plantaris
-        self.f_o_popliteus = f_o_popliteus
-        self.t_tensor_fascia_latae = t_tensor_fascia_latae
-        self.t_quadriceps = t_quadriceps
-        self.t_sartorius = t_sartorius
-        self.t_gracilis = t_gracilis
-        self.t_semitendinosus = t_semitendinosus
-        self.t_o_tibialus_anterior = t_o_tibialus_anterior
-        self.t_biceps_femoris = t_biceps_femoris
-        self.t_semimembranosus = t_semimembranosus
-        self.t_popliteus = t_popliteus
-        self.t_o_soleus = t_o_soleus
-        self.t_o_tibialis_posterior = t_o_tibialis_posterior
-        self.t_o_flexor_digitorium = t_o_flexor_digitorium
-        self.f_biceps_femoris = f_biceps_femoris
-        self.f_o_extensor_muscles = f_o_extensor_muscles
-        self.f_o_flexor_muscles = f_o_flexor_muscles
-        self.f_o_peroneus_longus = f_o_peroneus_longus
-        self.f_o_peronus_brevis = f_o_peronus_brevis
-        self.f_o_soleus = f_o_soleus
-        self.p_quadriceps = p_quadriceps
-        self.c_achilles = c_achilles
+        arguments = locals()
+        for muscle in OccupationalMarkers.__slots__:
+            pair = arguments[muscle]
+            # Pairs are immutable, so equal ones (there are few distinct ones) are shared
+            setattr(self, muscle, pair if pair is None else _MARKER_PAIRS.setdefault(pair, pair))
+
+    # One slot per muscle, the __init__ arguments
+    __slots__ = tuple(inspect.signature(__init__).parameters)[1:]
 
     @staticmethod
     def empty() -> 'OccupationalMarkers':
+        # LeftRight is immutable, so the muscles can share one
         markers: List[LeftRight[EnthesialMarker]] = [LeftRight(None, None)] * 67
         return OccupationalMarkers(*markers)
 
-    def to_pd_data_frame(self, index) -> pd.Series:
-        data = {
-            'id': pd.Series([index]),
-        }
-        for key, value in self.__dict__.items():
-            data[f'{key}_left'] = value.left.as_num() if value.left else None
-            data[f'{key}_right'] = value.right.as_num() if value.right else None
-            value_avg = value.avg()
-            data[f'{key}_avg'] = value_avg.as_num() if value_avg else None
-        lr_df = pd.DataFrame.from_dict(data).set_index('id')
-
-        for side in ('left', 'right', 'avg'):
-            df = lr_df[[c for c in lr_df.columns if c.endswith(f'_{side}')]].copy()
-            lr_df[f'min_{side}'] = df.min(axis=1)
-            lr_df[f'max_{side}'] = df.max(axis=1)
-            lr_df[f'mean_{side}'] = df.mean(axis=1)
-            lr_df[f'count_{side}'] = df.count(axis=1)
-
-        return lr_df
+    def state_key(self):
+        """The muscles' shared, immutable, pairs"""
+        return tuple(getattr(self, muscle) for muscle in OccupationalMarkers.__slots__)
+
+    def to_array(self) -> np.ndarray:
+        """(67 x 2) float32 array of the left and right EnthesialMarker.as_num, in MUSCLES order, NaN when missing"""
+        markers = np.full((len(MUSCLES), 2), np.nan, dtype=np.float32)
+        for i, muscle in enumerate(MUSCLES):
+            value = getattr(self, muscle)
+            if value.left is not None:
+                markers[i, 0] = value.left.as_num()
+            if value.right is not None:
+                markers[i, 1] = value.right.as_num()
+        return markers
+
+    @staticmethod
+    def from_array(markers: np.ndarray) -> 'OccupationalMarkers':
+        return OccupationalMarkers(*[LeftRight(_from_num(left), _from_num(right)) for left, right in np.asarray(markers).tolist()])
+
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None) -> Dict[str, Cell]:
+        """All the columns, or only the given ones"""
+        cells = {}
+        for key, values in _to_pd_columns(self.to_array()[np.newaxis], prefix, columns).items():
+            value = values[0]
+            if key.startswith(f'{prefix}count_'):
+                cells[key] = Cell(int(value))
+            else:
+                cells[key] = Cell(None if np.isnan(value) else float(value), 'float64')
+        return cells
+
+    def to_pd_data_frame(self, index) -> 'pd.DataFrame':
+        return to_pd_data_frame(index, self.to_pd_dict())
+
+
+MUSCLES: Tuple[str, ...] = OccupationalMarkers.__slots__
+
+
+def _to_pd_columns(markers: np.ndarray, prefix: str, columns: Optional[Collection[str]] = None) -> Dict[str, np.ndarray]:
+    """Export columns for a (n x 67 x 2) array of as_num values: every muscle's left, right and avg, then the per
+    side min, max, mean and count. With columns only those are computed, a side is only reduced if one of its
+    summaries is wanted."""
+    def wanted(name):
+        return columns is None or name in columns
+
+    markers = markers.astype(np.float64)
+    left = markers[:, :, 0]
+    right = markers[:, :, 1]
+    # See EnthesialMarker.avg
+    avg = np.where(np.isnan(right), left, right)
+    sides = {'left': left, 'right': right, 'avg': avg}
+
+    data = {}
+    for i, muscle in enumerate(MUSCLES):
+        for side, values in sides.items():
+            if wanted(f'{prefix}{muscle}_{side}'):
+                data[f'{prefix}{muscle}_{side}'] = values[:, i]
+
+    for side, values in sides.items():
+        if not any(wanted(f'{prefix}{stat}_{side}') for stat in ('min', 'max', 'mean', 'count')):
+            continue
+        count = np.count_nonzero(~np.isnan(values), axis=1)
+        data[f'{prefix}min_{side}'] = np.fmin.reduce(values, axis=1)
+        data[f'{prefix}max_{side}'] = np.fmax.reduce(values, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            data[f'{prefix}mean_{side}'] = np.nansum(values, axis=1) / count
+        data[f'{prefix}count_{side}'] = count
+    return select_cells(data, columns)
+
+
+class OccupationalMarkersArray(object):
+    """Compact store for the OccupationalMarkers of many individuals as a (n x 67 x 2) float32 array of
+    EnthesialMarker.as_num values (NaN when missing), with the muscles in MUSCLES order."""
+
+    __slots__ = ['markers']
+
+    def __init__(self, markers: np.ndarray):
+        markers = np.asarray(markers, dtype=np.float32)
+        if markers.ndim != 3 or markers.shape[1:] != (len(MUSCLES), 2):
+            raise ValueError(f'Incorrect occupational markers array shape: {markers.shape}')
+        self.markers = markers
+
+    @staticmethod
+    def from_occupational_markers(occupational_markers: Iterable[OccupationalMarkers]) -> 'OccupationalMarkersArray':
+        markers = [om.to_array() for om in occupational_markers]
+        if not markers:
+            return OccupationalMarkersArray(np.empty((0, len(MUSCLES), 2), dtype=np.float32))
+        return OccupationalMarkersArray(np.stack(markers))
+
+    def __len__(self):
+        return self.markers.shape[0]
+
+    def __getitem__(self, i: int) -> OccupationalMarkers:
+        return OccupationalMarkers.from_array(self.markers[i])
+
+    def to_pd_data_frame(self, index=None, prefix='', columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """Same columns as OccupationalMarkers.to_pd_dict, or only the given ones, one row per individual"""
+        data = _to_pd_columns(self.markers, prefix, columns)
+        return pd.DataFrame(data, index=index, columns=list(data.keys()))
 
 
 if __name__ == "__main__":
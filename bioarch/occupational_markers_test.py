@@ -3,13 +3,17 @@
 
 from importlib.resources import open_binary
 import json
+import pickle
 from random import Random
 import unittest
 
 
+import numpy as np
+
+
 from . import test as bioarch_test
 from .left_right import LeftRight
-from .occupational_markers import EnthesialMarker, OccupationalMarkers
+from .occupational_markers import EnthesialMarker, MUSCLES, OccupationalMarkers, OccupationalMarkersArray
 
 
 class EnthesialMarkerTest(unittest.TestCase):
@@ -61,6 +65,26 @@ class EnthesialMarkerTest(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             EnthesialMarker.parse('S.5').__eq__('hello')
 
+    def test_interned(self):
+        self.assertIs(EnthesialMarker.parse('S.5'), EnthesialMarker(0.5, is_s=True))
+        self.assertIs(EnthesialMarker(1), EnthesialMarker(1.0, False, False))
+        self.assertIs(EnthesialMarker.parse(4.5), EnthesialMarker.parse('s1.5'))
+        self.assertIsNot(EnthesialMarker(1), EnthesialMarker(1, is_oe=True))
+        self.assertIs(pickle.loads(pickle.dumps(EnthesialMarker(2.5))), EnthesialMarker(2.5))
+        self.assertEqual(len({EnthesialMarker(1), EnthesialMarker.parse('1'), EnthesialMarker(2)}), 2)
+
+        marker = EnthesialMarker(1)
+        with self.assertRaises(AttributeError):
+            marker.value = 2.0
+        with self.assertRaises(AttributeError):
+            marker.other = 2.0
+        self.assertEqual(marker.value, 1.0)
+
+        # Invalid markers are never cached
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                EnthesialMarker(3.5)
+
     def test_avg(self):
         va1 = EnthesialMarker.parse('S.5')
         va2 = EnthesialMarker.parse('S.5')
@@ -83,6 +107,14 @@ class OccupationalMarkersTest(unittest.TestCase):
     def random_em(self):
         return EnthesialMarker.parse(self.random.choice((None, 0, 1.5, 3.0, 3.5, 6.5)))
 
+    def test_shared_pairs(self):
+        first = OccupationalMarkers(*[LeftRight(EnthesialMarker(1.5), None) for _ in range(0, 67)])
+        second = OccupationalMarkers.from_array(first.to_array())
+        self.assertIs(first.c_trapezius, first.c_achilles)
+        self.assertIs(second.c_trapezius, first.c_trapezius)
+        self.assertFalse(hasattr(first, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(first)).c_achilles, LeftRight(EnthesialMarker(1.5), None))
+
     def test_to_pd_data_frame_values(self):
         df = OccupationalMarkers(*[LeftRight(self.random_em(), self.random_em()) for _ in range(0, 67)]).to_pd_data_frame('id1')
 
@@ -105,6 +137,52 @@ class OccupationalMarkersTest(unittest.TestCase):
 
         self.assertEqual(actual_json, expected_json)
 
+    def test_array(self):
+        om = OccupationalMarkers(*[LeftRight(self.random_em(), self.random_em()) for _ in range(0, 67)])
+        markers = om.to_array()
+
+        self.assertEqual(len(MUSCLES), 67)
+        self.assertEqual(MUSCLES[0], 'c_trapezius')
+        self.assertEqual(markers.shape, (67, 2))
+        self.assertEqual(markers.dtype, np.float32)
+        for i, muscle in enumerate(MUSCLES):
+            value = getattr(om, muscle)
+            for j, marker in enumerate((value.left, value.right)):
+                if marker is None:
+                    self.assertTrue(np.isnan(markers[i, j]))
+                else:
+                    self.assertEqual(markers[i, j], marker.as_num())
+
+        round_trip = OccupationalMarkers.from_array(markers)
+        for muscle in MUSCLES:
+            self.assertEqual(getattr(round_trip, muscle), getattr(om, muscle))
+
+
+class OccupationalMarkersArrayTest(unittest.TestCase):
+    def setUp(self):
+        random = Random(666)
+        values = (None, 0, 1.5, 3.0, 3.5, 6.5, 9.0)
+        self.oms = [OccupationalMarkers(*[LeftRight(EnthesialMarker.parse(random.choice(values)), EnthesialMarker.parse(random.choice(values))) for _ in range(0, 67)]) for _ in range(0, 5)]
+        self.oms.append(OccupationalMarkers.empty())
+
+    def test_construction(self):
+        array = OccupationalMarkersArray.from_occupational_markers(self.oms)
+        self.assertEqual(len(array), 6)
+        self.assertEqual(array.markers.shape, (6, 67, 2))
+        self.assertEqual(array[2].c_achilles, self.oms[2].c_achilles)
+
+        self.assertEqual(len(OccupationalMarkersArray.from_occupational_markers([])), 0)
+        with self.assertRaises(ValueError):
+            OccupationalMarkersArray(np.zeros((1, 66, 2)))
+
+    def test_to_pd_data_frame(self):
+        df = OccupationalMarkersArray.from_occupational_markers(self.oms).to_pd_data_frame(index=[f'id{i}' for i in range(0, 6)], prefix='om_')
+
+        for i, om in enumerate(self.oms):
+            expected = om.to_pd_data_frame(f'id{i}').add_prefix('om_')
+            self.assertEqual(list(df.columns), list(expected.columns))
+            self.assertEqual(json.loads(df.iloc[[i]].to_json(orient='records')), json.loads(expected.to_json(orient='records')))
+
 
 def main():
     unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+
+import numpy as np
+
+
+T = TypeVar('T')
+
+
+def parse_many(parse: Callable[[Any], T], values: Iterable[Any]) -> List[T]:
+    """Apply parse to every value, parsing each distinct value only once"""
+    cache: Dict[Tuple[type, Any], T] = {}
+    results: List[T] = []
+    for value in values:
+        # Keyed on the type too, so 1, 1.0 and True are not mixed up
+        key = (type(value), value)
+        try:
+            result = cache[key]
+        except KeyError:
+            result = parse(value)
+            cache[key] = result
+        except TypeError:  # unhashable
+            result = parse(value)
+        results.append(result)
+    return results
+
+
+def parse_array(parse: Callable[[Any], T], values: Any) -> np.ndarray:
+    """parse_many over a whole array, giving an object array of the same shape"""
+    values = np.asarray(values, dtype=object)
+    parsed = np.empty(values.shape, dtype=object)
+    parsed.ravel()[:] = parse_many(parse, values.ravel())
+    return parsed
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+import numpy as np
+
+
+from .parsing import parse_array, parse_many
+
+
+class ParsingTest(unittest.TestCase):
+    def test_parse_many(self):
+        calls = []
+
+        def parse(value):
+            calls.append(value)
+            return str(value)
+
+        self.assertEqual(parse_many(parse, [1, 1, 1.0, True, 2, 1]), ['1', '1', '1.0', 'True', '2', '1'])
+        self.assertEqual(calls, [1, 1.0, True, 2])
+
+        # Unhashable values are still parsed, just not cached
+        self.assertEqual(parse_many(len, [[1], [1, 2]]), [1, 2])
+
+    def test_parse_array(self):
+        parsed = parse_array(str, np.array([[1, 2], [3, 1]]))
+        self.assertEqual(parsed.shape, (2, 2))
+        self.assertEqual(parsed.dtype, object)
+        self.assertEqual(parsed.tolist(), [['1', '2'], ['3', '1']])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import time
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+from . import instrumentation
+from .columns import ColumnBuilder
+from .context import ContextArray
+from .individual import Individual, projected_sections, SECTION_PREFIXES, section_to_pd_dict
+from .joints import JointsArray
+from .lazy import pandas as pd
+from .mouth import MouthArray
+from .occupational_markers import OccupationalMarkersArray
+from .trauma import TraumaArray
+
+
+# Sections exported in one vectorised pass, by building their compact array store
+ARRAY_SECTIONS = {
+    'mouth': MouthArray.from_mouths,
+    'occupational_markers': OccupationalMarkersArray.from_occupational_markers,
+    'context': ContextArray.from_contexts,
+    'joints': JointsArray.from_joints,
+    'trauma': TraumaArray.from_trauma,
+}
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def merge_pd_data_frames(frames: Sequence['pd.DataFrame']) -> 'pd.DataFrame':
+    """Stack, in order, the row blocks of an export.
+
+    Columns are ordered by first appearance, a column missing from a block is filled with None using the dtype it
+    first appeared with (as Population.to_pd_data_frame does for rows)."""
+    dtypes: Dict[Any, Any] = {}
+    for frame in frames:
+        for column, dtype in frame.dtypes.items():
+            dtypes.setdefault(column, dtype)
+    columns = list(dtypes.keys())
+
+    blocks = []
+    for frame in frames:
+        missing = [column for column in columns if column not in frame.columns]
+        if missing:
+            frame = frame.copy()
+            for column in missing:
+                frame[column] = pd.Series([None] * len(frame), index=frame.index, dtype=dtypes[column])
+        blocks.append(frame[columns])
+    return pd.concat(blocks, axis=0, sort=False)
+
+
+def _chunk_to_pd_data_frame(individuals: List[Individual], columns: Optional[List[str]] = None, sections: Optional[List[str]] = None) -> 'pd.DataFrame':
+    return Population(individuals).to_pd_data_frame(columns=columns, sections=sections)
+
+
+class Population(object):
+    """A collection of Individuals that can be exported as a single data frame.
+
+    The export gathers every individual's values into per column lists and builds the data frame once, rather than
+    building and concatenating a data frame per individual."""
+
+    def __init__(self, individuals: Iterable[Individual] = ()):
+        self.individuals: List[Individual] = list(individuals)
+
+    def add(self, individual: Individual):
+        self.individuals.append(individual)
+
+    def extend(self, individuals: Iterable[Individual]):
+        self.individuals.extend(individuals)
+
+    def __len__(self):
+        return len(self.individuals)
+
+    def __iter__(self) -> Iterator[Individual]:
+        return iter(self.individuals)
+
+    def __getitem__(self, key):
+        return self.individuals[key]
+
+    def section_to_pd_data_frame(self, section: str, prefix: Optional[str] = None, columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """The columns (all or only the given ones) of one section (see SECTION_PREFIXES) of to_pd_data_frame, with a
+        0 to n index. Instrumented (see instrumentation) as "population.<section>"."""
+        started = time.perf_counter() if instrumentation.ENABLED else None
+        if prefix is None:
+            prefix = SECTION_PREFIXES[section]
+        if section in ARRAY_SECTIONS:
+            array = ARRAY_SECTIONS[section](getattr(individual, section) for individual in self.individuals)
+            df = array.to_pd_data_frame(prefix=prefix, columns=columns)
+        else:
+            rows = ((row, section_to_pd_dict(getattr(individual, section), section, columns, prefix)) for row, individual in enumerate(self.individuals))
+            df = ColumnBuilder.from_rows(rows).to_pd_data_frame()
+        if started is not None:
+            instrumentation.record(f'population.{section}', started, len(self.individuals))
+        return df
+
+    def to_pd_data_frame(self, columns: Optional[Iterable[str]] = None, sections: Optional[Iterable[str]] = None) -> 'pd.DataFrame':
+        """Same columns and dtypes as Individual.to_pd_data_frame (projected the same way), one row per individual.
+        The sections' frames are joined in "population.join" (see instrumentation)."""
+        ids = [individual.id for individual in self.individuals]
+        frames = [pd.DataFrame({'id': ids})]
+        for section, section_columns in projected_sections(columns, sections).items():
+            frames.append(self.section_to_pd_data_frame(section, columns=section_columns))
+        started = time.perf_counter() if instrumentation.ENABLED else None
+        df = pd.concat(frames, axis=1, sort=False)
+        df.index = pd.Index(ids)
+        if started is not None:
+            instrumentation.record('population.join', started, len(ids))
+        return df
+
+    def to_pd_data_frame_parallel(self, processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                  columns: Optional[Iterable[str]] = None, sections: Optional[Iterable[str]] = None) -> 'pd.DataFrame':
+        """to_pd_data_frame spread over a pool of processes (default one per CPU), chunk_size individuals at a time.
+
+        The result is the same as to_pd_data_frame, rows are always in the population's order."""
+        if chunk_size < 1:
+            raise ValueError(f'Invalid chunk_size: {chunk_size}')
+        if processes is not None and processes < 1:
+            raise ValueError(f'Invalid processes: {processes}')
+        columns = list(columns) if columns is not None else None
+        sections = list(sections) if sections is not None else None
+        chunks = [self.individuals[start:start + chunk_size] for start in range(0, len(self.individuals), chunk_size)]
+        if len(chunks) <= 1 or processes == 1:
+            return self.to_pd_data_frame(columns=columns, sections=sections)
+        # Fail before starting the pool on an unknown column or section
+        projected_sections(columns, sections)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            # map returns results in submission order, whatever order the workers finish in
+            frames = list(executor.map(functools.partial(_chunk_to_pd_data_frame, columns=columns, sections=sections), chunks))
+        return merge_pd_data_frames(frames)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self}'
+
+    def __str__(self):
+        return f'{len(self.individuals)} individuals'
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
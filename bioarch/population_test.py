@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+
+import json
+import unittest
+
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+
+from .context import BodyPosition, CompassBearing, Context, Present
+from .individual import AgeSexStature, BurialInfo, Individual, OsteologicalSex
+from .joints import JointCondition, Joints
+from .left_right import LeftRight
+from .mouth import Mouth, Tooth
+from .occupational_markers import EnthesialMarker, OccupationalMarkers
+from .population import merge_pd_data_frames, Population
+from .sex import Sex
+from .trauma import Trauma
+
+
+def individual_for_test(_id, sex, grave_goods):
+    age_sex_stature = AgeSexStature.empty()
+    age_sex_stature.osteological_sex = OsteologicalSex(sex, None, sex)
+    mouth = Mouth([Tooth('A', '2', 'NA', '0', '1')] * 16 + [Tooth.empty()] * 16)
+    occupational_markers = OccupationalMarkers(*([LeftRight(EnthesialMarker(1.5), None)] * 67))
+    joints = Joints.empty()
+    joints.hip = LeftRight(JointCondition.MILD, JointCondition.EXTREME)
+    context = Context(BodyPosition.SUPINE, CompassBearing.WEST, Present.PRESENT, None, None, None, grave_goods)
+    return Individual(_id, BurialInfo('site_name', 'site_id'), age_sex_stature, mouth, occupational_markers, joints, Trauma.empty(), context)
+
+
+class PopulationTest(unittest.TestCase):
+    def test_container(self):
+        population = Population()
+        self.assertEqual(len(population), 0)
+        individual = individual_for_test('id_1', Sex.MALE, {})
+        population.add(individual)
+        population.extend([individual_for_test('id_2', Sex.FEMALE, {})])
+        self.assertEqual(len(population), 2)
+        self.assertIs(population[0], individual)
+        self.assertEqual([i.id for i in population], ['id_1', 'id_2'])
+
+    def test_to_pd_data_frame_matches_individual(self):
+        individuals = [individual_for_test('id_1', Sex.MALE, {'spear': True, 'pot': False}),
+                       individual_for_test('id_2', None, {'comb': True}),
+                       individual_for_test('id_3', Sex.FEMALE_LIKELY, {})]
+
+        df = Population(individuals).to_pd_data_frame()
+        expected = pd.concat([i.to_pd_data_frame() for i in individuals], sort=False)
+
+        self.assertEqual(list(df.index), ['id_1', 'id_2', 'id_3'])
+        self.assertEqual(list(df.columns), list(expected.columns))
+        for individual in individuals:
+            for column, dtype in individual.to_pd_data_frame().dtypes.items():
+                if isinstance(dtype, CategoricalDtype):
+                    self.assertEqual(df[column].dtype, dtype, msg=column)
+        self.assertEqual(json.loads(df.to_json(orient='records')), json.loads(expected.to_json(orient='records')))
+
+    def test_to_pd_data_frame_missing_columns(self):
+        df = Population([individual_for_test('id_1', Sex.MALE, {'spear': True}),
+                         individual_for_test('id_2', Sex.MALE, {})]).to_pd_data_frame()
+
+        self.assertIsInstance(df['context_all_spear_cat'].dtype, CategoricalDtype)
+        self.assertEqual(df['context_all_spear_cat'].to_json(orient='records'), '["PRESENT",null]')
+        self.assertEqual(df['context_all_spear_val'].to_json(orient='records'), '[1,null]')
+
+    def test_to_pd_data_frame_empty(self):
+        self.assertEqual(len(Population().to_pd_data_frame()), 0)
+
+    def test_to_pd_data_frame_parallel(self):
+        population = Population([individual_for_test('id_1', Sex.MALE, {'spear': True}),
+                                 individual_for_test('id_2', None, {}),
+                                 individual_for_test('id_3', Sex.FEMALE, {'pot': False}),
+                                 individual_for_test('id_4', Sex.MALE_LIKELY, {'comb': True, 'spear': False}),
+                                 individual_for_test('id_5', Sex.FEMALE_LIKELY, {})])
+        expected = population.to_pd_data_frame()
+        pd.testing.assert_frame_equal(population.to_pd_data_frame_parallel(processes=2, chunk_size=2), expected)
+        pd.testing.assert_frame_equal(population.to_pd_data_frame_parallel(processes=1, chunk_size=2), expected)
+        pd.testing.assert_frame_equal(population.to_pd_data_frame_parallel(), expected)
+
+        with self.assertRaises(ValueError):
+            population.to_pd_data_frame_parallel(chunk_size=0)
+        with self.assertRaises(ValueError):
+            population.to_pd_data_frame_parallel(processes=0)
+
+    def test_to_pd_data_frame_projection(self):
+        population = Population([individual_for_test('id_1', Sex.MALE, {'spear': True, 'pot': False}),
+                                 individual_for_test('id_2', None, {'comb': True}),
+                                 individual_for_test('id_3', Sex.FEMALE, {})])
+        full = population.to_pd_data_frame()
+
+        columns = ['mouth_molar_cavities_mean', 'context_all_spear_cat', 'om_mean_left', 'mouth_all_tooth_3_tooth', 'id',
+                   'ass_osteological_sex_combined_bin_cat', 'context_weapons_cat', 'om_count_avg', 'mouth_all_tooth_3_eh_val']
+        expected = full[[column for column in full.columns if column in columns]]
+        pd.testing.assert_frame_equal(population.to_pd_data_frame(columns=columns), expected)
+        pd.testing.assert_frame_equal(population.to_pd_data_frame_parallel(processes=2, chunk_size=2, columns=columns), expected)
+
+        # Grave goods, and the other context columns, only come from the context section
+        sections = ['context', 'mouth']
+        expected = full[[column for column in full.columns if column == 'id' or column.startswith(('context_', 'mouth_', 'ass_age_'))]]
+        age_columns = [column for column in full.columns if column.startswith('ass_age_')]
+        pd.testing.assert_frame_equal(population.to_pd_data_frame(columns=age_columns, sections=sections), expected)
+
+        self.assertEqual(list(population.to_pd_data_frame(columns=[]).columns), ['id'])
+        with self.assertRaises(KeyError):
+            population.to_pd_data_frame(columns=['sex'])
+        with self.assertRaises(ValueError):
+            population.to_pd_data_frame(sections=['teeth'])
+        with self.assertRaises(ValueError):
+            population.to_pd_data_frame_parallel(processes=2, chunk_size=1, sections=['teeth'])
+
+    def test_merge_pd_data_frames(self):
+        individuals = [individual_for_test('id_1', Sex.MALE, {'spear': True}),
+                       individual_for_test('id_2', Sex.FEMALE, {'pot': True}),
+                       individual_for_test('id_3', None, {})]
+        frames = [Population([individual]).to_pd_data_frame() for individual in individuals]
+        pd.testing.assert_frame_equal(merge_pd_data_frames(frames), Population(individuals).to_pd_data_frame())
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
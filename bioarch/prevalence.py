@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import os
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+from .age import AgeCategory
+from .individual import Individual
+from .joints import JOINTS_SUMMARY_STATS
+from .lazy import pandas as pd
+from .mouth import TOOTH_GROUPS
+from .population import DEFAULT_CHUNK_SIZE
+from .sex import Sex
+from .trauma import TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE
+
+
+# (measure, sex, age, value), sex and age are the Sex.as_bin and AgeCategory.as_quad names (sex None when unknown)
+Key = Tuple[str, Optional[str], str, Hashable]
+
+# Tooth index to the TOOTH_GROUPS groups it is in
+_TOOTH_GROUPS: List[List[str]] = [[group for group, teeth in TOOTH_GROUPS.items() if i in teeth] for i in range(32)]
+
+
+def _stratum(individual: Individual) -> Tuple[Optional[str], str]:
+    ass = individual.age_sex_stature
+    sex = ass.osteological_sex.combined
+    sex_bin = sex.as_bin() if sex is not None else None
+    return (sex_bin.name if sex_bin is not None else None), ass.age.category.as_quad().name
+
+
+def measures(individual: Individual) -> Iterable[Tuple[str, Hashable]]:
+    """Every (measure, value) counted for one individual, NA values are not counted.
+
+    * trauma_<bone>_<side> and trauma_<bone>: the TraumaCategory name
+    * joints_<group>_max: the worst JointCondition name of the JOINTS_SUMMARY_STATS group (cervical, ...)
+    * mouth_<group>_cavities: each tooth's cavities value ("0" or "1"), so counted per tooth not per individual"""
+    trauma = individual.trauma
+    for bone in TRAUMA_LEFT_RIGHT:
+        sides = getattr(trauma, bone)
+        if sides is None:
+            continue
+        if sides.left is not None:
+            yield f'trauma_{bone}_left', sides.left.name
+        if sides.right is not None:
+            yield f'trauma_{bone}_right', sides.right.name
+    for bone in TRAUMA_SINGLE:
+        value = getattr(trauma, bone)
+        if value is not None:
+            yield f'trauma_{bone}', value.name
+
+    joints = individual.joints
+    for group, names in JOINTS_SUMMARY_STATS.items():
+        conditions = [getattr(joints, name) for name in names if getattr(joints, name) is not None]
+        if conditions:
+            yield f'joints_{group}_max', max(conditions).name
+
+    for i, tooth in enumerate(individual.mouth.teeth):
+        cavities = tooth.cavities
+        if cavities == 'NA':
+            continue
+        for group in _TOOTH_GROUPS[i]:
+            yield f'mouth_{group}_cavities', cavities
+
+
+class PrevalenceCounter(object):
+    """Running counts of every measure's values (see measures) by Sex.as_bin and AgeCategory.as_quad.
+
+    Built in one pass over individuals without exporting them, counters of different chunks (or processes) can be
+    added together. Prevalence is a value's count over all the non NA counts of its measure in the same stratum."""
+
+    __slots__ = ['counts']
+
+    def __init__(self, counts: Optional[Dict[Key, int]] = None):
+        self.counts: Counter = Counter(counts or {})
+
+    def add(self, individual: Individual):
+        sex, age = _stratum(individual)
+        counts = self.counts
+        for measure, value in measures(individual):
+            counts[(measure, sex, age, value)] += 1
+
+    def update(self, individuals: Iterable[Individual]) -> 'PrevalenceCounter':
+        for individual in individuals:
+            self.add(individual)
+        return self
+
+    @staticmethod
+    def from_individuals(individuals: Iterable[Individual]) -> 'PrevalenceCounter':
+        return PrevalenceCounter().update(individuals)
+
+    def merge(self, other: 'PrevalenceCounter') -> 'PrevalenceCounter':
+        """Add the counts of other to this counter"""
+        self.counts.update(other.counts)
+        return self
+
+    def __add__(self, other: 'PrevalenceCounter') -> 'PrevalenceCounter':
+        return PrevalenceCounter(self.counts).merge(other)
+
+    def __eq__(self, other):
+        if not isinstance(other, PrevalenceCounter):
+            return NotImplemented
+        return +self.counts == +other.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def to_pd_data_frame(self) -> 'pd.DataFrame':
+        """One row per measure, sex, age and value with its count, the stratum's observed (non NA) count and the
+        prevalence (count / observed)"""
+        observed: Counter = Counter()
+        for (measure, sex, age, _), count in self.counts.items():
+            observed[(measure, sex, age)] += count
+
+        def order(key):
+            measure, sex, age, value = key
+            return measure, sex or '', age, str(value)
+        keys = sorted(self.counts, key=order)
+
+        df = pd.DataFrame({
+            'measure': [key[0] for key in keys],
+            'sex': pd.Series([key[1] for key in keys], dtype=Sex.dtype()),
+            'age': pd.Series([key[2] for key in keys], dtype=AgeCategory.dtype()),
+            'value': pd.Series([key[3] for key in keys], dtype=object),
+            'count': pd.Series([self.counts[key] for key in keys], dtype='int64'),
+            'observed': pd.Series([observed[key[:3]] for key in keys], dtype='int64'),
+        }, columns=['measure', 'sex', 'age', 'value', 'count', 'observed'])
+        df['prevalence'] = df['count'] / df['observed']
+        return df
+
+    def table(self, measure: str, value: Hashable) -> 'pd.DataFrame':
+        """Prevalence of one value of a measure, as a sex by age table (NaN where the stratum has no observations)"""
+        df = self.to_pd_data_frame()
+        df = df[df['measure'] == measure]
+        observed = df.groupby(['sex', 'age'], observed=True)['count'].sum()
+        matching = df[df['value'] == value].groupby(['sex', 'age'], observed=True)['count'].sum()
+        prevalence = (matching.reindex(observed.index, fill_value=0) / observed).rename('prevalence')
+        return prevalence.unstack('age')
+
+
+def _count_chunk(individuals: List[Individual]) -> PrevalenceCounter:
+    return PrevalenceCounter.from_individuals(individuals)
+
+
+def count_prevalence(individuals: Iterable[Individual], processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     max_pending: Optional[int] = None) -> PrevalenceCounter:
+    """A PrevalenceCounter of individuals, streamed chunk_size at a time and, unless processes is 1, counted in a
+    pool of processes (default one per CPU). No more than max_pending (default two per process) chunks are being
+    counted at once, and their counters are merged as they complete."""
+    if chunk_size < 1:
+        raise ValueError(f'Invalid chunk_size: {chunk_size}')
+    if processes is not None and processes < 1:
+        raise ValueError(f'Invalid processes: {processes}')
+    if max_pending is None:
+        max_pending = 2 * (processes or os.cpu_count() or 1)
+    if max_pending < 1:
+        raise ValueError(f'Invalid max_pending: {max_pending}')
+    if processes == 1:
+        return PrevalenceCounter.from_individuals(individuals)
+
+    def chunks():
+        chunk: List[Individual] = []
+        for individual in individuals:
+            chunk.append(individual)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    counter = PrevalenceCounter()
+    pending: Set[Future] = set()
+
+    def merge_completed():
+        nonlocal pending
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            counter.merge(future.result())
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk in chunks():
+            if len(pending) >= max_pending:
+                merge_completed()
+            pending.add(executor.submit(_count_chunk, chunk))
+        while pending:
+            merge_completed()
+    return counter
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+
+import pickle
+import unittest
+
+
+import pandas as pd
+
+
+from .population import Population
+from .prevalence import count_prevalence, PrevalenceCounter
+from .synthetic import CohortGenerator
+
+
+SEX = 'ass_osteological_sex_combined_bin_cat'
+AGE = 'ass_age_category_quad_cat'
+
+
+class PrevalenceCounterTest(unittest.TestCase):
+    def setUp(self):
+        self.individuals = list(CohortGenerator(seed=5).individuals(80))
+        self.counter = PrevalenceCounter.from_individuals(self.individuals)
+        self.df = Population(self.individuals).to_pd_data_frame()
+
+    def expected_counts(self, columns):
+        """Non NA values of the export columns, counted by sex, age and value (the columns are stacked)"""
+        frames = [self.df[[SEX, AGE]].assign(value=self.df[column].astype(object)) for column in columns]
+        df = pd.concat(frames)
+        df = df[df['value'].notna() & (df['value'] != 'NA')]
+        counts = df.groupby([df[SEX].astype(object).fillna(''), df[AGE].astype(object), df['value']]).size()
+        return {key: int(count) for key, count in counts.items()}
+
+    def counts(self, measure):
+        prevalence = self.counter.to_pd_data_frame()
+        prevalence = prevalence[prevalence['measure'] == measure]
+        return {(sex if isinstance(sex, str) else '', age, value): count for sex, age, value, count in
+                zip(prevalence['sex'], prevalence['age'], prevalence['value'], prevalence['count'])}
+
+    def test_counts_match_export(self):
+        self.assertEqual(self.counts('trauma_femur_left'), self.expected_counts(['trauma_femur_left_cat']))
+        self.assertEqual(self.counts('trauma_ribs'), self.expected_counts(['trauma_ribs_cat']))
+        self.assertEqual(self.counts('joints_cervical_max'), self.expected_counts(['joints_cervical_max']))
+        self.assertEqual(self.counts('mouth_all_cavities'), self.expected_counts([f'mouth_all_tooth_{i}_cavities' for i in range(32)]))
+
+    def test_prevalence(self):
+        df = self.counter.to_pd_data_frame()
+        self.assertEqual(list(df.columns), ['measure', 'sex', 'age', 'value', 'count', 'observed', 'prevalence'])
+        totals = df.groupby(['measure', df['sex'].astype(object).fillna(''), df['age'].astype(object)])['prevalence'].sum()
+        for total in totals:
+            self.assertAlmostEqual(total, 1.0)
+
+        table = self.counter.table('mouth_molar_cavities', '1')
+        molars = df[(df['measure'] == 'mouth_molar_cavities') & (df['sex'] == 'MALE') & (df['age'] == 'YOUNG')]
+        self.assertAlmostEqual(table.loc['MALE', 'YOUNG'], molars.loc[molars['value'] == '1', 'count'].sum() / molars['count'].sum())
+
+    def test_merge(self):
+        first = PrevalenceCounter.from_individuals(self.individuals[:30])
+        second = PrevalenceCounter.from_individuals(self.individuals[30:])
+        self.assertEqual(first + second, self.counter)
+        self.assertNotEqual(first, self.counter)
+        self.assertEqual(first.merge(second), self.counter)
+        self.assertEqual(pickle.loads(pickle.dumps(self.counter)), self.counter)
+
+    def test_empty(self):
+        counter = PrevalenceCounter()
+        self.assertEqual(len(counter), 0)
+        self.assertEqual(len(counter.to_pd_data_frame()), 0)
+
+
+class CountPrevalenceTest(unittest.TestCase):
+    def test_parallel(self):
+        individuals = list(CohortGenerator(seed=6).individuals(40))
+        expected = PrevalenceCounter.from_individuals(individuals)
+        self.assertEqual(count_prevalence(individuals, processes=1), expected)
+        self.assertEqual(count_prevalence(iter(individuals), processes=2, chunk_size=7), expected)
+        self.assertEqual(count_prevalence(iter(individuals), processes=2, chunk_size=3, max_pending=1), expected)
+        with self.assertRaises(ValueError):
+            count_prevalence(individuals, chunk_size=0)
+        with self.assertRaises(ValueError):
+            count_prevalence(individuals, max_pending=0)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
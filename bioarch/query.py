@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+
+
+from enum import Enum
+import functools
+import operator
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+import numpy as np
+
+
+from .age import EstimatedAge
+from .codes import NO_PAIR_CODE
+from .context import Context
+from .individual import AgeSexStature, BurialInfo, column_section, Individual, LongBoneMeasurement, OsteologicalSex
+from .joints import Joints, JOINTS_CODES, JOINTS_LEFT_RIGHT
+from .lazy import pandas as pd
+from .mouth import Mouth
+from .occupational_markers import OccupationalMarkers
+from .population import Population
+from .trauma import Trauma, TRAUMA_CODES
+
+
+def _to_cell_value(value: Any) -> Any:
+    """Enum members are matched against their exported names"""
+    return value.name if isinstance(value, Enum) else value
+
+
+def _exemplars() -> List[Individual]:
+    """Individuals that between them produce every column a section always can (grave goods are per data set)"""
+    filled = AgeSexStature(OsteologicalSex.empty(), EstimatedAge('ADULT', '20-35'), LongBoneMeasurement.empty_lr(), LongBoneMeasurement.empty_lr(), LongBoneMeasurement.empty_lr(), None, None)
+    site = BurialInfo('exemplar', 'exemplar')
+    no_pairs = np.zeros(JOINTS_CODES, dtype=np.int8)
+    no_pairs[:2 * len(JOINTS_LEFT_RIGHT)] = NO_PAIR_CODE
+    return [
+        Individual(None, site, filled, Mouth.empty(), OccupationalMarkers.empty(), Joints.from_codes(np.zeros(JOINTS_CODES)), Trauma.from_codes(np.zeros(TRAUMA_CODES)), Context.empty()),
+        Individual(None, site, AgeSexStature.empty(), Mouth.empty(), OccupationalMarkers.empty(), Joints.from_codes(no_pairs), Trauma.empty(), Context.empty()),
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _section_schema(section: str) -> Dict[str, Any]:
+    """Column to dtype of the columns a section can export, integer and boolean ones as they are once NA"""
+    dtypes = Population(_exemplars()).section_to_pd_data_frame(section).dtypes
+    return {column: np.float64 if dtype.kind in 'iu' else object if dtype.kind == 'b' else dtype for column, dtype in dtypes.items()}
+
+
+class Predicate(object):
+    """A condition on a CohortIndex, combine with &, | and ~"""
+
+    def evaluate(self, index: 'CohortIndex') -> np.ndarray:
+        """Boolean mask, one entry per individual"""
+        raise NotImplementedError
+
+    def __and__(self, other: 'Predicate') -> 'Predicate':
+        return all_of(self, other)
+
+    def __or__(self, other: 'Predicate') -> 'Predicate':
+        return any_of(self, other)
+
+    def __invert__(self) -> 'Predicate':
+        return _Not(self)
+
+
+class _Combined(Predicate):
+    def __init__(self, reduce: Callable[[np.ndarray, np.ndarray], np.ndarray], predicates: Sequence[Predicate]):
+        if not predicates:
+            raise ValueError('No predicates to combine')
+        self.reduce = reduce
+        self.predicates = predicates
+
+    def evaluate(self, index: 'CohortIndex') -> np.ndarray:
+        mask = self.predicates[0].evaluate(index)
+        for predicate in self.predicates[1:]:
+            mask = self.reduce(mask, predicate.evaluate(index))
+        return mask
+
+
+class _Not(Predicate):
+    def __init__(self, predicate: Predicate):
+        self.predicate = predicate
+
+    def evaluate(self, index: 'CohortIndex') -> np.ndarray:
+        return ~self.predicate.evaluate(index)
+
+
+class _Compare(Predicate):
+    def __init__(self, column: str, op: str, value: Any):
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def evaluate(self, index: 'CohortIndex') -> np.ndarray:
+        return index.compare(self.column, self.op, self.value)
+
+
+def all_of(*predicates: Predicate) -> Predicate:
+    return _Combined(operator.and_, predicates)
+
+
+def any_of(*predicates: Predicate) -> Predicate:
+    return _Combined(operator.or_, predicates)
+
+
+class Field(object):
+    """Builds predicates on an exported column, named as in Individual.to_pd_data_frame.
+
+    Categorical columns (the "_cat" ones) take enum members or their names, ordered comparisons follow the enum order.
+    NA never matches a comparison, use isna."""
+
+    def __init__(self, column: str):
+        self.column = column
+
+    def __eq__(self, value: Any) -> Predicate:  # type: ignore
+        return _Compare(self.column, '==', value)
+
+    def __ne__(self, value: Any) -> Predicate:  # type: ignore
+        return ~_Compare(self.column, '==', value) & self.notna()
+
+    def __lt__(self, value: Any) -> Predicate:
+        return _Compare(self.column, '<', value)
+
+    def __le__(self, value: Any) -> Predicate:
+        return _Compare(self.column, '<=', value)
+
+    def __gt__(self, value: Any) -> Predicate:
+        return _Compare(self.column, '>', value)
+
+    def __ge__(self, value: Any) -> Predicate:
+        return _Compare(self.column, '>=', value)
+
+    def __hash__(self):
+        return hash(self.column)
+
+    def isin(self, values: Iterable[Any]) -> Predicate:
+        return any_of(*[_Compare(self.column, '==', value) for value in values])
+
+    def between(self, low: Any, high: Any) -> Predicate:
+        """Inclusive of both ends"""
+        return (self >= low) & (self <= high)
+
+    def isna(self) -> Predicate:
+        return _Compare(self.column, 'isna', None)
+
+    def notna(self) -> Predicate:
+        return ~self.isna()
+
+
+_OPERATORS = {
+    '==': operator.eq,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class CohortIndex(object):
+    """Compact per column index over a collection of Individuals, for filtering without exporting them all.
+
+    Columns are indexed a whole section at a time, and only for the sections a query uses. Categorical columns are
+    kept as their integer codes with a cached bitmap (boolean mask) per value."""
+
+    def __init__(self, individuals: Iterable[Individual]):
+        self.population = Population(individuals)
+        self.ids: List[Hashable] = [individual.id for individual in self.population]
+        self._columns: Dict[str, 'pd.Series'] = {'id': pd.Series(self.ids, dtype=object)}
+        self._sections: set = set()
+        self._bitmaps: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, column: str) -> 'pd.Series':
+        """The indexed values of one exported column, indexing its section on first use"""
+        series = self._columns.get(column)
+        if series is not None:
+            return series
+        section = column_section(column)
+        if section is not None and section not in self._sections:
+            df = self.population.section_to_pd_data_frame(section)
+            self._columns.update({name: df[name] for name in df.columns})
+            self._sections.add(section)
+            series = self._columns.get(column)
+        if series is None:
+            if section is None or column not in _section_schema(section):
+                # e.g. a grave good no individual has
+                raise KeyError(f'Unknown column: "{column}"')
+            # A column no individual filled, e.g. trauma in a cohort without any
+            series = pd.Series([None] * len(self.ids), dtype=_section_schema(section)[column])
+            self._columns[column] = series
+        return series
+
+    def bitmap(self, column: str, value: Any) -> np.ndarray:
+        """Mask of the individuals whose categorical column is value"""
+        series = self.column(column)
+        if not isinstance(series.dtype, pd.api.types.CategoricalDtype):
+            raise ValueError(f'Not a categorical column: "{column}"')
+        value = _to_cell_value(value)
+        if value not in series.cat.categories:
+            raise ValueError(f'Unknown value for "{column}": "{value}"')
+        code = series.cat.categories.get_loc(value)
+        key = (column, code)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = series.cat.codes.to_numpy() == code
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def compare(self, column: str, op: str, value: Any) -> np.ndarray:
+        series = self.column(column)
+        if op == 'isna':
+            return series.isna().to_numpy()
+        if op not in _OPERATORS:
+            raise ValueError(f'Unknown operator: "{op}"')
+        if isinstance(series.dtype, pd.api.types.CategoricalDtype):
+            if op == '==':
+                return self.bitmap(column, value)
+            if not series.cat.ordered:
+                raise ValueError(f'Column is not ordered: "{column}"')
+            self.bitmap(column, value)  # validates the value
+            codes = series.cat.codes.to_numpy()
+            code = series.cat.categories.get_loc(_to_cell_value(value))
+            return (codes != -1) & _OPERATORS[op](codes, code)
+        result = _OPERATORS[op](series, _to_cell_value(value))
+        return np.asarray(result.fillna(False), dtype=bool)
+
+    def mask(self, predicate: Predicate) -> np.ndarray:
+        if not self.ids:
+            return np.zeros(0, dtype=bool)
+        return np.asarray(predicate.evaluate(self), dtype=bool)
+
+    def select(self, predicate: Predicate) -> List[Hashable]:
+        """IDs of the matching individuals, in order"""
+        return [self.ids[i] for i in np.flatnonzero(self.mask(predicate))]
+
+    def individuals(self, predicate: Predicate) -> List[Individual]:
+        return [self.population[int(i)] for i in np.flatnonzero(self.mask(predicate))]
+
+    def to_pd_data_frame(self, columns: Sequence[str], predicate: Optional[Predicate] = None) -> 'pd.DataFrame':
+        """Only the given columns (with their exported dtypes) of the matching, or all, individuals"""
+        rows = self.mask(predicate) if predicate is not None else np.ones(len(self.ids), dtype=bool)
+        ids = [self.ids[i] for i in np.flatnonzero(rows)]
+        data = {column: self.column(column)[rows].reset_index(drop=True) for column in columns}
+        df = pd.DataFrame(data, columns=list(columns))
+        df.index = pd.Index(ids)
+        return df
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
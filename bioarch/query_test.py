@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+import numpy as np
+import pandas as pd
+
+
+from .codes import NA_CODE
+from .joints import JointCondition
+from .population import Population
+from .query import any_of, CohortIndex, Field
+from .sex import Sex
+from .synthetic import CohortGenerator
+from .trauma import Trauma, TRAUMA_CODES, TraumaCategory
+
+
+LONG_BONES = ('humerus', 'radius', 'ulna', 'femur', 'tibia', 'fibula')
+
+
+class CohortIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.individuals = list(CohortGenerator(seed=3).individuals(60))
+        self.index = CohortIndex(self.individuals)
+        self.df = Population(self.individuals).to_pd_data_frame()
+
+    def assert_selects(self, predicate, expected_mask):
+        self.assertEqual(self.index.select(predicate), list(self.df.index[expected_mask.fillna(False).astype(bool).to_numpy()]))
+
+    def test_categorical(self):
+        df = self.df
+        self.assert_selects(Field('ass_osteological_sex_combined_bin_cat') == Sex.MALE, df['ass_osteological_sex_combined_bin_cat'] == 'MALE')
+        self.assert_selects(Field('ass_osteological_sex_combined_bin_cat') == 'MALE', df['ass_osteological_sex_combined_bin_cat'] == 'MALE')
+        self.assert_selects(Field('ass_age_category_quad_cat').isin(['YOUNG', 'MIDDLE']), df['ass_age_category_quad_cat'].isin(['YOUNG', 'MIDDLE']))
+        self.assert_selects(Field('joints_hip_avg') >= JointCondition.EXTREME, df['joints_hip_avg'] >= 'EXTREME')
+        self.assert_selects(Field('joints_hip_avg') != JointCondition.MILD, df['joints_hip_avg'].notna() & (df['joints_hip_avg'] != 'MILD'))
+        self.assert_selects(Field('joints_hip_avg').isna(), df['joints_hip_avg'].isna())
+
+    def test_combined(self):
+        df = self.df
+        fracture = any_of(*[Field(f'trauma_{bone}_left_cat') == TraumaCategory.FRACTURE for bone in LONG_BONES])
+        query = (Field('ass_osteological_sex_combined_bin_cat') == Sex.MALE) & fracture & (Field('context_weapons_cat') == 'PRESENT')
+        expected = (df['ass_osteological_sex_combined_bin_cat'] == 'MALE') & (df['context_weapons_cat'] == 'PRESENT')
+        expected &= pd.concat([df[f'trauma_{bone}_left_cat'] == 'FRACTURE' for bone in LONG_BONES], axis=1).any(axis=1)
+        self.assert_selects(query, expected)
+        self.assert_selects(~query, ~expected)
+
+        individuals = self.index.individuals(query)
+        self.assertEqual([individual.id for individual in individuals], self.index.select(query))
+
+    def test_numeric(self):
+        df = self.df
+        self.assert_selects(Field('mouth_molar_cavities_mean') > 0.5, df['mouth_molar_cavities_mean'] > 0.5)
+        self.assert_selects(Field('mouth_all_number_of_teeth').between(10, 20), df['mouth_all_number_of_teeth'].between(10, 20))
+        self.assert_selects(Field('context_total_grave_goods') >= 2, (df['context_total_grave_goods'] >= 2))
+
+    def test_to_pd_data_frame(self):
+        columns = ['ass_osteological_sex_combined_cat', 'mouth_all_number_of_teeth', 'context_all_spear_cat']
+        query = Field('ass_osteological_sex_combined_bin_cat') == Sex.FEMALE
+        df = self.index.to_pd_data_frame(columns, query)
+        expected = self.df[self.df['ass_osteological_sex_combined_bin_cat'] == 'FEMALE'][columns]
+        pd.testing.assert_frame_equal(df, expected)
+        pd.testing.assert_frame_equal(self.index.to_pd_data_frame(columns), self.df[columns])
+
+    def test_errors(self):
+        with self.assertRaises(KeyError):
+            self.index.select(Field('context_all_unobtainium_cat') == 'PRESENT')
+        with self.assertRaises(ValueError):
+            self.index.select(Field('ass_osteological_sex_combined_cat') == 'MAYBE')
+        with self.assertRaises(ValueError):
+            self.index.bitmap('mouth_all_number_of_teeth', 1)
+
+    def test_unfilled_column(self):
+        for individual in self.individuals:
+            individual.trauma = Trauma.from_codes(np.full(TRAUMA_CODES, NA_CODE))
+        index = CohortIndex(self.individuals)
+        self.assertEqual(index.select(Field('trauma_femur_left_cat') == TraumaCategory.FRACTURE), [])
+        self.assertEqual(index.select(Field('trauma_femur_left_cat').isna()), index.ids)
+        self.assertEqual(index.select(Field('trauma_femur_left_val') > 1), [])
+        self.assertEqual(index.column('trauma_femur_left_cat').dtype, self.index.column('trauma_femur_left_cat').dtype)
+        with self.assertRaises(KeyError):
+            index.select(Field('trauma_femur_middle_cat').isna())
+
+    def test_empty(self):
+        self.assertEqual(CohortIndex([]).select(Field('ass_osteological_sex_combined_cat') == Sex.MALE), [])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ import functools
 import logging
 
 
-from pandas.api.types import CategoricalDtype
+from . import instrumentation
+from .lazy import pandas as pd
+from .parsing import parse_array, parse_many
 
 
 logger = logging.getLogger(__name__)
@@ -25,31 +27,32 @@ class Sex(Enum):
     FEMALE         =   0  # noqa: E221,E222
 
     @staticmethod
-    def parse(value):
+    def parse(value, strict=False):
+        """An unknown sex is logged and read as UNKNOWN or, when strict, raises ValueError"""
         if value is None:
             return None
         if type(value) == Sex:  # pylint: disable=C0123
             return value
         if not isinstance(value, str):
+            instrumentation.parse_failed(Sex.__name__)
             raise ValueError(f'Failed to parse sex: "{value}"')
-        value = value.upper()
-        if value == 'M':
-            return Sex.MALE
-        if value in ('M?', '?M'):
-            return Sex.MALE_LIKELY
-        if value in ('M??', '??M'):
-            return Sex.MALE_ASSUMED
-        if value == 'F':
-            return Sex.FEMALE
-        if value in ('F?', '?F'):
-            return Sex.FEMALE_LIKELY
-        if value in ('F??', '??F'):
-            return Sex.FEMALE_ASSUMED
-        if value == '?':
-            return Sex.UNKNOWN
-        logger.error('Failed to parse sex: "%s"', value)
+        sex = _SEX_ALIASES.get(value.upper())
+        if sex is not None:
+            return sex
+        instrumentation.parse_failed(Sex.__name__)
+        if strict:
+            raise ValueError(f'Failed to parse sex: "{value.upper()}"')
+        logger.error('Failed to parse sex: "%s"', value.upper())
         return Sex.UNKNOWN
 
+    @staticmethod
+    def parse_many(values):
+        return parse_many(Sex.parse, values)
+
+    @staticmethod
+    def parse_array(values):
+        return parse_array(Sex.parse, values)
+
     def as_bin(self):
         if self == Sex.UNKNOWN:
             return None
@@ -74,8 +77,25 @@ class Sex(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in Sex], ordered=True)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in Sex], ordered=True)
+
+
+_SEX_ALIASES = {
+    'M': Sex.MALE,
+    'M?': Sex.MALE_LIKELY,
+    '?M': Sex.MALE_LIKELY,
+    'M??': Sex.MALE_ASSUMED,
+    '??M': Sex.MALE_ASSUMED,
+    '?': Sex.UNKNOWN,
+    'F??': Sex.FEMALE_ASSUMED,
+    '??F': Sex.FEMALE_ASSUMED,
+    'F?': Sex.FEMALE_LIKELY,
+    '?F': Sex.FEMALE_LIKELY,
+    'F': Sex.FEMALE,
+}
+_SEX_ALIASES.update({sex.name: sex for sex in Sex})
 
 
 if __name__ == "__main__":
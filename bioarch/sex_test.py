@@ -4,6 +4,9 @@
 import unittest
 
 
+import numpy as np
+
+
 from .sex import Sex
 
 
@@ -35,6 +38,20 @@ class SexTest(unittest.TestCase):
         self.assertEqual(Sex.parse('M'), Sex.parse('m'))
         self.assertEqual(Sex.parse(None), None)
         self.assertEqual(Sex.parse(Sex.MALE), Sex.MALE)
+        self.assertEqual(Sex.parse('FEMALE_LIKELY'), Sex.FEMALE_LIKELY)
+        self.assertEqual(Sex.parse('bad'), Sex.UNKNOWN)
+        with self.assertRaises(ValueError):
+            Sex.parse('bad', strict=True)
+        self.assertEqual(Sex.parse('m?', strict=True), Sex.MALE_LIKELY)
+
+    def test_parse_many(self):
+        self.assertEqual(Sex.parse_many(['M', 'f', None, 'M']), [Sex.MALE, Sex.FEMALE, None, Sex.MALE])
+        self.assertEqual(Sex.parse_array(np.array(['M', '?'])).tolist(), [Sex.MALE, Sex.UNKNOWN])
+
+    def test_dtype(self):
+        self.assertIs(Sex.dtype(), Sex.dtype())
+        self.assertEqual(list(Sex.dtype().categories), [s.name for s in Sex])
+        self.assertTrue(Sex.dtype().ordered)
 
 
 def main():
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+
+import json
+import mmap
+import struct
+from typing import Any, Iterable, Iterator, List, Optional, Type, TypeVar, Union
+
+
+import numpy as np
+
+
+from .age import AgeCategory, EstimatedAge
+from .codes import NA_CODE
+from .context import BodyPosition, CompassBearing, Context, Present
+from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex
+from .io import CONTEXT_PRESENT, LONG_BONE_MEASUREMENTS, LONG_BONES
+from .joints import JointCondition, Joints, JOINTS_LEFT_RIGHT, JOINTS_SINGLE, JointsArray
+from .left_right import LeftRight
+from .mouth import Mouth, MouthArray, TOOTH_LABELS
+from .occupational_markers import MUSCLES, OccupationalMarkers, OccupationalMarkersArray
+from .population import Population
+from .sex import Sex
+from .trauma import Trauma, TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE, TraumaArray, TraumaCategory
+
+
+# File layout, all little endian:
+#  * HEADER: magic, version, record size, number of individuals, then the offsets of the index and strings blocks
+#  * the records, one RECORD_DTYPE fixed size record per individual, starting at HEADER_SIZE
+#  * the index, number of individuals + 1 uint64 offsets of each individual's strings in the strings block
+#  * the strings block, per individual a UTF-8 JSON list of its text values (see _strings)
+MAGIC = b'BIOSNAP\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIQQQ')
+HEADER_SIZE = 64
+
+# Enums are stored as their EnumCodes code (NA_CODE for None), joints and trauma as their codes arrays split into
+# their pairs and singles
+RECORD_DTYPE = np.dtype([
+    ('sex', 'i1', (3,)),
+    ('age_category', 'i1'),
+    ('age_range', '<i4', (2,)),
+    ('long_bones', '<f8', (len(LONG_BONES), 2, len(LONG_BONE_MEASUREMENTS))),
+    ('teeth', 'i1', (32, len(TOOTH_LABELS))),
+    ('markers', '<f4', (len(MUSCLES), 2)),
+    ('joints', 'i1', (len(JOINTS_LEFT_RIGHT), 2)),
+    ('joints_single', 'i1', (len(JOINTS_SINGLE),)),
+    ('trauma', 'i1', (len(TRAUMA_LEFT_RIGHT), 2)),
+    ('trauma_single', 'i1', (len(TRAUMA_SINGLE),)),
+    ('context', 'i1', (2 + len(CONTEXT_PRESENT),)),
+    ('grave_goods_total', '<f8'),
+])
+
+E = TypeVar('E')
+
+_MEMBERS = {enum: list(enum) for enum in (AgeCategory, BodyPosition, CompassBearing, JointCondition, Present, Sex, TraumaCategory)}
+_CODES = {enum: {member: code for code, member in enumerate(members)} for enum, members in _MEMBERS.items()}
+
+
+def _encode(enum: Type[E], value: Optional[E]) -> int:
+    return NA_CODE if value is None else _CODES[enum][value]
+
+
+def _decode(enum: Type[E], code: int) -> Optional[E]:
+    return None if code == NA_CODE else _MEMBERS[enum][code]
+
+
+def _float(value: Optional[float]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _optional_float(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _strings(individual: Individual) -> List[Any]:
+    """The values kept as text: id, site name and id, stature, body mass and the grave goods"""
+    ass = individual.age_sex_stature
+    goods = [[good, _encode(Present, value)] for good, value in individual.context.grave_goods.items()]
+    return [individual.id, individual.site.name, individual.site.id, ass.stature, ass.body_mass, goods]
+
+
+def _encode_record(record: np.void, individual: Individual):
+    ass = individual.age_sex_stature
+    sex = ass.osteological_sex
+    record['sex'] = [_encode(Sex, sex.pelvic), _encode(Sex, sex.cranium), _encode(Sex, sex.combined)]
+    record['age_category'] = _encode(AgeCategory, ass.age.category)
+    ranged = ass.age.ranged
+    record['age_range'] = (NA_CODE, NA_CODE) if ranged is None else (ranged.start, ranged.stop)
+    for i, bone in enumerate(LONG_BONES):
+        sides = getattr(ass, bone)
+        for j, side in enumerate((sides.left, sides.right)):
+            record['long_bones'][i, j] = [_float(getattr(side, measurement)) for measurement in LONG_BONE_MEASUREMENTS]
+
+    record['teeth'] = individual.mouth.to_codes()
+    record['markers'] = individual.occupational_markers.to_array()
+
+    joints = individual.joints.codes
+    record['joints'] = joints[:2 * len(JOINTS_LEFT_RIGHT)].reshape(-1, 2)
+    record['joints_single'] = joints[2 * len(JOINTS_LEFT_RIGHT):]
+    trauma = individual.trauma.codes
+    record['trauma'] = trauma[:2 * len(TRAUMA_LEFT_RIGHT)].reshape(-1, 2)
+    record['trauma_single'] = trauma[2 * len(TRAUMA_LEFT_RIGHT):]
+
+    context = individual.context
+    present = [_encode(Present, getattr(context, field)) for field in CONTEXT_PRESENT]
+    record['context'] = [_encode(BodyPosition, context.body_position), _encode(CompassBearing, context.body_orientation)] + present
+    record['grave_goods_total'] = _float(context.grave_goods_total)
+
+
+def _decode_individual(record: np.void, strings: List[Any]) -> Individual:
+    _id, site_name, site_id, stature, body_mass, goods = strings
+
+    sex = [_decode(Sex, code) for code in record['sex'].tolist()]
+    category = _decode(AgeCategory, int(record['age_category']))
+    start, stop = record['age_range'].tolist()
+    age = EstimatedAge(None if category is None else category.name, None if start == NA_CODE else range(start, stop))
+    long_bones = [LeftRight(*[LongBoneMeasurement(*[_optional_float(value) for value in side]) for side in sides.tolist()]) for sides in record['long_bones']]
+    age_sex_stature = AgeSexStature(OsteologicalSex(*sex), age, *long_bones, stature, body_mass)
+
+    # Decoded teeth and markers are the shared (interned) ones
+    mouth = Mouth.from_codes(record['teeth'], trusted=True)
+    occupational_markers = OccupationalMarkers.from_array(record['markers'])
+
+    joints = Joints.from_codes(np.concatenate((record['joints'].ravel(), record['joints_single'])))
+    trauma = Trauma.from_codes(np.concatenate((record['trauma'].ravel(), record['trauma_single'])))
+
+    codes = record['context'].tolist()
+    present = [_decode(Present, code) for code in codes[2:]]
+    # Goods as their Present value, the total (the sum of the recorded values) is restored as stored
+    grave_goods = {good: None if code == NA_CODE else _MEMBERS[Present][code].value for good, code in goods}
+    context = Context(_decode(BodyPosition, codes[0]), _decode(CompassBearing, codes[1]), *present, grave_goods)
+    context.grave_goods_total = _optional_float(float(record['grave_goods_total']))
+
+    return Individual(_id, BurialInfo(site_name, site_id), age_sex_stature, mouth, occupational_markers, joints, trauma, context)
+
+
+def write_snapshot(individuals: Iterable[Individual], path: Any):
+    """Write individuals to a snapshot file, see Snapshot"""
+    individuals = list(individuals)
+    records = np.zeros(len(individuals), dtype=RECORD_DTYPE)
+    blobs = []
+    for record, individual in zip(records, individuals):
+        _encode_record(record, individual)
+        blobs.append(json.dumps(_strings(individual), separators=(',', ':')).encode('utf-8'))
+
+    offsets = np.zeros(len(blobs) + 1, dtype='<u8')
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    index_offset = HEADER_SIZE + records.nbytes
+    strings_offset = index_offset + offsets.nbytes
+
+    with open(path, mode='wb') as snapshot_file:
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize, len(individuals), index_offset, strings_offset)
+        snapshot_file.write(header.ljust(HEADER_SIZE, b'\x00'))
+        snapshot_file.write(records.tobytes())
+        snapshot_file.write(offsets.tobytes())
+        for blob in blobs:
+            snapshot_file.write(blob)
+
+
+class Snapshot(object):
+    """A snapshot file, memory mapped, with each individual only decoded when it is accessed.
+
+    Opening only reads the header. The fixed size part of every record is also available as arrays, e.g. for a
+    MouthArray of the whole cohort without building any Individual."""
+
+    def __init__(self, path: Any):
+        self._file = open(path, mode='rb')  # pylint: disable=R1732
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError('Not a bioarch snapshot, file is empty')
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError('Not a bioarch snapshot, file is too short')
+        magic, version, record_size, count, index_offset, strings_offset = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError('Not a bioarch snapshot, bad magic')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported bioarch snapshot version: {version}')
+        if record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f'Corrupt bioarch snapshot, record size {record_size} != {RECORD_DTYPE.itemsize}')
+        self._records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+        self._offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=index_offset)
+        self._strings_offset = strings_offset
+
+    def close(self):
+        # The arrays are views of the map, they have to go first
+        self._records = None
+        self._offsets = None
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _strings(self, i: int) -> List[Any]:
+        start = self._strings_offset + int(self._offsets[i])
+        end = self._strings_offset + int(self._offsets[i + 1])
+        return json.loads(self._mmap[start:end].decode('utf-8'))
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Individual, List[Individual]]:
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        i = range(len(self))[key]  # bounds checked, negative indexes allowed
+        return _decode_individual(self._records[i], self._strings(i))
+
+    def __iter__(self) -> Iterator[Individual]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def individual_id(self, i: int) -> Any:
+        """Only decode the id of one individual"""
+        return self._strings(range(len(self))[i])[0]
+
+    def population(self) -> Population:
+        """Decode every individual"""
+        return Population(self)
+
+    def mouth_array(self) -> MouthArray:
+        """Every individual's mouth, copied out of the file"""
+        return MouthArray(np.array(self._records['teeth']))
+
+    def occupational_markers_array(self) -> OccupationalMarkersArray:
+        """Every individual's occupational markers, copied out of the file"""
+        return OccupationalMarkersArray(np.array(self._records['markers']))
+
+    def joints_array(self) -> JointsArray:
+        """Every individual's joints, copied out of the file"""
+        joints = self._records['joints'].reshape(len(self), 2 * len(JOINTS_LEFT_RIGHT))
+        return JointsArray(np.concatenate((joints, self._records['joints_single']), axis=1))
+
+    def trauma_array(self) -> TraumaArray:
+        """Every individual's trauma, copied out of the file"""
+        trauma = self._records['trauma'].reshape(len(self), 2 * len(TRAUMA_LEFT_RIGHT))
+        return TraumaArray(np.concatenate((trauma, self._records['trauma_single']), axis=1))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self}'
+
+    def __str__(self):
+        return f'{len(self)} individuals'
+
+
+def read_snapshot(path: Any) -> Population:
+    """Decode every individual of a snapshot file"""
+    with Snapshot(path) as snapshot:
+        return snapshot.population()
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+
+import os
+import tempfile
+import unittest
+
+
+import numpy as np
+import pandas as pd
+
+
+from .age import EstimatedAge
+from .joints import JointsArray
+from .mouth import MouthArray
+from .occupational_markers import OccupationalMarkersArray
+from .population import Population
+from .snapshot import FORMAT_VERSION, HEADER, read_snapshot, Snapshot, write_snapshot
+from .synthetic import CohortGenerator
+from .trauma import Trauma, TraumaArray
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.individuals = list(CohortGenerator(seed=7).individuals(40))
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cohort.snapshot')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        write_snapshot(self.individuals, self.path)
+        expected = Population(self.individuals).to_pd_data_frame()
+        pd.testing.assert_frame_equal(read_snapshot(self.path).to_pd_data_frame(), expected)
+
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 40)
+            self.assertEqual(str(snapshot), '40 individuals')
+            self.assertEqual(snapshot.individual_id(3), 'id_3')
+            self.assertEqual(snapshot.individual_id(-1), 'id_39')
+            self.assertEqual(snapshot[-1].to_pd_data_frame().to_json(orient='records'), self.individuals[-1].to_pd_data_frame().to_json(orient='records'))
+            self.assertEqual([individual.id for individual in snapshot[5:8]], ['id_5', 'id_6', 'id_7'])
+            with self.assertRaises(IndexError):
+                snapshot[40]  # pylint: disable=W0104
+
+            np.testing.assert_array_equal(snapshot.mouth_array().codes, MouthArray.from_mouths(i.mouth for i in self.individuals).codes)
+            expected_markers = OccupationalMarkersArray.from_occupational_markers(i.occupational_markers for i in self.individuals).markers
+            np.testing.assert_array_equal(snapshot.occupational_markers_array().markers, expected_markers)
+            np.testing.assert_array_equal(snapshot.joints_array().codes, JointsArray.from_joints(i.joints for i in self.individuals).codes)
+            np.testing.assert_array_equal(snapshot.trauma_array().codes, TraumaArray.from_trauma(i.trauma for i in self.individuals).codes)
+
+    def test_grave_goods_total(self):
+        individual = self.individuals[0]
+        individual.context.grave_goods = {'spear': None, 'sword': None}
+        individual.context.grave_goods_total = 7.0
+        individual.trauma = Trauma.empty()
+        individual.trauma.femur = None
+        write_snapshot([individual], self.path)
+        decoded = read_snapshot(self.path)[0]
+        self.assertEqual(decoded.context.grave_goods, {'spear': None, 'sword': None})
+        self.assertEqual(decoded.context.grave_goods_total, 7.0)
+        self.assertIsNone(decoded.trauma.femur)
+        self.assertEqual(decoded.to_pd_data_frame().to_json(orient='records'), individual.to_pd_data_frame().to_json(orient='records'))
+
+    def test_no_age_category(self):
+        individual = self.individuals[0]
+        individual.age_sex_stature.age = EstimatedAge(None, '20-35')
+        write_snapshot([individual], self.path)
+        decoded = read_snapshot(self.path)[0]
+        self.assertIsNone(decoded.age_sex_stature.age.category)
+        self.assertEqual(decoded.age_sex_stature.age.ranged, range(20, 35))
+        self.assertIs(decoded.mouth.teeth[0], individual.mouth.teeth[0])
+
+    def test_empty(self):
+        write_snapshot([], self.path)
+        with Snapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), 0)
+            self.assertEqual(len(snapshot.mouth_array()), 0)
+            self.assertEqual(len(snapshot.joints_array()), 0)
+        self.assertEqual(len(read_snapshot(self.path)), 0)
+
+    def test_invalid(self):
+        with open(self.path, mode='wb'):
+            pass
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+
+        with open(self.path, mode='wb') as snapshot_file:
+            snapshot_file.write(b'not a snapshot'.ljust(128, b'\x00'))
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+
+        write_snapshot(self.individuals[:1], self.path)
+        with open(self.path, mode='r+b') as snapshot_file:
+            header = bytearray(snapshot_file.read(HEADER.size))
+            header[8:12] = (FORMAT_VERSION + 1).to_bytes(4, 'little')
+            snapshot_file.seek(0)
+            snapshot_file.write(header)
+        with self.assertRaisesRegex(ValueError, 'version'):
+            Snapshot(self.path)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
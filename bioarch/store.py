@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+
+
+from enum import Enum
+import sqlite3
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+import numpy as np
+
+
+from .age import AgeCategory, EstimatedAge
+from .codes import EnumCodes, NA_CODE
+from .context import BodyPosition, CompassBearing, Context, Present
+from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex, SECTION_PREFIXES
+from .io import CONTEXT_PRESENT, LONG_BONE_MEASUREMENTS, LONG_BONES
+from .joints import JointCondition, Joints, JOINTS_CODES, JOINTS_LAYOUT, JOINTS_LEFT_RIGHT
+from .left_right import LeftRight
+from .mouth import Mouth, TOOTH_LABELS
+from .occupational_markers import MUSCLES, OccupationalMarkers
+from .population import Population
+from .sex import Sex
+from .trauma import Trauma, TRAUMA_CODES, TRAUMA_LAYOUT, TRAUMA_LEFT_RIGHT, TraumaCategory
+
+
+# Bumped, as the user_version pragma, whenever the schema changes
+SCHEMA_VERSION = 2
+
+# (site_id, id), an individual's key in the store
+Key = Tuple[str, Optional[str]]
+
+_SEX = EnumCodes(Sex)
+_AGE = EnumCodes(AgeCategory)
+_POSITION = EnumCodes(BodyPosition)
+_BEARING = EnumCodes(CompassBearing)
+_PRESENT = EnumCodes(Present)
+_JOINT = EnumCodes(JointCondition)
+_TRAUMA = EnumCodes(TraumaCategory)
+
+_LONG_BONE_COLUMNS = [f'{bone}_{side}_{measurement}' for bone in LONG_BONES for side in ('left', 'right') for measurement in LONG_BONE_MEASUREMENTS]
+
+# The site, age_sex_stature and context scalars, one row per individual. Untyped columns keep their values as given.
+_INDIVIDUAL_COLUMNS = [
+    ('id', 'TEXT'),
+    ('site_name', 'TEXT NOT NULL'),
+    ('site_id', 'TEXT NOT NULL'),
+    ('sex_pelvic', 'INTEGER NOT NULL'),
+    ('sex_cranium', 'INTEGER NOT NULL'),
+    ('sex_combined', 'INTEGER NOT NULL'),
+    ('age_category', 'INTEGER NOT NULL'),
+    ('age_start', 'INTEGER'),
+    ('age_stop', 'INTEGER'),
+    ('stature', ''),
+    ('body_mass', ''),
+] + [(column, 'REAL') for column in _LONG_BONE_COLUMNS] + [
+    ('body_position', 'INTEGER NOT NULL'),
+    ('body_orientation', 'INTEGER NOT NULL'),
+] + [(field, 'INTEGER NOT NULL') for field in CONTEXT_PRESENT] + [
+    ('grave_goods_total', ''),
+]
+
+# Sections are keyed by the individuals' key column, codes are EnumCodes codes (NA_CODE for None). Joints and trauma
+# rows are their codes array's positions (see JOINTS_LAYOUT and TRAUMA_LAYOUT) that are not NA_CODE, markers the
+# sides that are present.
+SCHEMA = f"""
+CREATE TABLE individuals (
+    key INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {kind}'.rstrip() for name, kind in _INDIVIDUAL_COLUMNS)},
+    UNIQUE (site_id, id)
+);
+CREATE INDEX individuals_site_name ON individuals (site_name);
+CREATE INDEX individuals_sex ON individuals (sex_combined);
+CREATE INDEX individuals_age ON individuals (age_category);
+
+CREATE TABLE teeth (
+    individual INTEGER NOT NULL REFERENCES individuals (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    {', '.join(f'{label} INTEGER NOT NULL' for label in TOOTH_LABELS)},
+    PRIMARY KEY (individual, position)
+) WITHOUT ROWID;
+
+CREATE TABLE markers (
+    individual INTEGER NOT NULL REFERENCES individuals (key) ON DELETE CASCADE,
+    muscle INTEGER NOT NULL,
+    side INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (individual, muscle, side)
+) WITHOUT ROWID;
+
+CREATE TABLE joints (
+    individual INTEGER NOT NULL REFERENCES individuals (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    code INTEGER NOT NULL,
+    PRIMARY KEY (individual, position)
+) WITHOUT ROWID;
+CREATE INDEX joints_code ON joints (code, position, individual);
+
+CREATE TABLE trauma (
+    individual INTEGER NOT NULL REFERENCES individuals (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    code INTEGER NOT NULL,
+    PRIMARY KEY (individual, position)
+) WITHOUT ROWID;
+CREATE INDEX trauma_code ON trauma (code, position, individual);
+
+CREATE TABLE grave_goods (
+    individual INTEGER NOT NULL REFERENCES individuals (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    good TEXT NOT NULL,
+    present INTEGER NOT NULL,
+    PRIMARY KEY (individual, position)
+) WITHOUT ROWID;
+CREATE INDEX grave_goods_good ON grave_goods (good, present, individual);
+"""
+
+SECTIONS = tuple(SECTION_PREFIXES)
+
+_ENUM_CODES: Dict[type, EnumCodes] = {Sex: _SEX, AgeCategory: _AGE, JointCondition: _JOINT, TraumaCategory: _TRAUMA}
+
+
+def _float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _values(value: Any) -> List[Any]:
+    """A filter's value, one or a collection of them"""
+    if isinstance(value, (str, Enum)) or not isinstance(value, Collection):
+        return [value]
+    return list(value)
+
+
+def _in(column: str, values: Sequence[Any]) -> str:
+    return f'{column} IN ({", ".join("?" * len(values))})'
+
+
+def _codes(enum: type, value: Any) -> List[int]:
+    codes = _ENUM_CODES[enum]
+    return [codes.encode(member if isinstance(member, enum) else enum[member]) for member in _values(value)]  # type: ignore
+
+
+def _positions(layout: Dict[str, int], pairs: Sequence[str], names: Any) -> List[int]:
+    positions = []
+    for name in _values(names):
+        if name not in layout:
+            raise ValueError(f'Unknown field: "{name}"')
+        positions.append(layout[name])
+        if name in pairs:
+            positions.append(layout[name] + 1)
+    return positions
+
+
+def _individual_row(key: int, individual: Individual) -> List[Any]:
+    ass = individual.age_sex_stature
+    sex = ass.osteological_sex
+    ranged = ass.age.ranged
+    row = [key, individual.id, individual.site.name, individual.site.id,
+           _SEX.encode(sex.pelvic), _SEX.encode(sex.cranium), _SEX.encode(sex.combined), _AGE.encode(ass.age.category),
+           None if ranged is None else ranged.start, None if ranged is None else ranged.stop, ass.stature, ass.body_mass]
+    for bone in LONG_BONES:
+        sides = getattr(ass, bone)
+        for side in (sides.left, sides.right):
+            row += [_float(getattr(side, measurement)) for measurement in LONG_BONE_MEASUREMENTS]
+    context = individual.context
+    row += [_POSITION.encode(context.body_position), _BEARING.encode(context.body_orientation)]
+    row += [_PRESENT.encode(getattr(context, field)) for field in CONTEXT_PRESENT]
+    row.append(context.grave_goods_total)
+    return row
+
+
+def _code_rows(key: int, codes: np.ndarray) -> Iterable[Tuple[int, int, int]]:
+    for position in np.flatnonzero(codes != NA_CODE).tolist():
+        yield key, position, int(codes[position])
+
+
+def _marker_rows(key: int, markers: np.ndarray) -> Iterable[Tuple[int, int, int, float]]:
+    present = ~np.isnan(markers)
+    for (muscle, side), value in zip(np.argwhere(present).tolist(), markers[present].tolist()):
+        yield key, muscle, side, value
+
+
+def _age_sex_stature(row: Sequence[Any]) -> AgeSexStature:
+    sex_pelvic, sex_cranium, sex_combined, category, start, stop, stature, body_mass = row[:8]
+    sex = OsteologicalSex(_SEX.decode(sex_pelvic), _SEX.decode(sex_cranium), _SEX.decode(sex_combined))
+    age = EstimatedAge(_AGE.names[category], None if start is None else range(start, stop))
+    measurements = iter(row[8:])
+    long_bones = []
+    for _ in LONG_BONES:
+        left, right = [LongBoneMeasurement(*[next(measurements) for _ in LONG_BONE_MEASUREMENTS]) for _ in range(2)]
+        long_bones.append(LeftRight(left, right))
+    return AgeSexStature(sex, age, *long_bones, stature, body_mass)
+
+
+def _context(row: Sequence[Any], goods: List[Tuple[str, int]]) -> Context:
+    position, orientation, *present, total = row
+    # Goods as their Present value, the total (the sum of the recorded values) is restored as stored
+    context = Context(_POSITION.decode(position), _BEARING.decode(orientation), *[_PRESENT.decode(code) for code in present],
+                      {good: _PRESENT.values[code] for good, code in goods})
+    context.grave_goods_total = total
+    return context
+
+
+class CohortStore(object):
+    """Individuals persisted in a SQLite database, one table per section, that can be queried without loading them.
+
+    Individuals are keyed by their site id and id, adding one again replaces it. Individuals without an id (as
+    read_rows allows) are always added, and a (site_id, None) key stands for all of a site's. Filters (see select) only read the
+    indexed columns, and loading only reads the tables of the sections asked for."""
+
+    def __init__(self, path: Any = ':memory:'):
+        self.connection = sqlite3.connect(path)
+        try:
+            self._open()
+        except Exception:
+            self.connection.close()
+            raise
+
+    def _open(self):
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            if self.connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0] > 0:
+                raise ValueError('Not a bioarch cohort store')
+            self.connection.executescript(f'BEGIN; {SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;')
+        elif version != SCHEMA_VERSION:
+            raise ValueError(f'Unsupported bioarch cohort store version: {version}')
+        self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS selected (key INTEGER PRIMARY KEY)')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'CohortStore':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT count(*) FROM individuals').fetchone()[0]
+
+    def add(self, individuals: Iterable[Individual]) -> int:
+        """Write individuals, in one transaction, replacing any already stored with the same key. Returns how many."""
+        individuals = list(individuals)
+        connection = self.connection
+        with connection:
+            connection.executemany('DELETE FROM individuals WHERE site_id = ? AND id = ?',
+                                   ((individual.site.id, individual.id) for individual in individuals))
+            start = connection.execute('SELECT coalesce(max(key), 0) + 1 FROM individuals').fetchone()[0]
+            keyed = list(enumerate(individuals, start))
+
+            columns = ['key'] + [name for name, _ in _INDIVIDUAL_COLUMNS]
+            connection.executemany(f'INSERT INTO individuals ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                                   (_individual_row(key, individual) for key, individual in keyed))
+            connection.executemany(f'INSERT INTO teeth VALUES ({", ".join("?" * (2 + len(TOOTH_LABELS)))})',
+                                   ((key, position, *codes) for key, individual in keyed
+                                    for position, codes in enumerate(individual.mouth.to_codes().tolist())))
+            connection.executemany('INSERT INTO markers VALUES (?, ?, ?, ?)',
+                                   (row for key, individual in keyed for row in _marker_rows(key, individual.occupational_markers.to_array())))
+            connection.executemany('INSERT INTO joints VALUES (?, ?, ?)',
+                                   (row for key, individual in keyed for row in _code_rows(key, individual.joints.codes)))
+            connection.executemany('INSERT INTO trauma VALUES (?, ?, ?)',
+                                   (row for key, individual in keyed for row in _code_rows(key, individual.trauma.codes)))
+            connection.executemany('INSERT INTO grave_goods VALUES (?, ?, ?, ?)',
+                                   ((key, position, good, _PRESENT.encode(present)) for key, individual in keyed
+                                    for position, (good, present) in enumerate(individual.context.grave_goods.items())))
+        return len(individuals)
+
+    def remove(self, keys: Iterable[Key]) -> int:
+        """Delete the individuals with the given (site_id, id) keys. Returns how many were stored."""
+        with self.connection:
+            before = len(self)
+            self.connection.executemany('DELETE FROM individuals WHERE site_id = ? AND id IS ?', keys)
+            return before - len(self)
+
+    def _where(self, site_id: Any = None, site_name: Any = None, sex: Any = None, age: Any = None,
+               trauma: Any = None, trauma_bones: Any = None, joint_condition: Any = None, joints: Any = None,
+               grave_good: Any = None) -> Tuple[str, List[Any]]:
+        conditions = []
+        params: List[Any] = []
+
+        def add(condition: str, values: Sequence[Any]):
+            conditions.append(condition)
+            params.extend(values)
+
+        if site_id is not None:
+            add(_in('site_id', _values(site_id)), _values(site_id))
+        if site_name is not None:
+            add(_in('site_name', _values(site_name)), _values(site_name))
+        if sex is not None:
+            codes = _codes(Sex, sex)
+            add(_in('sex_combined', codes), codes)
+        if age is not None:
+            codes = _codes(AgeCategory, age)
+            add(_in('age_category', codes), codes)
+        coded = (('trauma', TraumaCategory, TRAUMA_LAYOUT, TRAUMA_LEFT_RIGHT, trauma, trauma_bones),
+                 ('joints', JointCondition, JOINTS_LAYOUT, JOINTS_LEFT_RIGHT, joint_condition, joints))
+        for table, enum, layout, pairs, value, names in coded:
+            if value is None:
+                if names is not None:
+                    raise ValueError(f'{table} fields given without a value to match')
+                continue
+            codes = _codes(enum, value)
+            condition = f'EXISTS (SELECT 1 FROM {table} WHERE {table}.individual = individuals.key AND {_in(f"{table}.code", codes)}'
+            positions = _positions(layout, pairs, names) if names is not None else []
+            if positions:
+                condition += f' AND {_in(f"{table}.position", positions)}'
+            add(condition + ')', codes + positions)
+        if grave_good is not None:
+            goods = [good.lower() for good in _values(grave_good)]
+            add(f'EXISTS (SELECT 1 FROM grave_goods WHERE grave_goods.individual = individuals.key AND {_in("grave_goods.good", goods)} AND grave_goods.present = ?)',
+                goods + [_PRESENT.encode(Present.PRESENT)])
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def select(self, **filters: Any) -> List[Key]:
+        """(site_id, id) keys, in insertion order, of the individuals matching all the filters. Each filter takes one
+        value or a collection of them (any of which matches):
+
+        * site_id, site_name
+        * sex: the combined osteological Sex, age: the AgeCategory (members or their names)
+        * trauma: a TraumaCategory on any bone, or only on trauma_bones (Trauma field names, both sides of pairs)
+        * joint_condition: a JointCondition on any joint, or only on joints (Joints field names)
+        * grave_good: a grave good recorded as present"""
+        where, params = self._where(**filters)
+        return self.connection.execute(f'SELECT site_id, id FROM individuals{where} ORDER BY key', params).fetchall()
+
+    def count(self, **filters: Any) -> int:
+        """How many individuals match the filters, see select"""
+        where, params = self._where(**filters)
+        return self.connection.execute(f'SELECT count(*) FROM individuals{where}', params).fetchone()[0]
+
+    def individuals(self, sections: Optional[Iterable[str]] = None, **filters: Any) -> List[Individual]:
+        """The individuals matching the filters (see select), only the given sections (default all, see SECTIONS) are
+        read, the others are empty"""
+        where, params = self._where(**filters)
+        with self.connection:
+            self.connection.execute('DELETE FROM temp.selected')
+            self.connection.execute(f'INSERT INTO temp.selected SELECT key FROM individuals{where}', params)
+            return self._load(sections)
+
+    def load(self, keys: Iterable[Key], sections: Optional[Iterable[str]] = None) -> List[Individual]:
+        """The individuals with the given (site_id, id) keys, in insertion order, unknown keys are skipped. Only the
+        given sections (default all, see SECTIONS) are read, the others are empty."""
+        with self.connection:
+            self.connection.execute('DELETE FROM temp.selected')
+            self.connection.executemany('INSERT OR IGNORE INTO temp.selected SELECT key FROM individuals WHERE site_id = ? AND id IS ?', keys)
+            return self._load(sections)
+
+    def population(self, sections: Optional[Iterable[str]] = None, **filters: Any) -> Population:
+        return Population(self.individuals(sections=sections, **filters))
+
+    def _load(self, sections: Optional[Iterable[str]]) -> List[Individual]:
+        sections = set(SECTIONS if sections is None else sections)
+        unknown = sections - set(SECTIONS)
+        if unknown:
+            raise ValueError(f'Unknown sections: {sorted(unknown)}')
+
+        connection = self.connection
+        ass_columns = [name for name, _ in _INDIVIDUAL_COLUMNS[3:11]] + _LONG_BONE_COLUMNS
+        context_columns = [name for name, _ in _INDIVIDUAL_COLUMNS[11 + len(_LONG_BONE_COLUMNS):]]
+        rows = connection.execute(f'SELECT key, id, site_name, site_id, {", ".join(ass_columns + context_columns)} FROM individuals '
+                                  'WHERE key IN temp.selected ORDER BY key').fetchall()
+        keys = np.array([row[0] for row in rows], dtype=np.int64)
+
+        def section_rows(table: str, columns: str) -> np.ndarray:
+            """The table's rows of the selected individuals, the first column replaced by the individual's position"""
+            values = np.array(connection.execute(f'SELECT individual, {columns} FROM {table} WHERE individual IN temp.selected').fetchall(), dtype=np.float64)
+            if len(values) == 0:
+                return np.zeros((0, 1 + columns.count(',') + 1))
+            values[:, 0] = np.searchsorted(keys, values[:, 0])
+            return values
+
+        if 'mouth' in sections:
+            teeth = np.full((len(rows), 32, len(TOOTH_LABELS)), NA_CODE, dtype=np.int8)
+            values = section_rows('teeth', f'position, {", ".join(TOOTH_LABELS)}').astype(np.int64)
+            teeth[values[:, 0], values[:, 1]] = values[:, 2:]
+        if 'occupational_markers' in sections:
+            markers = np.full((len(rows), len(MUSCLES), 2), np.nan, dtype=np.float32)
+            values = section_rows('markers', 'muscle, side, value')
+            markers[values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), values[:, 2].astype(np.int64)] = values[:, 3]
+        coded = {}
+        for section, size in (('joints', JOINTS_CODES), ('trauma', TRAUMA_CODES)):
+            if section in sections:
+                codes = np.full((len(rows), size), NA_CODE, dtype=np.int8)
+                values = section_rows(section, 'position, code').astype(np.int64)
+                codes[values[:, 0], values[:, 1]] = values[:, 2]
+                coded[section] = codes
+        goods: Dict[int, List[Tuple[str, int]]] = {}
+        if 'context' in sections:
+            for key, good, present in connection.execute('SELECT individual, good, present FROM grave_goods WHERE individual IN temp.selected ORDER BY individual, position'):
+                goods.setdefault(key, []).append((good, present))
+
+        individuals = []
+        for i, row in enumerate(rows):
+            key, _id, site_name, site_id = row[:4]
+            values = row[4:]
+            individuals.append(Individual(
+                _id, BurialInfo(site_name, site_id),
+                _age_sex_stature(values[:len(ass_columns)]) if 'age_sex_stature' in sections else AgeSexStature.empty(),
+                Mouth.from_codes(teeth[i], trusted=True) if 'mouth' in sections else Mouth.empty(),
+                OccupationalMarkers.from_array(markers[i]) if 'occupational_markers' in sections else OccupationalMarkers.empty(),
+                Joints.from_codes(coded['joints'][i]) if 'joints' in sections else Joints.empty(),
+                Trauma.from_codes(coded['trauma'][i]) if 'trauma' in sections else Trauma.empty(),
+                _context(values[len(ass_columns):], goods.get(key, [])) if 'context' in sections else Context.empty()))
+        return individuals
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self}'
+
+    def __str__(self):
+        return f'{len(self)} individuals'
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
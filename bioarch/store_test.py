@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+import pandas as pd
+
+
+from .age import AgeCategory
+from .context import Context
+from .joints import JointCondition, Joints
+from .mouth import Mouth
+from .population import Population
+from .sex import Sex
+from .store import CohortStore, SECTIONS
+from .synthetic import CohortGenerator
+from .trauma import TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE, TraumaCategory
+
+
+def keys(individuals):
+    return [(individual.site.id, individual.id) for individual in individuals]
+
+
+def trauma_categories(trauma, bones=TRAUMA_LEFT_RIGHT + TRAUMA_SINGLE):
+    categories = []
+    for bone in bones:
+        value = getattr(trauma, bone)
+        if bone in TRAUMA_LEFT_RIGHT:
+            categories += [] if value is None else [value.left, value.right]
+        else:
+            categories.append(value)
+    return categories
+
+
+class CohortStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.individuals = list(CohortGenerator(seed=9).individuals(60))
+        self.store = CohortStore()
+        self.store.add(self.individuals)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), 60)
+        loaded = self.store.individuals()
+        self.assertEqual(keys(loaded), keys(self.individuals))
+        pd.testing.assert_frame_equal(Population(loaded).to_pd_data_frame(), Population(self.individuals).to_pd_data_frame())
+
+    def test_sections(self):
+        loaded = self.store.load(keys(self.individuals[:5]), sections=['joints'])
+        self.assertEqual([individual.joints.codes.tolist() for individual in loaded], [individual.joints.codes.tolist() for individual in self.individuals[:5]])
+        for individual in loaded:
+            self.assertEqual(individual.mouth.teeth, Mouth.empty().teeth)
+            self.assertEqual(individual.context.to_pd_dict(), Context.empty().to_pd_dict())
+        with self.assertRaises(ValueError):
+            self.store.individuals(sections=['teeth'])
+        self.assertEqual(SECTIONS[0], 'site')
+
+    def test_load(self):
+        wanted = keys(self.individuals[10:13]) + [('no such site', 'no such id')]
+        self.assertEqual(keys(self.store.load(reversed(wanted))), wanted[:3])
+
+    def test_select(self):
+        site = next(individual.site.id for individual in self.individuals if TraumaCategory.UNHEALED_FRACTURE in trauma_categories(individual.trauma))
+        expected = [individual for individual in self.individuals
+                    if individual.site.id == site and TraumaCategory.UNHEALED_FRACTURE in trauma_categories(individual.trauma)]
+        self.assertTrue(expected)
+        self.assertEqual(self.store.select(site_id=site, trauma=TraumaCategory.UNHEALED_FRACTURE), keys(expected))
+        self.assertEqual(self.store.count(site_id=site, trauma='UNHEALED_FRACTURE'), len(expected))
+
+        femurs = [individual for individual in self.individuals if TraumaCategory.UNHEALED_FRACTURE in trauma_categories(individual.trauma, ['femur'])]
+        self.assertEqual(self.store.select(trauma=TraumaCategory.UNHEALED_FRACTURE, trauma_bones='femur'), keys(femurs))
+
+        stats = [individual.age_sex_stature for individual in self.individuals]
+        males = [individual for individual, ass in zip(self.individuals, stats)
+                 if ass.osteological_sex.combined in (Sex.MALE, Sex.MALE_LIKELY) and ass.age.category == AgeCategory.YOUNG_ADULT]
+        self.assertEqual(self.store.select(sex=[Sex.MALE, Sex.MALE_LIKELY], age=AgeCategory.YOUNG_ADULT), keys(males))
+
+        fused = [individual for individual in self.individuals if individual.joints.l1_5 == JointCondition.FUSED]
+        self.assertEqual(self.store.select(joint_condition=JointCondition.FUSED, joints='l1_5'), keys(fused))
+        self.assertEqual(self.store.select(), keys(self.individuals))
+
+        with self.assertRaises(ValueError):
+            self.store.select(trauma=TraumaCategory.FRACTURE, trauma_bones='skull')
+        with self.assertRaises(ValueError):
+            self.store.select(trauma_bones='femur')
+        with self.assertRaises(KeyError):
+            self.store.select(sex='NOT_A_SEX')
+
+    def test_replace_and_remove(self):
+        replacement = self.individuals[3]
+        replacement.joints = Joints.empty()
+        self.store.add([replacement])
+        self.assertEqual(len(self.store), 60)
+        self.assertEqual(self.store.load(keys([replacement]))[0].joints.codes.tolist(), Joints.empty().codes.tolist())
+        self.assertEqual(self.store.remove(keys(self.individuals[:2]) + [('no such site', 'no such id')]), 2)
+        self.assertEqual(len(self.store), 58)
+        self.assertEqual(self.store.connection.execute('SELECT count(*) FROM teeth').fetchone()[0], 58 * 32)
+
+    def test_no_id(self):
+        individuals = self.individuals[:2]
+        for individual in individuals:
+            individual.id = None
+        individuals[1].site = individuals[0].site
+        self.assertEqual(self.store.add(individuals), 2)
+        self.assertEqual(self.store.add(individuals[:1]), 1)
+        self.assertEqual(len(self.store), 63)
+        key = (individuals[0].site.id, None)
+        self.assertEqual(self.store.select(site_id=key[0]).count(key), 3)
+        loaded = self.store.load([key])
+        self.assertEqual([individual.id for individual in loaded], [None] * 3)
+        self.assertEqual(self.store.remove([key]), 3)
+        self.assertEqual(len(self.store), 60)
+
+
+class CohortStoreFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cohort.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reopen(self):
+        individuals = list(CohortGenerator(seed=10).individuals(10))
+        with CohortStore(self.path) as store:
+            store.add(individuals)
+        with CohortStore(self.path) as store:
+            self.assertEqual(keys(store.individuals()), keys(individuals))
+
+    def test_not_a_store(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE other (value INTEGER)')
+        connection.commit()
+        connection.close()
+        with self.assertRaises(ValueError):
+            CohortStore(self.path)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+
+from random import Random
+from typing import Any, Dict, Iterator, List, Optional
+
+
+from .age import AgeCategory, EstimatedAge
+from .context import BodyPosition, CompassBearing, Context, KNOWN_GROUPS, Present
+from .individual import AgeSexStature, BurialInfo, Individual, LongBoneMeasurement, OsteologicalSex
+from .io import CONTEXT_PRESENT, LONG_BONE_MEASUREMENTS, LONG_BONES
+from .joints import JointCondition, Joints, JOINTS_LEFT_RIGHT, JOINTS_SINGLE
+from .left_right import LeftRight
+from .mouth import Mouth, TOOTH_LABELS, VALID_ABCESS, VALID_CALCULUS, VALID_CAVITIES, VALID_EH, VALID_TEETH
+from .occupational_markers import EnthesialMarker, MUSCLES, OccupationalMarkers
+from .population import Population
+from .sex import Sex
+from .trauma import Trauma, TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE, TraumaCategory
+
+
+GRAVE_GOODS = tuple(sorted(good for goods in KNOWN_GROUPS.values() for good in goods))
+
+
+class CohortGenerator(object):
+    """Random, but reproducible for a given seed, individuals for tests and benchmarks.
+
+    Each individual is first drawn as a record of plain values (see record) that can then be built into an
+    Individual (build) or written as a recording sheet row for bioarch.io (to_row)."""
+
+    def __init__(self, seed: int = 0, missing: float = 0.2):
+        self.random = Random(seed)
+        self.missing = missing
+
+    def _maybe(self, value: Any) -> Optional[Any]:
+        return None if self.random.random() < self.missing else value
+
+    def _tooth(self) -> List[str]:
+        tooth = self.random.choice(VALID_TEETH)
+        if tooth == 'NA':
+            return ['NA', 'NA', 'NA', 'NA', self.random.choice(VALID_ABCESS)]
+        return [tooth] + [self.random.choice(valid) for valid in (VALID_CALCULUS, VALID_EH, VALID_CAVITIES, VALID_ABCESS)]
+
+    def _marker(self) -> Optional[Dict[str, Any]]:
+        kind = self.random.choice(('', '', '', 's', 'oe'))
+        lowest = 1 if kind else 0
+        return self._maybe({'value': self.random.randint(lowest, 6) / 2, 'is_s': kind == 's', 'is_oe': kind == 'oe'})
+
+    def _trauma(self) -> List[Optional[TraumaCategory]]:
+        left = self._maybe(self.random.choice(list(TraumaCategory)))
+        # TraumaCategory.avg only combines matching sides
+        right = self.random.choice((left, None, TraumaCategory.NOT_PRESENT))
+        return [left, right]
+
+    def record(self, _id: str) -> Dict[str, Any]:
+        choice = self.random.choice
+        age_start = self.random.randint(15, 60)
+        return {
+            'id': _id,
+            'site_name': choice(('Birka', 'Kaupang', 'Hedeby', 'Ribe')),
+            'site_id': str(self.random.randint(1, 1000)),
+            'sex': [self._maybe(choice(list(Sex))) for _ in range(3)],
+            'age_category': choice(list(AgeCategory)).name,
+            'age_range': f'{age_start}-{age_start + choice((5, 10, 15))}',
+            'long_bones': {bone: [[self._maybe(round(self.random.uniform(20.0, 500.0), 1)) for _ in LONG_BONE_MEASUREMENTS] for _ in range(2)] for bone in LONG_BONES},
+            'stature': self._maybe(str(self.random.randint(140, 190))),
+            'body_mass': self._maybe(str(self.random.randint(45, 95))),
+            'teeth': [self._tooth() for _ in range(32)],
+            'markers': [[self._marker(), self._marker()] for _ in MUSCLES],
+            'joints': {joint: [self._maybe(choice(list(JointCondition))) for _ in range(2)] for joint in JOINTS_LEFT_RIGHT},
+            'joints_single': {joint: self._maybe(choice(list(JointCondition))) for joint in JOINTS_SINGLE},
+            'trauma': {bone: self._trauma() for bone in TRAUMA_LEFT_RIGHT},
+            'trauma_single': {bone: self._maybe(choice(list(TraumaCategory))) for bone in TRAUMA_SINGLE},
+            'body_position': self._maybe(choice(list(BodyPosition))),
+            'body_orientation': self._maybe(choice(list(CompassBearing))),
+            'present': {field: self._maybe(choice(list(Present))) for field in CONTEXT_PRESENT},
+            'grave_goods': {good: choice((True, False)) for good in self.random.sample(GRAVE_GOODS, self.random.randint(0, 5))},
+        }
+
+    def records(self, count: int) -> List[Dict[str, Any]]:
+        return [self.record(f'id_{number}') for number in range(count)]
+
+    @staticmethod
+    def build(record: Dict[str, Any]) -> Individual:
+        """Construct the Individual of a record"""
+        osteological_sex = OsteologicalSex(*record['sex'])
+        age = EstimatedAge(record['age_category'], record['age_range'])
+        long_bones = [LeftRight(*[LongBoneMeasurement(*side) for side in record['long_bones'][bone]]) for bone in LONG_BONES]
+        age_sex_stature = AgeSexStature(osteological_sex, age, *long_bones, record['stature'], record['body_mass'])
+
+        mouth = Mouth.from_rows(record['teeth'])
+
+        def marker(values):
+            return None if values is None else EnthesialMarker(**values)
+        occupational_markers = OccupationalMarkers(*[LeftRight(marker(left), marker(right)) for left, right in record['markers']])
+
+        joints = {joint: LeftRight(*sides) for joint, sides in record['joints'].items()}
+        trauma = {bone: LeftRight(*sides) for bone, sides in record['trauma'].items()}
+
+        present = [record['present'][field] for field in CONTEXT_PRESENT]
+        context = Context(record['body_position'], record['body_orientation'], *present, dict(record['grave_goods']))
+
+        return Individual(record['id'], BurialInfo(record['site_name'], record['site_id']), age_sex_stature, mouth, occupational_markers,
+                          Joints(**joints, **record['joints_single']), Trauma(**trauma, **record['trauma_single']), context)
+
+    @staticmethod
+    def to_row(record: Dict[str, Any]) -> Dict[str, str]:
+        """The record as a bioarch.io recording sheet row, with the default Schema columns and empty cells for NA"""
+        def text(value):
+            if value is None:
+                return ''
+            if isinstance(value, (Sex, BodyPosition, CompassBearing, Present)):
+                return value.name
+            if isinstance(value, (JointCondition, TraumaCategory)):
+                return str(value.value)
+            return str(value)
+
+        def marker(values):
+            if values is None:
+                return ''
+            return ('s' if values['is_s'] else 'oe' if values['is_oe'] else '') + str(values['value'])
+
+        row = {field: text(record[field]) for field in ('id', 'site_name', 'site_id', 'age_category', 'age_range', 'stature', 'body_mass', 'body_position', 'body_orientation')}
+        row.update({f'sex_{field}': text(sex) for field, sex in zip(('pelvic', 'cranium', 'combined'), record['sex'])})
+        for bone, sides in record['long_bones'].items():
+            for side, measurements in zip(('left', 'right'), sides):
+                row.update({f'{bone}_{side}_{measurement}': text(value) for measurement, value in zip(LONG_BONE_MEASUREMENTS, measurements)})
+        for number, tooth in enumerate(record['teeth'], start=1):
+            row.update({f'tooth_{number}_{label}': value for label, value in zip(TOOTH_LABELS, tooth)})
+        for muscle, (left, right) in zip(MUSCLES, record['markers']):
+            row[f'{muscle}_left'] = marker(left)
+            row[f'{muscle}_right'] = marker(right)
+        for section in ('joints', 'trauma'):
+            for name, (left, right) in record[section].items():
+                row[f'{section}_{name}_left'] = text(left)
+                row[f'{section}_{name}_right'] = text(right)
+            row.update({f'{section}_{name}': text(value) for name, value in record[f'{section}_single'].items()})
+        row.update({field: text(value) for field, value in record['present'].items()})
+        row.update({f'grave_goods_{good}': '1' if value else '0' for good, value in record['grave_goods'].items()})
+        return row
+
+    def individuals(self, count: int) -> Iterator[Individual]:
+        for record in self.records(count):
+            yield self.build(record)
+
+    def population(self, count: int) -> Population:
+        return Population(self.individuals(count))
+
+    def rows(self, count: int) -> List[Dict[str, str]]:
+        return [self.to_row(record) for record in self.records(count)]
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
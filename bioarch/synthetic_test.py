@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+import pandas as pd
+
+
+from .individual import Individual
+from .io import read_rows
+from .population import Population
+from .synthetic import CohortGenerator
+
+
+class CohortGeneratorTest(unittest.TestCase):
+    def test_reproducible(self):
+        self.assertEqual(CohortGenerator(seed=1).records(5), CohortGenerator(seed=1).records(5))
+        self.assertNotEqual(CohortGenerator(seed=1).records(5), CohortGenerator(seed=2).records(5))
+
+    def test_build(self):
+        individuals = list(CohortGenerator().individuals(10))
+        self.assertEqual(len(individuals), 10)
+        for individual in individuals:
+            self.assertIsInstance(individual, Individual)
+        self.assertEqual(len(CohortGenerator().population(3)), 3)
+
+    def test_to_row(self):
+        generator = CohortGenerator(missing=0.5)
+        records = generator.records(20)
+        built = Population(generator.build(record) for record in records).to_pd_data_frame()
+        parsed = Population(read_rows(generator.to_row(record) for record in records)).to_pd_data_frame()
+        pd.testing.assert_frame_equal(parsed, built)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
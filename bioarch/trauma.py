@@ -3,14 +3,20 @@
 
 import enum
 from enum import Enum
+import functools
 import logging
+from typing import Any, Collection, Iterable, List, Optional, Tuple
 
 
-import pandas as pd
-from pandas.api.types import CategoricalDtype
+import numpy as np
 
 
+from . import instrumentation
+from .codes import code_layout, CodedField, CodedPair, EnumCodes, NA_CODE, NO_PAIR_CODE
+from .columns import add_prefix, Cell, select_cells, to_pd_data_frame
+from .lazy import pandas as pd
 from .left_right import LeftRight
+from .parsing import parse_array, parse_many
 
 
 logger = logging.getLogger(__name__)
@@ -42,16 +48,21 @@ class TraumaCategory(Enum):
         if isinstance(value, (float, int)):
             value = str(value)
         if not isinstance(value, str):
+            instrumentation.parse_failed(TraumaCategory.__name__)
             raise ValueError(f'Failed to parse TraumaCategory: "{value}"')
-        value = value.upper()
-        for condition in TraumaCategory:
-            if value == condition.name:
-                return condition
-            if value == str(condition.value):
-                return condition
-        if value in ('NA', 'N'):
-            return TraumaCategory.NOT_PRESENT
-        raise ValueError(f'Failed to parse TraumaCategory: "{value}"')
+        category = _TRAUMA_CATEGORY_ALIASES.get(value.upper())
+        if category is not None:
+            return category
+        instrumentation.parse_failed(TraumaCategory.__name__)
+        raise ValueError(f'Failed to parse TraumaCategory: "{value.upper()}"')
+
+    @staticmethod
+    def parse_many(values: Iterable[Any]) -> List[Optional['TraumaCategory']]:
+        return parse_many(TraumaCategory.parse, values)
+
+    @staticmethod
+    def parse_array(values: Any) -> np.ndarray:
+        return parse_array(TraumaCategory.parse, values)
 
     @staticmethod
     def avg(left, right):
@@ -70,65 +81,104 @@ class TraumaCategory(Enum):
         return self.name
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def dtype():
-        return CategoricalDtype(categories=[s.name for s in TraumaCategory], ordered=False)
+        return pd.api.types.CategoricalDtype(categories=[s.name for s in TraumaCategory], ordered=False)
+
+
+_TRAUMA_CATEGORY_ALIASES = {category.name: category for category in TraumaCategory}
+_TRAUMA_CATEGORY_ALIASES.update({str(category.value): category for category in TraumaCategory})
+_TRAUMA_CATEGORY_ALIASES.update({str(float(category.value)): category for category in TraumaCategory})
+_TRAUMA_CATEGORY_ALIASES.update({'NA': TraumaCategory.NOT_PRESENT, 'N': TraumaCategory.NOT_PRESENT})
+
+
+TRAUMA_LEFT_RIGHT = ('clavicle', 'scapula', 'humerus', 'ulna', 'radius', 'femur', 'tibia', 'fibula')
+TRAUMA_SINGLE = ('facial_bones', 'ribs', 'vertabrae')
+
+
+# Trauma codes (see EnumCodes) layout, the left and right of each TRAUMA_LEFT_RIGHT bone then TRAUMA_SINGLE
+TRAUMA_LAYOUT = code_layout(TRAUMA_LEFT_RIGHT, TRAUMA_SINGLE)
+TRAUMA_CODES = 2 * len(TRAUMA_LEFT_RIGHT) + len(TRAUMA_SINGLE)
+
+_CODES = EnumCodes(TraumaCategory)
+_PAIRS = 2 * len(TRAUMA_LEFT_RIGHT)
+# Average code of sides that can not be averaged (TraumaCategory.avg raises NotImplementedError)
+_NO_AVG = -3
+_AVG = _CODES.avg_table(_NO_AVG)
+
+
+@functools.lru_cache(maxsize=None)
+def _cells() -> List[Tuple[Cell, Cell]]:
+    """The (shared) category and value cells of every code"""
+    return [(Cell(name, TraumaCategory.dtype()), Cell(value)) for name, value in zip(_CODES.names, _CODES.values)]
 
 
 class Trauma(object):  # pylint: disable=R0902
-    """docstring for Trauma"""
+    """Trauma by bone, stored as an int8 array of TraumaCategory codes laid out as TRAUMA_LAYOUT"""
 
-    def __init__(self, facial_bones: TraumaCategory, clavicle: LeftRight[TraumaCategory], scapula: LeftRight[TraumaCategory], humerus: LeftRight[TraumaCategory], ulna: LeftRight[TraumaCategory], radius: LeftRight[TraumaCategory], femur: LeftRight[TraumaCategory], tibia: LeftRight[TraumaCategory], fibula: LeftRight[TraumaCategory], ribs: TraumaCategory, vertabrae: TraumaCategory):
-        self.facial_bones = facial_bones
+    __slots__ = ['codes']
 
-        self.clavicle = clavicle
-        self.scapula = scapula
-        self.humerus = humerus
-        self.ulna = ulna
-        self.radius = radius
-        self.femur = femur
-        self.tibia = tibia
-        self.fibula = fibula
+    facial_bones = CodedField(_CODES, TRAUMA_LAYOUT['facial_bones'])
+    clavicle = CodedPair(_CODES, TRAUMA_LAYOUT['clavicle'])
+    scapula = CodedPair(_CODES, TRAUMA_LAYOUT['scapula'])
+    humerus = CodedPair(_CODES, TRAUMA_LAYOUT['humerus'])
+    ulna = CodedPair(_CODES, TRAUMA_LAYOUT['ulna'])
+    radius = CodedPair(_CODES, TRAUMA_LAYOUT['radius'])
+    femur = CodedPair(_CODES, TRAUMA_LAYOUT['femur'])
+    tibia = CodedPair(_CODES, TRAUMA_LAYOUT['tibia'])
+    fibula = CodedPair(_CODES, TRAUMA_LAYOUT['fibula'])
+    ribs = CodedField(_CODES, TRAUMA_LAYOUT['ribs'])
+    vertabrae = CodedField(_CODES, TRAUMA_LAYOUT['vertabrae'])
 
-        self.ribs = ribs
-        self.vertabrae = vertabrae
+    def __init__(self, facial_bones: TraumaCategory, clavicle: LeftRight[TraumaCategory], scapula: LeftRight[TraumaCategory], humerus: LeftRight[TraumaCategory], ulna: LeftRight[TraumaCategory], radius: LeftRight[TraumaCategory], femur: LeftRight[TraumaCategory], tibia: LeftRight[TraumaCategory], fibula: LeftRight[TraumaCategory], ribs: TraumaCategory, vertabrae: TraumaCategory):
+        self.codes: np.ndarray = _CODES.encode_fields((clavicle, scapula, humerus, ulna, radius, femur, tibia, fibula), (facial_bones, ribs, vertabrae))
 
     @staticmethod
     def empty():
-        categories = [TraumaCategory.NOT_PRESENT] * 1
-        categories += [LeftRight(TraumaCategory.NOT_PRESENT, TraumaCategory.NOT_PRESENT)] * 8
-        categories += [TraumaCategory.NOT_PRESENT] * 2
-        return Trauma(*categories)
+        return Trauma.from_codes(np.full(TRAUMA_CODES, _CODES.encode(TraumaCategory.NOT_PRESENT), dtype=np.int8))
 
-    def to_pd_data_frame(self, index):
-        d = {
-            'id': pd.Series([index]),
-        }
-        for l in ('clavicle', 'scapula', 'humerus', 'ulna', 'radius', 'femur', 'tibia', 'fibula'):
-            val = getattr(self, l)
-            if val is None:
+    @staticmethod
+    def from_codes(codes: np.ndarray) -> 'Trauma':
+        codes = np.array(codes, dtype=np.int8)
+        if codes.shape != (TRAUMA_CODES,):
+            raise ValueError(f'Incorrect trauma codes shape: {codes.shape}')
+        trauma = object.__new__(Trauma)
+        trauma.codes = codes
+        return trauma
+
+    def state_key(self):
+        """See Joints.state_key"""
+        return self.codes.tobytes()
+
+    def to_pd_dict(self, prefix='', columns: Optional[Collection[str]] = None):
+        """All the columns, or only the given ones, skipping the averages that are not wanted"""
+        cells_of = _cells()
+        codes = self.codes.tolist()
+        avg = _AVG[self.codes[0:_PAIRS:2] + 2, self.codes[1:_PAIRS:2] + 2].tolist()
+        cells = {}
+        for i, l in enumerate(TRAUMA_LEFT_RIGHT):
+            left, right = codes[2 * i], codes[2 * i + 1]
+            if left == NO_PAIR_CODE:
                 continue
-            if val.left is not None:
-                d[f'{l}_left_cat'] = pd.Series([val.left.name],  copy=True, dtype=TraumaCategory.dtype())  # noqa: E241
-                d[f'{l}_left_val'] = pd.Series([val.left.value], copy=True)
-            if val.right is not None:
-                d[f'{l}_right_cat'] = pd.Series([val.right.name],  copy=True, dtype=TraumaCategory.dtype())  # noqa: E241
-                d[f'{l}_right_val'] = pd.Series([val.right.value], copy=True)
-            try:
-                val_avg = val.avg()
-                if val_avg is not None:
-                    d[f'{l}_avg_cat'] = pd.Series([val_avg.name],  copy=True, dtype=TraumaCategory.dtype())  # noqa: E241
-                    d[f'{l}_avg_val'] = pd.Series([val_avg.value], copy=True)
-            except NotImplementedError:
+            if left >= 0:
+                cells[f'{l}_left_cat'], cells[f'{l}_left_val'] = cells_of[left]
+            if right >= 0:
+                cells[f'{l}_right_cat'], cells[f'{l}_right_val'] = cells_of[right]
+            if columns is not None and f'{prefix}{l}_avg_cat' not in columns and f'{prefix}{l}_avg_val' not in columns:
+                continue
+            if avg[i] == _NO_AVG:
                 logger.info('Can not "avg" "%s": "%s"', l, self)
+            elif avg[i] >= 0:
+                cells[f'{l}_avg_cat'], cells[f'{l}_avg_val'] = cells_of[avg[i]]
 
-        for l in ('facial_bones', 'ribs', 'vertabrae'):
-            val = getattr(self, l)
-            if val is None:
-                continue
-            d[f'{l}_cat'] = pd.Series([val.name],  copy=True, dtype=TraumaCategory.dtype())  # noqa: E241
-            d[f'{l}_val'] = pd.Series([val.value], copy=True)
+        for l, code in zip(TRAUMA_SINGLE, codes[_PAIRS:]):
+            if code >= 0:
+                cells[f'{l}_cat'], cells[f'{l}_val'] = cells_of[code]
 
-        return pd.DataFrame.from_dict(d).set_index('id')
+        return select_cells(add_prefix(cells, prefix), columns)
+
+    def to_pd_data_frame(self, index):
+        return to_pd_data_frame(index, self.to_pd_dict())
 
     def __repr__(self):
         return f'{self.__class__.__name__}: {self}'
@@ -137,5 +187,82 @@ class Trauma(object):  # pylint: disable=R0902
         return f'facial_bones="{self.facial_bones}" clavicle="{self.clavicle}" ...'
 
 
+class TraumaArray(object):
+    """The Trauma of many individuals as one (n x TRAUMA_CODES) int8 array of their codes, so the averages of a whole
+    batch are computed with array operations."""
+
+    __slots__ = ['codes']
+
+    def __init__(self, codes: np.ndarray):
+        codes = np.asarray(codes, dtype=np.int8)
+        if codes.ndim != 2 or codes.shape[1] != TRAUMA_CODES:
+            raise ValueError(f'Incorrect trauma array shape: {codes.shape}')
+        self.codes = codes
+
+    @staticmethod
+    def from_trauma(trauma: Iterable[Trauma]) -> 'TraumaArray':
+        codes = [t.codes for t in trauma]
+        if not codes:
+            return TraumaArray(np.empty((0, TRAUMA_CODES), dtype=np.int8))
+        return TraumaArray(np.stack(codes))
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def __getitem__(self, i: int) -> Trauma:
+        return Trauma.from_codes(self.codes[i])
+
+    def to_pd_data_frame(self, index=None, prefix='', columns: Optional[Collection[str]] = None) -> 'pd.DataFrame':
+        """Same columns as Trauma.to_pd_dict, or only the given ones, one row per individual.
+
+        As to_pd_dict leaves out NA values, columns are ordered as Population.to_pd_data_frame orders rows that differ
+        in which they have."""
+        def wanted(key):
+            return columns is None or f'{prefix}{key}_cat' in columns or f'{prefix}{key}_val' in columns
+
+        codes = self.codes
+        keys: List[str] = []
+        values: List[np.ndarray] = []
+        for i, l in enumerate(TRAUMA_LEFT_RIGHT):
+            for side, side_codes in (('left', codes[:, 2 * i]), ('right', codes[:, 2 * i + 1])):
+                if wanted(f'{l}_{side}'):
+                    keys.append(f'{l}_{side}')
+                    values.append(side_codes)
+            if wanted(f'{l}_avg'):
+                avg = _AVG[codes[:, 2 * i] + 2, codes[:, 2 * i + 1] + 2]
+                if (avg == _NO_AVG).any():
+                    logger.info('Can not "avg" "%s" of %d individuals', l, np.count_nonzero(avg == _NO_AVG))
+                keys.append(f'{l}_avg')
+                values.append(avg)
+        for l in TRAUMA_SINGLE:
+            if wanted(l):
+                keys.append(l)
+                values.append(codes[:, TRAUMA_LAYOUT[l]])
+        if not len(self) or not keys:
+            return pd.DataFrame(index=index)
+
+        stacked = np.stack(values, axis=1)
+        present = stacked >= 0
+        # A key's columns first appear with the first individual that has it, in key order within an individual
+        seen = present.any(axis=0)
+        first = present.argmax(axis=0)
+        order = sorted(np.flatnonzero(seen), key=lambda k: (first[k], k))
+
+        dtype = TraumaCategory.dtype()
+        numbers = np.array([np.nan if value is None else value for value in _CODES.values], dtype=np.float64)
+        data = {}
+        for k in order:
+            category_codes = np.where(present[:, k], stacked[:, k], NA_CODE)
+            data[f'{prefix}{keys[k]}_cat'] = pd.Categorical.from_codes(category_codes, dtype=dtype)
+            numbers_k = numbers[category_codes]
+            # As pandas infers from the cells' values, int64 when there are no missing or fractional values
+            if present[:, k].all() and (numbers_k == np.trunc(numbers_k)).all():
+                numbers_k = numbers_k.astype(np.int64)
+            data[f'{prefix}{keys[k]}_val'] = numbers_k
+
+        data = select_cells(data, columns)
+        return pd.DataFrame(data, index=index, columns=list(data.keys()))
+
+
 if __name__ == "__main__":
     raise RuntimeError('No main available')
@@ -4,8 +4,14 @@
 import unittest
 
 
+import numpy as np
+import pandas as pd
+
+
+from .columns import ColumnBuilder
 from .left_right import LeftRight
-from .trauma import Trauma, TraumaCategory
+from .synthetic import CohortGenerator
+from .trauma import Trauma, TraumaArray, TraumaCategory
 
 
 class TraumaCategoryTest(unittest.TestCase):
@@ -31,6 +37,19 @@ class TraumaCategoryTest(unittest.TestCase):
         self.assertEqual(TraumaCategory.parse('FRACTURE'), TraumaCategory.FRACTURE)
         self.assertEqual(TraumaCategory.parse(None), None)
         self.assertEqual(TraumaCategory.parse(TraumaCategory.FRACTURE), TraumaCategory.FRACTURE)
+        self.assertEqual(TraumaCategory.parse(3), TraumaCategory.FRACTURE)
+        self.assertEqual(TraumaCategory.parse(3.0), TraumaCategory.FRACTURE)
+        self.assertEqual(TraumaCategory.parse(0.5), TraumaCategory.PARTIAL_BONE)
+
+        with self.assertRaises(ValueError):
+            TraumaCategory.parse('13')
+
+    def test_parse_many(self):
+        self.assertEqual(TraumaCategory.parse_many(['NA', '3', 'fracture', None]), [TraumaCategory.NOT_PRESENT, TraumaCategory.FRACTURE, TraumaCategory.FRACTURE, None])
+
+    def test_dtype(self):
+        self.assertIs(TraumaCategory.dtype(), TraumaCategory.dtype())
+        self.assertFalse(TraumaCategory.dtype().ordered)
 
     def test_avg(self):
         self.assertEqual(TraumaCategory.avg(TraumaCategory.NOT_PRESENT, TraumaCategory.NOT_PRESENT), TraumaCategory.NOT_PRESENT)
@@ -53,10 +72,46 @@ class TraumaTest(unittest.TestCase):
         trauma.humerus = LeftRight(TraumaCategory.NORMAL, TraumaCategory.NORMAL)
         trauma.ulna = LeftRight(TraumaCategory.NORMAL, TraumaCategory.INFECTION)
 
+        self.assertEqual(trauma.clavicle, LeftRight(TraumaCategory.NOT_PRESENT, TraumaCategory.NORMAL))
+        self.assertEqual(trauma.radius, LeftRight(TraumaCategory.NOT_PRESENT, TraumaCategory.NOT_PRESENT))
+
         df = trauma.to_pd_data_frame('id1')
 
         self.assertEqual(df.to_json(orient='records'), '[{"clavicle_left_cat":"NOT_PRESENT","clavicle_left_val":-1,"clavicle_right_cat":"NORMAL","clavicle_right_val":1,"clavicle_avg_cat":"NORMAL","clavicle_avg_val":1,"scapula_left_cat":"NORMAL","scapula_left_val":1,"scapula_right_cat":"NOT_PRESENT","scapula_right_val":-1,"scapula_avg_cat":"NORMAL","scapula_avg_val":1,"humerus_left_cat":"NORMAL","humerus_left_val":1,"humerus_right_cat":"NORMAL","humerus_right_val":1,"humerus_avg_cat":"NORMAL","humerus_avg_val":1,"ulna_left_cat":"NORMAL","ulna_left_val":1,"ulna_right_cat":"INFECTION","ulna_right_val":2,"radius_left_cat":"NOT_PRESENT","radius_left_val":-1,"radius_right_cat":"NOT_PRESENT","radius_right_val":-1,"radius_avg_cat":"NOT_PRESENT","radius_avg_val":-1,"femur_left_cat":"NOT_PRESENT","femur_left_val":-1,"femur_right_cat":"NOT_PRESENT","femur_right_val":-1,"femur_avg_cat":"NOT_PRESENT","femur_avg_val":-1,"tibia_left_cat":"NOT_PRESENT","tibia_left_val":-1,"tibia_right_cat":"NOT_PRESENT","tibia_right_val":-1,"tibia_avg_cat":"NOT_PRESENT","tibia_avg_val":-1,"fibula_left_cat":"NOT_PRESENT","fibula_left_val":-1,"fibula_right_cat":"NOT_PRESENT","fibula_right_val":-1,"fibula_avg_cat":"NOT_PRESENT","fibula_avg_val":-1,"facial_bones_cat":"INFECTION","facial_bones_val":2,"ribs_cat":"NOT_PRESENT","ribs_val":-1,"vertabrae_cat":"NOT_PRESENT","vertabrae_val":-1}]')
 
+    def test_missing_pair(self):
+        trauma = Trauma.empty()
+        trauma.femur = None
+        trauma.tibia = LeftRight(TraumaCategory.PARTIAL_BONE, TraumaCategory.NORMAL)
+        self.assertIsNone(trauma.femur)
+        self.assertEqual(trauma.codes.dtype, np.int8)
+
+        cells = trauma.to_pd_dict()
+        self.assertNotIn('femur_left_cat', cells)
+        self.assertIn('tibia_left_cat', cells)
+        # Sides that can not be averaged have no average
+        self.assertNotIn('tibia_avg_cat', cells)
+        self.assertEqual(Trauma.from_codes(trauma.codes).tibia, trauma.tibia)
+
+
+class TraumaArrayTest(unittest.TestCase):
+    trauma = [individual.trauma for individual in CohortGenerator(seed=4, missing=0.4).individuals(30)]
+
+    def expected(self, columns=None):
+        rows = [(row, trauma.to_pd_dict(prefix='trauma_', columns=columns)) for row, trauma in enumerate(self.trauma)]
+        return ColumnBuilder.from_rows(rows).to_pd_data_frame()
+
+    def test_to_pd_data_frame(self):
+        array = TraumaArray.from_trauma(self.trauma)
+        self.assertEqual(len(array), 30)
+        self.assertEqual(array[3].femur, self.trauma[3].femur)
+        pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='trauma_'), self.expected(), check_index_type=False)
+
+        for columns in ({'trauma_femur_avg_cat', 'trauma_ribs_val'}, {'trauma_clavicle_left_cat', 'trauma_facial_bones_cat'}):
+            pd.testing.assert_frame_equal(array.to_pd_data_frame(prefix='trauma_', columns=columns), self.expected(columns), check_index_type=False)
+
+        self.assertEqual(len(TraumaArray.from_trauma([]).to_pd_data_frame().columns), 0)
+
 
 def main():
     unittest.main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+
+import numpy as np
+
+
+from . import instrumentation
+from .age import AgeCategory, EstimatedAge
+from .context import BodyPosition, CompassBearing, Present
+from .individual import Individual
+from .io import CONTEXT_PRESENT, FIELDS, parse_row, Schema
+from .joints import JointCondition
+from .lazy import pandas as pd
+from .mouth import TOOTH_LABELS, VALID_VALUES
+from .occupational_markers import EnthesialMarker
+from .sex import Sex
+from .trauma import TraumaCategory
+
+
+class Problem(NamedTuple):
+    """One rejected cell: its row number, field (see FIELDS, or a grave good's column), raw value and why"""
+    row: int
+    field: str
+    value: Any
+    reason: str
+
+
+class ValidationReport(object):
+    """Every Problem found in a batch, with a mask of the rows that had none"""
+
+    __slots__ = ['problems', 'valid']
+
+    def __init__(self, problems: List[Problem], valid: np.ndarray):
+        self.problems = problems
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.problems)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def invalid_rows(self) -> np.ndarray:
+        return np.flatnonzero(~self.valid)
+
+    def counts(self) -> Counter:
+        """Number of problems per field"""
+        return Counter(problem.field for problem in self.problems)
+
+    def to_pd_data_frame(self) -> 'pd.DataFrame':
+        """One row per Problem"""
+        return pd.DataFrame({
+            'row': pd.Series([problem.row for problem in self.problems], dtype='int64'),
+            'field': pd.Series([problem.field for problem in self.problems], dtype=object),
+            'value': pd.Series([problem.value for problem in self.problems], dtype=object),
+            'reason': pd.Series([problem.reason for problem in self.problems], dtype=object),
+        }, columns=['row', 'field', 'value', 'reason'])
+
+    def raise_if_invalid(self):
+        """ValueError describing the first problem"""
+        if self.problems:
+            row, field, value, reason = self.problems[0]
+            raise ValueError(f'{len(self.problems)} problems in {len(self.invalid_rows())} rows, first in row {row} {field} "{value}": {reason}')
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self}'
+
+    def __str__(self):
+        return f'{len(self.problems)} problems in {len(self.invalid_rows())} of {len(self.valid)} rows'
+
+
+class _CachedCheck(object):
+    """A parse function that gives the reason a value was rejected instead of raising, each distinct value (and type,
+    so 1, 1.0 and True are not mixed up) it accepts is only checked once. Rejected values are checked every time, so
+    their parse failures (see instrumentation) are counted per value rather than per distinct value."""
+
+    __slots__ = ['parse', 'cache']
+
+    def __init__(self, parse: Callable[[Any], Any]):
+        self.parse = parse
+        self.cache: Dict[Tuple[type, Any], Tuple[Any, Optional[str]]] = {}
+
+    def __call__(self, value: Any) -> Tuple[Any, Optional[str]]:
+        """The parsed value (None when rejected) and the reason it was rejected (None when it was not)"""
+        key = (type(value), value)
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable
+            return self._check(value)
+        result = self._check(value)
+        if result[1] is None:
+            self.cache[key] = result
+        return result
+
+    def _check(self, value: Any) -> Tuple[Any, Optional[str]]:
+        try:
+            return self.parse(value), None
+        except (TypeError, ValueError) as e:
+            return None, str(e) or f'Invalid value: "{value}"'
+
+
+def validate_column(parse: Callable[[Any], Any], values: Iterable[Any], field: str = '') -> Tuple[np.ndarray, ValidationReport]:
+    """parse (e.g. JointCondition.parse) every value without raising: an object array of the parsed values (None for
+    the rejected ones) and the report of the rejected ones"""
+    check = _CachedCheck(parse)
+    parsed = []
+    problems = []
+    for row, value in enumerate(values):
+        result, reason = check(value)
+        if reason is not None:
+            problems.append(Problem(row, field, value, reason))
+        parsed.append(result)
+    valid = np.ones(len(parsed), dtype=bool)
+    valid[[problem.row for problem in problems]] = False
+    array = np.empty(len(parsed), dtype=object)
+    array[:] = parsed
+    return array, ValidationReport(problems, valid)
+
+
+def _required(value: Any) -> Any:
+    if value is None:
+        raise ValueError('Required')
+    return value
+
+
+def _tooth_check(label: str) -> Callable[[Any], str]:
+    valid = frozenset(VALID_VALUES[label])
+
+    def check(value):
+        value = 'NA' if value is None else str(value).upper()
+        if value not in valid:
+            raise ValueError(f'{value!r} not found in {VALID_VALUES[label]}')
+        return value
+    return check
+
+
+def _field_parsers() -> Dict[str, Callable[[Any], Any]]:
+    """What parse_row does with each field (after Schema.normalise), that can fail"""
+    # id may be missing, as in read_rows
+    parsers: Dict[str, Callable[[Any], Any]] = {'site_name': _required, 'site_id': _required}
+    parsers['age_category'] = lambda value: AgeCategory.parse(value or 'UNKNOWN')
+    parsers['age_range'] = lambda value: EstimatedAge('UNKNOWN', None if value is None else str(value)).ranged
+    tooth_checks = {label: _tooth_check(label) for label in TOOTH_LABELS}
+    for field in FIELDS:
+        if field.startswith('sex_'):
+            parsers[field] = Sex.parse
+        elif field.endswith(('_max', '_bi', '_head', '_distal')):
+            parsers[field] = lambda value: None if value is None else float(value)
+        elif field.startswith('tooth_'):
+            parsers[field] = tooth_checks[field.rsplit('_', 1)[1]]
+        elif field.startswith('joints_'):
+            parsers[field] = JointCondition.parse
+        elif field.startswith('trauma_'):
+            parsers[field] = TraumaCategory.parse
+        elif field.endswith(('_left', '_right')):
+            parsers[field] = EnthesialMarker.parse
+    parsers['body_position'] = BodyPosition.parse
+    parsers['body_orientation'] = CompassBearing.parse
+    parsers.update({field: Present.parse for field in CONTEXT_PRESENT})
+    return parsers
+
+
+class _RowValidator(object):
+    __slots__ = ['schema', 'checks', 'grave_good_check']
+
+    def __init__(self, schema: Schema):
+        self.schema = schema
+        self.checks = [(field, schema.columns[field], _CachedCheck(parse)) for field, parse in _field_parsers().items()]
+        self.grave_good_check = _CachedCheck(Present.parse)
+
+    def problems(self, row_number: int, row: Mapping[str, Any]) -> List[Problem]:
+        schema = self.schema
+        problems = []
+        for field, column, check in self.checks:
+            raw = row.get(column)
+            value, reason = check(schema.normalise(raw))
+            if reason is not None:
+                problems.append(Problem(row_number, field, raw, reason))
+            elif field.endswith('_tooth') and value == 'NA':
+                # The other teeth values must be NA when the tooth is
+                for label in TOOTH_LABELS[1:4]:
+                    other = field[:-len('tooth')] + label
+                    other_raw = row.get(schema.columns[other])
+                    other_value = self._tooth_value(other_raw)
+                    # An invalid value is already reported
+                    if other_value != 'NA' and other_value in VALID_VALUES[label]:
+                        problems.append(Problem(row_number, other, other_raw, f'{label} must be NA when the tooth is NA'))
+        for column in schema.grave_goods_columns(row).values():
+            raw = row.get(column)
+            _, reason = self.grave_good_check(schema.normalise(raw))
+            if reason is not None:
+                problems.append(Problem(row_number, column, raw, reason))
+        return problems
+
+    def _tooth_value(self, raw: Any) -> str:
+        value = self.schema.normalise(raw)
+        return 'NA' if value is None else str(value).upper()
+
+
+def validate_rows(rows: Iterable[Mapping[str, Any]], schema: Optional[Schema] = None) -> Tuple[List[Optional[Individual]], ValidationReport]:
+    """Like read_rows, but rather than raising at the first bad cell every row is checked: the Individuals (None for
+    the rows with problems) and the report of every problem.
+
+    Each row is parsed once, by parse_row, only the rows it rejects are then checked cell by cell (without counting
+    their parse failures again, see instrumentation)."""
+    schema = schema or Schema()
+    validator = _RowValidator(schema)
+    individuals: List[Optional[Individual]] = []
+    problems: List[Problem] = []
+    for row_number, row in enumerate(rows):
+        try:
+            individual = parse_row(row, schema)
+        except ValueError as e:
+            individual = None
+            with instrumentation.uncounted():
+                row_problems = validator.problems(row_number, row)
+            problems.extend(row_problems or [Problem(row_number, '', None, str(e))])
+        individuals.append(individual)
+    valid = np.array([individual is not None for individual in individuals], dtype=bool)
+    return individuals, ValidationReport(problems, valid)
+
+
+def validate_pd_data_frames(frames: Union['pd.DataFrame', Iterable['pd.DataFrame']], schema: Optional[Schema] = None) -> Tuple[List[Optional[Individual]], ValidationReport]:
+    """validate_rows of a data frame or an iterator of data frames (see read_pd_data_frames), rows are numbered over
+    all the frames"""
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    return validate_rows((row for frame in frames for row in frame.to_dict(orient='records')), schema)
+
+
+if __name__ == "__main__":
+    raise RuntimeError('No main available')
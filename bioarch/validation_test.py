@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+
+import unittest
+
+
+import pandas as pd
+
+
+from . import instrumentation
+from .io import read_rows
+from .joints import JointCondition
+from .population import Population
+from .synthetic import CohortGenerator
+from .validation import Problem, validate_column, validate_pd_data_frames, validate_rows
+
+
+class ValidationTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = CohortGenerator(seed=17).rows(8)
+
+    def test_column(self):
+        values = ['1', 'bad', None, '2', 'bad', 7]
+        parsed, report = validate_column(JointCondition.parse, values, 'joints_hip_left')
+        self.assertEqual(parsed[0], JointCondition.parse('1'))
+        self.assertIsNone(parsed[1])
+        self.assertEqual(report.valid.tolist(), [True, False, True, True, False, False])
+        self.assertEqual(report.invalid_rows().tolist(), [1, 4, 5])
+        self.assertEqual([(problem.row, problem.field, problem.value) for problem in report.problems],
+                         [(1, 'joints_hip_left', 'bad'), (4, 'joints_hip_left', 'bad'), (5, 'joints_hip_left', 7)])
+        self.assertEqual(report.counts(), {'joints_hip_left': 3})
+        self.assertEqual(str(report), '3 problems in 3 of 6 rows')
+
+        parsed, report = validate_column(JointCondition.parse, [])
+        self.assertEqual(len(parsed), 0)
+        self.assertTrue(report.ok)
+        report.raise_if_invalid()
+
+    def test_valid_rows(self):
+        individuals, report = validate_rows(self.rows)
+        self.assertTrue(report.ok)
+        self.assertTrue(report.valid.all())
+        pd.testing.assert_frame_equal(Population(individuals).to_pd_data_frame(), Population(list(read_rows(self.rows))).to_pd_data_frame())
+
+    def test_invalid_rows(self):
+        rows = [dict(row) for row in self.rows]
+        rows[1]['joints_hip_left'] = 'bad'
+        rows[1]['trauma_ribs'] = 'bad'
+        rows[2]['femur_left_max'] = '4x'
+        rows[3]['sex_combined'] = 'Q'
+        rows[3]['age_range'] = '1-2-3'
+        rows[5]['c_trapezius_left'] = 'bad'
+        rows[6]['site_id'] = ''
+        rows[7]['tooth_1_tooth'] = 'NA'
+        rows[7]['tooth_1_calculus'] = '2'
+        rows[7]['tooth_1_eh'] = 'NA'
+        rows[7]['tooth_1_cavities'] = 'NA'
+
+        individuals, report = validate_rows(rows)
+        self.assertEqual(report.valid.tolist(), [True, False, False, False, True, False, False, False])
+        self.assertEqual([individual is None for individual in individuals], (~report.valid).tolist())
+        self.assertEqual([(problem.row, problem.field) for problem in report.problems], [
+            (1, 'joints_hip_left'), (1, 'trauma_ribs'), (2, 'femur_left_max'), (3, 'age_range'),
+            (5, 'c_trapezius_left'), (6, 'site_id'), (7, 'tooth_1_calculus')])
+        self.assertEqual(report.problems[0], Problem(1, 'joints_hip_left', 'bad', 'Failed to parse JointCondition: "BAD"'))
+        self.assertEqual(report.problems[-1].value, '2')
+
+        valid = [row for row, ok in zip(rows, report.valid) if ok]
+        pd.testing.assert_frame_equal(Population([individual for individual in individuals if individual is not None]).to_pd_data_frame(),
+                                      Population(list(read_rows(valid))).to_pd_data_frame())
+
+        df = report.to_pd_data_frame()
+        self.assertEqual(list(df.columns), ['row', 'field', 'value', 'reason'])
+        self.assertEqual(df['row'].tolist(), [problem.row for problem in report.problems])
+        with self.assertRaisesRegex(ValueError, '7 problems in 6 rows, first in row 1 joints_hip_left'):
+            report.raise_if_invalid()
+
+    def test_accepted_as_read_rows(self):
+        rows = [dict(row) for row in self.rows[:3]]
+        rows[0]['id'] = ''
+        rows[1]['grave_goods_axe'] = 'PRESENT'
+        rows[2]['grave_goods_axe'] = 'not_present'
+        rows[2]['sex_combined'] = 'Q'
+        individuals, report = validate_rows(rows)
+        self.assertTrue(report.ok, report.problems)
+        self.assertIsNone(individuals[0].id)
+        pd.testing.assert_frame_equal(Population(individuals).to_pd_data_frame(), Population(list(read_rows(rows))).to_pd_data_frame())
+
+    def test_parse_failures(self):
+        rows = [dict(row) for row in self.rows]
+        for row in rows[:3]:
+            row['joints_hip_left'] = 'bad'
+            row['sex_combined'] = 'Q'
+        with instrumentation.instrumented() as stats:
+            validate_rows(rows)
+            validate_column(JointCondition.parse, ['bad', '1', 'bad'])
+        # Once per row (or value), as read_rows would
+        self.assertEqual(stats.parse_failures['JointCondition'], 5)
+        self.assertEqual(stats.parse_failures['Sex'], 3)
+
+    def test_pd_data_frames(self):
+        df = pd.DataFrame(self.rows)
+        df.loc[5, 'trauma_ribs'] = 'bad'
+        individuals, report = validate_pd_data_frames([df.iloc[:4], df.iloc[4:]])
+        self.assertEqual(len(individuals), 8)
+        self.assertEqual(report.invalid_rows().tolist(), [5])
+        self.assertEqual(report.problems[0].field, 'trauma_ribs')
+
+        _, report = validate_pd_data_frames(df)
+        self.assertEqual(report.invalid_rows().tolist(), [5])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == "__main__":
+    main()
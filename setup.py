@@ -87,6 +87,9 @@ setup(
     package_data={'': ['LICENSE', 'README.md']},
     zip_safe=False,
     install_requires=[],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
     tests_require=['pytest'],
     cmdclass={
         'test': PyTest,